@@ -6,6 +6,7 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import argparse
+import atexit
 import imp
 import json
 import locale
@@ -13,9 +14,10 @@ import logging
 import os
 import platform
 import sys
+import time
 
 import inferlib
-from inferlib import analyze, config, utils
+from inferlib import analyze, config, fileindex, jobserver, pipeline, utils
 from inferlib.capture import make
 
 CAPTURE_PACKAGE = 'capture'
@@ -117,11 +119,134 @@ def create_argparser(parents=[]):
 
 
 def validate_args(mode, args):
+    analyzers = analyze.split_analyzers(args.analyzer)
     if mode is not None and mode.LANG == ['clang'] and \
-       args.analyzer == config.ANALYZER_CHECKERS:
+       config.ANALYZER_CHECKERS in analyzers:
         utils.stderr('error: checkers are only enabled for Java.')
         if not args.debug:
             exit(1)
+    if len(analyzers) > 1:
+        for analyzer in analyzers:
+            if analyzer not in config.ANALYZERS or analyzer in [
+                    config.ANALYZER_CAPTURE, config.ANALYZER_COMPILE]:
+                utils.stderr('error: cannot run analyzer "{}" together '
+                             'with other analyzers'.format(analyzer))
+                exit(1)
+        if args.buck or mode is not None and \
+           mode.MODULE_NAME.split('.')[-1] in ['buck', 'javac', 'scalac']:
+            utils.stderr('error: several analyzers can only be run on the '
+                         'capture of a build, not with buck, javac or '
+                         'scalac')
+            exit(1)
+    if args.merge_shards:
+        if mode is not None or args.buck:
+            utils.stderr('error: --merge-shards does not take a command')
+            exit(1)
+        results_dirs = [os.path.realpath(path) for path in args.merge_shards]
+        if os.path.realpath(args.infer_out) in results_dirs:
+            utils.stderr('error: the results directory cannot be one of '
+                         'the directories of --merge-shards')
+            exit(1)
+    if args.shard is not None and (args.pipeline or len(analyzers) > 1):
+        utils.stderr('error: --shard cannot be combined with --pipeline or '
+                     'several analyzers')
+        exit(1)
+    if args.watch:
+        if mode is None or mode.MODULE_NAME.split('.')[-1] == 'analyze':
+            utils.stderr('error: --watch needs the command of a build')
+            exit(1)
+        if args.pipeline or args.shard is not None or len(analyzers) > 1:
+            utils.stderr('error: --watch cannot be combined with --pipeline, '
+                         '--shard or several analyzers')
+            exit(1)
+    if args.pipeline:
+        if args.buck or mode is None or \
+           mode.MODULE_NAME.split('.')[-1] in ['analyze', 'buck', 'javac',
+                                               'scalac']:
+            utils.stderr('error: --pipeline needs the command of a build, '
+                         'and does not work with buck, javac or scalac')
+            exit(1)
+        if len(analyzers) > 1 or args.reactive or args.warm_start or \
+           args.continue_capture or args.changed_first:
+            utils.stderr('error: --pipeline cannot be combined with several '
+                         'analyzers, --reactive, --warm-start, --continue or '
+                         '--changed-first')
+            exit(1)
+        if analyzers[0] in [config.ANALYZER_CAPTURE, config.ANALYZER_COMPILE]:
+            utils.stderr('error: --pipeline needs an analyzer')
+            exit(1)
+
+
+def analyze_capture(args, mod_name, capture_thread=None):
+    """Analyze the capture in args.infer_out and report the issues, unless
+    the capture module already did"""
+    if mod_name in ['buck', 'javac', 'scalac']:
+        return
+    # Something should be already captured, otherwise analysis would fail
+    if capture_thread is None and \
+       not os.path.exists(os.path.join(args.infer_out, 'captured')):
+        print('There was nothing to analyze, exiting')
+        exit(os.EX_USAGE)
+    analyzers = analyze.split_analyzers(args.analyzer)
+    if len(analyzers) > 1:
+        analyze.analyze_and_report_with_analyzers(args, analyzers)
+    else:
+        analysis = analyze.AnalyzerWrapper(args)
+        analysis.capture_thread = capture_thread
+        analysis.analyze_and_report()
+        analysis.save_stats()
+
+
+def watch(args, imported_module, mod_name, cmd):
+    """Capture and analyze again in reactive mode each time one of the
+    source files of the last analysis changes, until interrupted. Only the
+    source files of the last successful analysis are watched: a new source
+    file is picked up once a build triggered by another change captures
+    it."""
+    index_path = os.path.join(args.infer_out, config.SOURCE_INDEX_FILENAME)
+    index = fileindex.load(index_path, args.project_root)
+    args.reactive = True
+    utils.stdout('Watching {} for changes, press Ctrl-C to stop'.format(
+        utils.get_plural('source file', len(index.files))))
+    # the changes that the last capture or analysis failed on, that are
+    # only tried again along with a new change
+    failed = None
+    try:
+        while True:
+            if not index.changed_files():
+                time.sleep(args.watch_interval)
+                continue
+            # the index in memory only notices the changes, the one saved by
+            # the last successful analysis knows which ones it analyzed
+            changes = fileindex.unanalyzed_changes(index_path,
+                                                   args.project_root)
+            if not changes or changes == failed:
+                continue
+            utils.stdout('\n{} changed: {}'.format(
+                utils.get_plural('source file', len(changes)),
+                ', '.join(sorted(changes))))
+            analyze.reset_start_file(args.infer_out, touch_if_present=True)
+            # the build tool only compiles again the files that changed
+            capture_exitcode = imported_module.gen_instance(args,
+                                                            cmd).capture()
+            if capture_exitcode != os.EX_OK:
+                logging.error('Error during capture phase, waiting for the '
+                              'next change')
+                failed = changes
+                continue
+            try:
+                analyze_capture(args, mod_name)
+            except SystemExit as e:
+                logging.error('Analysis failed with exit code %s, waiting for '
+                              'the next change', e.code)
+                failed = changes
+                continue
+            failed = None
+            # the analysis updated the index with the new content of the
+            # files, and the files of the new captured sources
+            index = fileindex.load(index_path, args.project_root)
+    except KeyboardInterrupt:
+        utils.stdout('Stopped watching')
 
 
 def main():
@@ -152,12 +277,33 @@ def main():
 
     validate_args(imported_module, args)
 
+    if is_toplevel_instance:
+        # own the CPU budget of all the nested infer instances, unless we
+        # are ourselves part of a parallel make
+        parent_jobserver = jobserver.from_environment()
+        if parent_jobserver is None:
+            cores, _ = analyze.get_multicore(args)
+            # each analyzer runs one job without a token
+            analyzers = analyze.split_analyzers(args.analyzer)
+            toplevel_jobserver = jobserver.create(
+                max(0, cores - len(analyzers)))
+            atexit.register(toplevel_jobserver.close)
+        else:
+            parent_jobserver.close()
+
     remove_infer_out = (imported_module is not None
                         and not args.reactive
                         and capture_module_name != 'analyze'
                         and not args.buck)
     if remove_infer_out:
+        analyze.remove_infer_out(args.infer_out, args.warm_start)
+
+    if args.merge_shards:
         analyze.remove_infer_out(args.infer_out)
+        analyze.create_results_dir(args.infer_out)
+        utils.configure_logging(args)
+        analyze.merge_shards(args)
+        exit(os.EX_OK)
 
     if imported_module is not None:
         analyze.create_results_dir(args.infer_out)
@@ -188,11 +334,18 @@ def main():
         log_getenv('SHELL')
         log_getenv('PWD')
 
-        capture_exitcode = imported_module.gen_instance(args, cmd).capture()
-        if capture_exitcode != os.EX_OK:
-            logging.error('Error during capture phase, exiting')
-            exit(capture_exitcode)
-        logging.info('Capture phase was successful')
+        capture = imported_module.gen_instance(args, cmd)
+        capture_thread = None
+        if args.pipeline:
+            # the analysis waits for the end of the capture
+            capture_thread = pipeline.CaptureThread(capture)
+            capture_thread.start()
+        else:
+            capture_exitcode = capture.capture()
+            if capture_exitcode != os.EX_OK:
+                logging.error('Error during capture phase, exiting')
+                exit(capture_exitcode)
+            logging.info('Capture phase was successful')
     elif capture_module_name is not None:
         # There was a command, but it's not supported
         utils.stdout('Command "{cmd}" not recognised'
@@ -204,14 +357,10 @@ def main():
         global_argparser.print_help()
         sys.exit(os.EX_OK)
 
-    if not (mod_name == 'buck' or mod_name == 'javac' or mod_name == 'scalac'):
-        # Something should be already captured, otherwise analysis would fail
-        if not os.path.exists(os.path.join(args.infer_out, 'captured')):
-            print('There was nothing to analyze, exiting')
-            exit(os.EX_USAGE)
-        analysis = analyze.AnalyzerWrapper(args)
-        analysis.analyze_and_report()
-        analysis.save_stats()
+    analyze_capture(args, mod_name, capture_thread)
+
+    if args.watch:
+        watch(args, imported_module, mod_name, cmd)
 
     if is_toplevel_instance is True:
         buck_out_for_stats_aggregator = None
@@ -12,6 +12,7 @@ from __future__ import unicode_literals
 
 import argparse
 import codecs
+import copy
 import csv
 import glob
 import json
@@ -21,9 +22,15 @@ import os
 import shutil
 import subprocess
 import sys
+import tarfile
+import tempfile
 import time
+import zipfile
 
-from . import config, issues, utils
+from . import (cache, config, earlyreport, fileindex, issues, jarspecs,
+               jobserver, journal, pipeline, remotecache, reportstream,
+               resources, scheduler, specsindex, transport, utils,
+               warmstart)
 
 # Increase the limit of the CSV parser to sys.maxlimit
 csv.field_size_limit(sys.maxsize)
@@ -69,6 +76,29 @@ def get_pwd():
             pass
     return os.getcwd()
 
+
+def shard_spec(value):
+    """Parse the K/N argument of --shard"""
+    try:
+        index, count = [int(part) for part in value.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'expected K/N, got "{}"'.format(value))
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(
+            'the shard number must be between 1 and {}'.format(count))
+    return (index, count)
+
+
+def worker_host_spec(value):
+    """Check the <host>[:<slots>] argument of --worker-host"""
+    try:
+        transport.parse_host(value, None)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+    return value
+
+
 base_parser = argparse.ArgumentParser(add_help=False)
 base_group = base_parser.add_argument_group('global arguments')
 base_group.add_argument('-o', '--out', metavar='<directory>',
@@ -99,8 +129,10 @@ base_group.add_argument('--debug-exceptions', action='store_true',
 base_group.add_argument('-g', '--debug', action='store_true',
                         help='Generate all debugging information')
 base_group.add_argument('-a', '--analyzer',
-                        help='Select the analyzer within: {0}'.format(
-                            ', '.join(config.ANALYZERS)),
+                        help='Select the analyzer within: {0}. Several '
+                        'analyzers separated by commas run at the same time '
+                        'on the same capture, each with its own results '
+                        'subdirectory'.format(', '.join(config.ANALYZERS)),
                         default=config.ANALYZER_INFER)
 base_group.add_argument('-nf', '--no-filtering', action='store_true',
                         help='''Also show the results from the experimental
@@ -138,13 +170,115 @@ base_group.add_argument('--pmd-xml',
 infer_parser = argparse.ArgumentParser(parents=[base_parser])
 infer_group = infer_parser.add_argument_group('backend arguments')
 infer_group.add_argument('-j', '--multicore', metavar='n', type=int,
-                           default=multiprocessing.cpu_count(),
+                           default=None,
                            dest='multicore', help='Set the number of cores to '
-                           'be used for the analysis (default uses all cores)')
+                           'be used for the analysis (default uses all the '
+                           'cores available, taking CPU quotas and CPU '
+                           'affinity into account)')
 infer_group.add_argument('-l', '--load-average', metavar='<float>', type=float,
                          help='Specifies that no new jobs (commands) should '
                          'be started if there are others jobs running and the '
                          'load average is at least <float>.')
+infer_group.add_argument('--memory-budget', metavar='<MB>', type=int,
+                         help='Do not start new analysis jobs when the memory '
+                         'expected to be used by the running ones, based on '
+                         'previous runs, would exceed <MB> megabytes or the '
+                         'memory available (by default, memory does not '
+                         'limit the number of jobs)')
+infer_group.add_argument('--cluster-timeout', metavar='<seconds>',
+                         type=float,
+                         help='Kill the analysis of a cluster after it has run '
+                         'for <seconds> seconds')
+infer_group.add_argument('--cluster-retries', metavar='<n>', type=int,
+                         default=1,
+                         help='Number of times to retry the analysis of a '
+                         'cluster that timed out (default: %(default)s)')
+infer_group.add_argument('--cluster-retry-options', metavar='<options>',
+                         default='',
+                         help='Space-separated InferAnalyze options to add '
+                         'when retrying a cluster that timed out, e.g. to '
+                         'make the analysis cheaper')
+infer_group.add_argument('--worker-host', metavar='<host>[:<slots>]',
+                         type=worker_host_spec, action='append',
+                         dest='worker_hosts',
+                         help='Run the analysis jobs on <host>, at most '
+                         '<slots> at a time (default: the value of '
+                         '--multicore). Repeat the argument to use several '
+                         'hosts. The host "%s" stands for the local machine. '
+                         'Remote hosts must see the results directory at the '
+                         'same path as the local machine, e.g. through a '
+                         'shared file system' % transport.LOCAL_HOST)
+infer_group.add_argument('--worker-command-template', metavar='<template>',
+                         default=transport.DEFAULT_COMMAND_TEMPLATE,
+                         help='Command used to run an analysis job on a '
+                         'worker host, where {host}, {cwd} and {cmd} are '
+                         'replaced with the host, the directory to run the '
+                         'job from, and the command of the job (default: '
+                         '"%(default)s")')
+infer_group.add_argument('--warm-start', action='store_true',
+                         help='Keep the specs of the previous analysis for '
+                         'the source files that did not change, and only '
+                         'analyze the changed files and the ones depending '
+                         'on them')
+infer_group.add_argument('--shard', metavar='K/N', type=shard_spec,
+                         help='Only analyze the K-th of N parts of the '
+                         'captured files, split so that the parts take about '
+                         'the same time according to the clusters history. '
+                         'The N parts must be analyzed from copies of the '
+                         'same results directory')
+infer_group.add_argument('--merge-shards', metavar='<dir>', nargs='+',
+                         type=utils.decode,
+                         help='Combine the reports and statistics of the '
+                         'results directories of the parts analyzed with '
+                         '--shard into the results directory')
+infer_group.add_argument('--changed-first', action='store_true',
+                         help='Analyze the source files changed since the '
+                         'last analysis first, and print their issues as '
+                         'soon as they are analyzed')
+infer_group.add_argument('--streaming-report', action='store_true',
+                         help='Post-process the reports one issue at a time, '
+                         'sorting them on disk, so that the memory used does '
+                         'not grow with the size of the reports')
+infer_group.add_argument('--watch', action='store_true',
+                         help='After the analysis, keep running and capture '
+                         'and analyze again in reactive mode each time one '
+                         'of the analyzed source files changes')
+infer_group.add_argument('--watch-interval', metavar='<seconds>',
+                         type=float, default=1.0,
+                         help='How often to check the analyzed source files '
+                         'for changes in --watch mode (default: '
+                         '%(default)s)')
+infer_group.add_argument('--pipeline', action='store_true',
+                         help='Analyze the source files as soon as they are '
+                         'captured, while the build is still running, then '
+                         'analyze again the ones that depended on files '
+                         'captured later')
+infer_group.add_argument('--pipeline-interval', metavar='<seconds>',
+                         type=float, default=5.0,
+                         help='How often to look for newly captured source '
+                         'files in --pipeline mode (default: %(default)s)')
+infer_group.add_argument('--results-cache', metavar='<dir>',
+                         help='Reuse the results of a previous analysis of '
+                         'the same capture with the same options, stored in '
+                         '<dir>, and store the results of this analysis '
+                         'there')
+infer_group.add_argument('--results-cache-size', metavar='<MB>', type=int,
+                         default=5120,
+                         help='Maximum size of the results cache, the least '
+                         'recently used results are removed beyond it '
+                         '(default: %(default)s)')
+infer_group.add_argument('--remote-cache', metavar='<url>',
+                         help='Also share the cached results with other '
+                         'machines through the HTTP cache at <url>, see '
+                         'inferlib/cacheserver.py')
+infer_group.add_argument('--remote-cache-max-upload', metavar='<MB>',
+                         type=int, default=512,
+                         help='Do not upload results larger than <MB> '
+                         'megabytes to the remote cache (default: '
+                         '%(default)s)')
+infer_group.add_argument('--pin-workers', action='store_true',
+                         help='Pin each local analysis job slot to a set of '
+                         'CPUs of a single NUMA node')
 infer_group.add_argument('-x', '--project', metavar='<projectname>',
                            help='Project name, for recording purposes only')
 
@@ -156,6 +290,20 @@ infer_group.add_argument('--buck', action='store_true', dest='buck',
 
 infer_group.add_argument('--infer_cache', metavar='<directory>',
                            help='Select a directory to contain the infer cache')
+infer_group.add_argument('--jar-specs-cache', metavar='<dir>',
+                         help='Extract the specs of the jars of the classpath '
+                         'once per version of each jar into <dir>, and leave '
+                         'out the jars without specs (Buck and Java only)')
+infer_group.add_argument('--jar-specs-cache-size', metavar='<MB>', type=int,
+                         default=1024,
+                         help='Maximum size of the jar specs cache, the least '
+                         'recently used specs are removed beyond it '
+                         '(default: %(default)s)')
+infer_group.add_argument('--jar-specs-cache-max-age', metavar='<days>',
+                         type=int, default=30,
+                         help='Remove the specs of the jars not used for '
+                         '<days> days from the jar specs cache (default: '
+                         '%(default)s)')
 
 infer_group.add_argument('-pr', '--project_root',
                          dest='project_root',
@@ -190,11 +338,50 @@ infer_group.add_argument('--specs-dir-list-file',
                          help='add the newline-separated directories listed '
                               'in <file> to the list of directories to be '
                               'searched for spec files')
-
-def remove_infer_out(infer_out):
+infer_group.add_argument('--no-specs-index', action='store_true',
+                         help='Pass the directories of spec files to the '
+                         'analyzer as they are, instead of merging them '
+                         'into a single directory when there are several')
+
+# files of the results directory that are kept from one run to the next
+PRESERVED_RESULTS = [
+    config.CLUSTERS_HISTORY_FILENAME,
+    config.SOURCE_INDEX_FILENAME,
+    config.SPECS_INDEX_DIRNAME,
+]
+
+# merge the directories of spec files when there are at least that many
+SPECS_INDEX_MIN_DIRS = 2
+
+# files of the results directory that are also kept with --warm-start
+WARM_START_RESULTS = [
+    'specs',
+    config.WARM_START_MANIFEST_FILENAME,
+]
+
+
+def remove_infer_out(infer_out, warm_start=False):
+    preserved_dir = None
+    preserved = PRESERVED_RESULTS
+    if warm_start:
+        preserved = preserved + WARM_START_RESULTS
+    to_preserve = [name for name in preserved
+                   if os.path.exists(os.path.join(infer_out, name))]
+    if to_preserve:
+        preserved_dir = tempfile.mkdtemp(
+            dir=os.path.dirname(infer_out.rstrip(os.sep)))
+        for name in to_preserve:
+            shutil.move(os.path.join(infer_out, name),
+                        os.path.join(preserved_dir, name))
     # it is safe to ignore errors here because recreating the infer_out
     # directory will fail later
     shutil.rmtree(infer_out, True)
+    if preserved_dir is not None:
+        utils.mkdir_if_not_exists(infer_out)
+        for name in to_preserve:
+            shutil.move(os.path.join(preserved_dir, name),
+                        os.path.join(infer_out, name))
+        shutil.rmtree(preserved_dir, True)
 
 
 def create_results_dir(results_dir):
@@ -204,6 +391,37 @@ def create_results_dir(results_dir):
     utils.mkdir_if_not_exists(os.path.join(results_dir, 'sources'))
 
 
+# entries of the results directory written by the capture, which the
+# analyzers run on the same capture share
+SHARED_CAPTURE_ENTRIES = [
+    '.start',
+    'attributes',
+    'captured',
+    'lint_issues',
+    'sources',
+    config.INFER_BUCK_DEPS_FILENAME,
+]
+
+
+def split_analyzers(analyzer):
+    """Return the list of analyzers selected with --analyzer"""
+    return [name.strip() for name in analyzer.split(',') if name.strip()]
+
+
+def create_analyzer_results_dir(infer_out, analyzer):
+    """Create the results directory of one of several analyzers run on the
+    capture in infer_out, linking to the captured data"""
+    results_dir = os.path.join(infer_out, analyzer)
+    utils.mkdir_if_not_exists(results_dir)
+    for name in SHARED_CAPTURE_ENTRIES:
+        source = os.path.join(infer_out, name)
+        link = os.path.join(results_dir, name)
+        if os.path.lexists(source) and not os.path.lexists(link):
+            os.symlink(source, link)
+    create_results_dir(results_dir)
+    return results_dir
+
+
 def reset_start_file(results_dir, touch_if_present=False):
     start_path = os.path.join(results_dir, '.start')
     if (not os.path.exists(start_path)) or touch_if_present:
@@ -229,17 +447,24 @@ def clean(infer_out):
                     os.remove(path)
 
 
+def get_multicore(args):
+    """Return the number of analysis workers to use, and why"""
+    if args.multicore is not None:
+        return args.multicore, 'set with --multicore'
+    return resources.default_parallelism()
+
+
 def help_exit(message):
     utils.stdout(message)
     infer_parser.print_usage()
     exit(1)
 
 
-def run_command(cmd, debug_mode, javac_arguments, step, analyzer):
+def run_command(cmd, debug_mode, javac_arguments, step, analyzer, cwd=None):
     if debug_mode:
         utils.stdout('\n{0}\n'.format(' '.join(cmd)))
     try:
-        return subprocess.check_call(cmd)
+        return subprocess.check_call(cmd, cwd=cwd)
     except subprocess.CalledProcessError as e:
         error_msg = 'Failure during {0}, original command was\n\n{1}\n\n'
         infer_cmd = ['infer', '-g', '-a', analyzer]
@@ -271,7 +496,22 @@ class AnalyzerWrapper(object):
 
         self.stats = {'int': {}}
         self.timing = {}
-
+        self.journal = None
+        self.worker_placement = None
+        self.warm_start_key = None
+        self.file_index = None
+        # set to a pipeline.CaptureThread to analyze while capturing
+        self.capture_thread = None
+        # source files changed since the last analysis, see
+        # changed_source_files
+        self.changed_files = None
+        self.early_reporter = None
+
+        self.args.multicore, self.cores_reason = get_multicore(self.args)
+        self.stats['int']['cores'] = self.args.multicore
+
+        self.specs_library_dirs = [os.path.abspath(path) for path in
+                                   self.args.specs_dirs or []]
         if self.args.specs_dirs:
             # Each dir passed in input is prepended by '-lib'.
             # Convert each path to absolute because when running from
@@ -296,13 +536,8 @@ class AnalyzerWrapper(object):
             shutil.rmtree(self.args.infer_out)
         exit(os.EX_OK)
 
-    def analyze(self):
-        logging.info('Starting analysis')
-        infer_analyze = [
-            utils.get_cmd_in_bin_dir(INFER_ANALYZE_BINARY),
-            '-results_dir',
-            self.args.infer_out
-        ]
+    def infer_options(self):
+        """Return the options of InferAnalyze for this analysis"""
         infer_options = []
 
         # remove specs if possible so that old issues are less likely
@@ -358,26 +593,143 @@ class AnalyzerWrapper(object):
         if self.args.merge:
             infer_options.append('-merge')
 
-        if self.args.specs_dirs:
-            infer_options += self.args.specs_dirs
-
-        if self.args.specs_dir_list_file:
-            infer_options += self.args.specs_dir_list_file
-
-        exit_status = os.EX_OK
+        infer_options += self.specs_library_options()
 
         if self.javac is not None and self.args.buck:
             infer_options += ['-project_root', utils.decode(os.getcwd()),
                               '-java']
             if self.javac.args.classpath is not None:
-                for path in self.javac.args.classpath.split(os.pathsep):
-                    if os.path.isfile(path):
-                        infer_options += ['-ziplib', os.path.abspath(path)]
+                jars = [os.path.abspath(path) for path in
+                        self.javac.args.classpath.split(os.pathsep)
+                        if os.path.isfile(path)]
+                infer_options += self.library_jar_options(jars)
         elif self.args.project_root:
             infer_options += ['-project_root', self.args.project_root]
 
+        return map(utils.decode_or_not, infer_options)
+
+    def library_jar_options(self, jars):
+        """Return the options of InferAnalyze to search for specs in the
+        jars of the classpath, through the jar specs cache if enabled"""
+        if not self.args.jar_specs_cache:
+            return [item for jar in jars for item in ['-ziplib', jar]]
+        jar_cache = jarspecs.JarSpecsCache(
+            self.args.jar_specs_cache,
+            self.args.jar_specs_cache_size * 1024 * 1024,
+            self.args.jar_specs_cache_max_age * 24 * 3600)
+        zip_libs = []
+        specs_dirs = []
+        for jar in jars:
+            try:
+                specs_dir = jar_cache.specs_dir(jar)
+            except (IOError, OSError, zipfile.BadZipfile) as e:
+                logging.warning('Cannot extract the specs of %s: %s', jar, e)
+                zip_libs.append(jar)
+                continue
+            if specs_dir is not None:
+                specs_dirs.append(specs_dir)
+        jar_cache.close()
+        self.stats['int']['classpath_jars'] = len(jars)
+        self.stats['int']['classpath_jars_with_specs'] = len(specs_dirs)
+        # InferAnalyze searches the jars in command-line order, before the
+        # -lib directories, which it searches in reverse command-line order
+        options = [item for jar in zip_libs for item in ['-ziplib', jar]]
+        for specs_dir in reversed(specs_dirs):
+            options += ['-lib', specs_dir]
+        return options
+
+    def specs_library_options(self):
+        """Return the options of InferAnalyze to search for specs in the
+        directories of --specs-dir and --specs-dir-list-file, merged into a
+        single directory when there are several"""
+        options = (self.args.specs_dirs or []) + \
+            (self.args.specs_dir_list_file or [])
+        if self.args.no_specs_index:
+            return options
+        list_file_dirs = []
+        if self.args.specs_dir_list_file:
+            try:
+                list_file_dirs = specsindex.read_specs_dir_list_file(
+                    self.args.specs_dir_list_file[1])
+            except IOError:
+                # let InferAnalyze report the error
+                return options
+        dirs = specsindex.search_order(self.specs_library_dirs,
+                                       list_file_dirs)
+        if len(dirs) < SPECS_INDEX_MIN_DIRS:
+            return options
+        merged_dir = os.path.join(self.args.infer_out,
+                                  config.SPECS_INDEX_DIRNAME)
+        specsindex.build(merged_dir, dirs)
+        return ['-lib', merged_dir]
+
+    def analyze(self, infer_options):
+        """Run InferAnalyze with the options returned by infer_options"""
+        logging.info('Starting analysis')
+        logging.info('Using %d analysis jobs (%s)', self.args.multicore,
+                     self.cores_reason)
+        infer_analyze = [
+            utils.get_cmd_in_bin_dir(INFER_ANALYZE_BINARY),
+            '-results_dir',
+            self.args.infer_out
+        ]
+        infer_options = list(infer_options)
+        exit_status = os.EX_OK
+
+        options_key = [option for option in infer_options
+                       if option != '-allow_specs_cleanup'] + \
+            self.shard_options()
+        self.file_index = fileindex.load(
+            os.path.join(self.args.infer_out, config.SOURCE_INDEX_FILENAME),
+            self.args.project_root)
+        if self.args.reactive:
+            changed_files_index = self.write_changed_files()
+            if changed_files_index is not None:
+                infer_options += ['--changed-files-index',
+                                  changed_files_index]
+        if self.capture_thread is not None:
+            return self.analyze_pipelined(infer_analyze, infer_options)
+        # the clusters are needed to pick the ones of a shard or to run the
+        # changed ones first
+        multicore = self.args.multicore != 1 or \
+            bool(self.args.worker_hosts) or self.args.shard is not None or \
+            self.args.changed_first
+        already_analyzed = set()
+        if multicore:
+            journal_key = {
+                'capture': journal.capture_fingerprint(self.args.infer_out),
+                'options': options_key,
+            }
+            self.journal = journal.AnalysisJournal(
+                os.path.join(self.args.infer_out,
+                             config.ANALYSIS_JOURNAL_FILENAME),
+                journal_key)
+            already_analyzed = self.journal.completed()
+            if already_analyzed:
+                # keep the specs computed before the interruption
+                infer_options.remove('-allow_specs_cleanup')
+
+        up_to_date = set()
+        if self.args.warm_start:
+            self.warm_start_key = {
+                'analyzer': self.args.analyzer,
+                'infer_version': utils.infer_version(),
+                'options': options_key,
+            }
+            manifest = warmstart.load_manifest(
+                os.path.join(self.args.infer_out,
+                             config.WARM_START_MANIFEST_FILENAME),
+                self.warm_start_key)
+            # when resuming, the interrupted run already deleted the specs
+            # that are out of date
+            if manifest is not None and not already_analyzed:
+                up_to_date = warmstart.invalidate(
+                    manifest, self.file_index,
+                    os.path.join(self.args.infer_out, 'specs'))
+                infer_options.remove('-allow_specs_cleanup')
+            self.stats['int']['warm_start_up_to_date_files'] = \
+                len(up_to_date)
 
-        infer_options = map(utils.decode_or_not, infer_options)
         infer_options_str = ' '.join(infer_options)
         os.environ['INFER_OPTIONS'] = utils.encode(infer_options_str)
 
@@ -387,7 +739,7 @@ class AnalyzerWrapper(object):
         if self.args.analyzer == config.ANALYZER_TRACING:
             os.environ['INFER_LAZY_DYNAMIC_DISPATCH'] = 'Y'
 
-        if self.args.multicore == 1:
+        if not multicore:
             analysis_start_time = time.time()
             analyze_cmd = infer_analyze + infer_options
             exit_status = run_command(
@@ -408,61 +760,368 @@ class AnalyzerWrapper(object):
                 shutil.rmtree(multicore_dir)
             os.mkdir(multicore_dir)
             os.chdir(multicore_dir)
-            analyze_cmd = infer_analyze + ['-makefile', 'Makefile']
+            analyze_cmd = infer_analyze + ['-makefile',
+                                           scheduler.CLUSTERS_MAKEFILE]
             analyze_cmd += infer_options
             makefile_generation_start_time = time.time()
-            makefile_status = run_command(
-                analyze_cmd,
-                self.args.debug,
-                javac_original_arguments,
-                'create_makefile',
-                self.args.analyzer
-            )
+            try:
+                makefile_status = run_command(
+                    analyze_cmd,
+                    self.args.debug,
+                    javac_original_arguments,
+                    'create_makefile',
+                    self.args.analyzer
+                )
+            finally:
+                os.chdir(pwd)
             elapsed = utils.elapsed_time(makefile_generation_start_time)
             self.timing['makefile_generation'] = elapsed
             exit_status += makefile_status
             if makefile_status == os.EX_OK:
-                make_cmd = ['make', '-k']
-                make_cmd += ['-j', str(self.args.multicore)]
-                if self.args.load_average is not None:
-                    make_cmd += ['-l', str(self.args.load_average)]
-                if not self.args.debug:
-                    make_cmd += ['-s']
+                clusters = scheduler.read_clusters(
+                    os.path.join(multicore_dir, scheduler.CLUSTERS_MAKEFILE))
+                if self.args.shard is not None:
+                    clusters = scheduler.shard(
+                        clusters,
+                        scheduler.load_history(os.path.join(
+                            self.args.infer_out,
+                            config.CLUSTERS_HISTORY_FILENAME)),
+                        *self.args.shard)
+                    self.stats['int']['shard_clusters'] = len(clusters)
+                if already_analyzed:
+                    logging.info('Resuming the analysis, skipping %d '
+                                 'clusters analyzed by a previous run',
+                                 len(already_analyzed))
+                    clusters = [cluster for cluster in clusters
+                                if cluster.source_name()
+                                not in already_analyzed]
+                if up_to_date:
+                    clusters = [cluster for cluster in clusters
+                                if cluster.source_name() not in up_to_date]
+                    logging.info('Warm start: analyzing %d clusters',
+                                 len(clusters))
+                changed_dirs = None
+                if self.args.changed_first:
+                    changed_dirs = self.changed_dirs(clusters)
+                if changed_dirs:
+                    self.early_reporter = earlyreport.EarlyReporter(
+                        self.args, changed_dirs)
                 analysis_start_time = time.time()
-                make_status = run_command(
-                    make_cmd,
-                    self.args.debug,
-                    javac_original_arguments,
-                    'run_makefile',
-                    self.args.analyzer
-                )
+                self.journal.start(resume=bool(already_analyzed))
+                try:
+                    clusters_status = self.run_clusters(
+                        infer_analyze + infer_options, clusters,
+                        multicore_dir, priority=changed_dirs)
+                finally:
+                    self.journal.close()
+                    if self.early_reporter is not None:
+                        self.early_reporter.wait()
+                if clusters_status == os.EX_OK:
+                    self.journal.finish()
+                exit_status += clusters_status
                 elapsed = utils.elapsed_time(analysis_start_time)
                 self.timing['analysis'] = elapsed
-                os.chdir(pwd)
-                exit_status += make_status
 
         if self.args.buck and exit_status == os.EX_OK:
             clean(self.args.infer_out)
 
         return exit_status
 
-    def update_stats_with_warnings(self, csv_report):
-        with open(csv_report, 'r') as file_in:
-            reader = utils.locale_csv_reader(file_in)
-            rows = [row for row in reader][1:]
-            for row in rows:
-                key = row[issues.CSV_INDEX_TYPE]
-                previous_value = self.stats['int'].get(key, 0)
-                self.stats['int'][key] = previous_value + 1
+    def analyze_pipelined(self, infer_analyze, infer_options):
+        """Analyze the captured source files in rounds while the capture
+        is running, then analyze again the ones whose specs may be out of
+        date"""
+        os.environ['INFER_OPTIONS'] = utils.encode(' '.join(infer_options))
+        multicore_dir = os.path.join(self.args.infer_out, 'multicore')
+        if os.path.isdir(multicore_dir):
+            shutil.rmtree(multicore_dir)
+        os.mkdir(multicore_dir)
+        self.timing['makefile_generation'] = 0.0
+        analysis_start_time = time.time()
+        watcher = pipeline.CaptureWatcher(self.args.infer_out)
+        rounds = 0
+        exit_status = os.EX_OK
+        while self.capture_thread.is_alive():
+            names = watcher.poll()
+            if not names:
+                self.capture_thread.join(self.args.pipeline_interval)
+                continue
+            rounds += 1
+            try:
+                exit_status += self.run_pipeline_round(
+                    rounds, names, watcher, infer_analyze, infer_options,
+                    multicore_dir)
+            except subprocess.CalledProcessError:
+                # e.g. InferAnalyze read a file being written by the
+                # capture, try again in a later round
+                logging.warning('Pipeline round %d failed, the files will be '
+                                'analyzed later', rounds)
+                watcher.unschedule(names)
+
+        capture_status = self.capture_thread.exit_status
+        if capture_status != os.EX_OK:
+            logging.error('Error during capture phase, exiting')
+            exit(capture_status)
+        logging.info('Capture phase was successful')
+        if not os.path.exists(os.path.join(self.args.infer_out, 'captured')):
+            print('There was nothing to analyze, exiting')
+            exit(os.EX_USAGE)
+
+        to_analyze = set(watcher.unscheduled())
+        if watcher.scheduled:
+            procs_csv = os.path.join(multicore_dir, 'procs.csv')
+            calls_csv = os.path.join(multicore_dir, 'calls.csv')
+            subprocess.check_call([
+                utils.get_cmd_in_bin_dir('InferPrint'), '-q',
+                '-results_dir', self.args.infer_out,
+                '-procs', procs_csv,
+                '-calls', calls_csv,
+                '-analyzer', self.args.analyzer])
+            invalid = pipeline.invalidate(self.args.infer_out, watcher,
+                                          procs_csv, calls_csv)
+            watcher.unschedule(invalid)
+            to_analyze |= invalid
+            self.stats['int']['pipeline_reanalyzed_files'] = len(invalid)
+        if to_analyze:
+            rounds += 1
+            exit_status += self.run_pipeline_round(
+                rounds, sorted(to_analyze), watcher, infer_analyze,
+                infer_options, multicore_dir)
+        self.stats['int']['pipeline_rounds'] = rounds
+        self.timing['analysis'] = utils.elapsed_time(analysis_start_time)
+        return exit_status
 
-    def create_report(self):
+    def run_pipeline_round(self, number, names, watcher, infer_analyze,
+                           infer_options, multicore_dir):
+        """Analyze the clusters of the given captured source directories
+        in multicore_dir/round<number>"""
+        round_name = 'round{}'.format(number)
+        round_dir = os.path.join(multicore_dir, round_name)
+        os.mkdir(round_dir)
+        if number > 1:
+            # keep the specs of the previous rounds
+            infer_options = [option for option in infer_options
+                             if option != '-allow_specs_cleanup']
+        watcher.schedule(names, time.time())
+        makefile_generation_start_time = time.time()
+        run_command(
+            infer_analyze + ['-makefile', scheduler.CLUSTERS_MAKEFILE] +
+            infer_options,
+            self.args.debug,
+            [],
+            'create_makefile',
+            self.args.analyzer,
+            cwd=round_dir)
+        self.timing['makefile_generation'] += utils.elapsed_time(
+            makefile_generation_start_time)
+        names = set(names)
+        # run the clusters from multicore_dir so that the names of the
+        # clusters of the different rounds do not clash
+        clusters = [
+            scheduler.Cluster(os.path.join(round_name, cluster.name),
+                              os.path.join(round_name, cluster.cluster_file),
+                              cluster.source_dir)
+            for cluster in scheduler.read_clusters(
+                os.path.join(round_dir, scheduler.CLUSTERS_MAKEFILE))
+            if cluster.source_name() in names]
+        logging.info('Pipeline round %d: analyzing %d clusters',
+                     number, len(clusters))
+        return self.run_clusters(infer_analyze + infer_options, clusters,
+                                 multicore_dir)
+
+    def shard_options(self):
+        """Return the --shard option of this analysis, if any, to tell apart
+        the results of the different shards"""
+        if self.args.shard is None:
+            return []
+        return ['--shard', '{0}/{1}'.format(*self.args.shard)]
+
+    def changed_source_files(self):
+        """Return the indexed source files whose content changed since the
+        last analysis"""
+        if self.changed_files is None:
+            # computed once, since it updates the index
+            self.changed_files = self.file_index.changed_files()
+            logging.info('%s changed since the last analysis',
+                         utils.get_plural('source file',
+                                          len(self.changed_files)))
+            self.stats['int']['changed_files'] = len(self.changed_files)
+        return self.changed_files
+
+    def changed_dirs(self, clusters):
+        """Return the captured directories of the given clusters whose
+        source file changed since the last analysis or is new, or None if
+        there is no index of the source files yet"""
+        if self.file_index.captured_dirs is None:
+            logging.info('No index of the source files yet, cannot tell '
+                         'which files changed')
+            return None
+        changed = set(warmstart.captured_dir_name(path)
+                      for path in self.changed_source_files())
+        changed |= set(fileindex.captured_dirs(self.args.infer_out)) - \
+            set(self.file_index.captured_dirs)
+        return set(cluster.source_name() for cluster in clusters
+                   if cluster.source_name() in changed)
+
+    def write_changed_files(self):
+        """Write the list of the source files whose content changed since
+        the last analysis, and return its path, or None if the changes
+        cannot be determined from the index of the source files"""
+        if self.file_index.captured_dirs is None:
+            logging.info('No index of the source files yet, relying on '
+                         'modification times to find the changed files')
+            return None
+        new_dirs = set(fileindex.captured_dirs(self.args.infer_out)) - \
+            set(self.file_index.captured_dirs)
+        if new_dirs:
+            # the index does not know the source files of new captured
+            # directories
+            logging.info('%d new source files captured, relying on '
+                         'modification times to find the changed files',
+                         len(new_dirs))
+            return None
+        changed = self.changed_source_files()
+        changed_files_path = os.path.join(self.args.infer_out,
+                                          config.CHANGED_FILES_FILENAME)
+        with codecs.open(changed_files_path, 'w',
+                         encoding=config.CODESET) as file_out:
+            for path in changed:
+                file_out.write(path + '\n')
+        return changed_files_path
+
+    def _on_cluster_complete(self, result, done, total):
+        if self.journal is not None and \
+           result.exit_status == os.EX_OK and not result.timed_out:
+            self.journal.record(result.cluster.source_name())
+        if self.early_reporter is not None:
+            self.early_reporter.cluster_done(result.cluster.source_name())
+        logging.info('[%d/%d] Cluster %s (%s) finished on %s with status %d '
+                     'in %.2fs (cpu %s)',
+                     done, total, result.cluster.name,
+                     result.cluster.source_name(), result.host,
+                     result.exit_status, result.wall_time,
+                     '%.2fs' % result.cpu_time
+                     if result.cpu_time is not None else 'unknown')
+
+    def pin_slots(self, slots):
+        """Return the CPUs to pin each of the given slots to, or None if the
+        jobs cannot be pinned"""
+        if not scheduler.can_pin_jobs():
+            logging.warning('Cannot pin the analysis jobs to CPUs: install '
+                            'taskset or run infer with python 3')
+            return None
+        if slots is None:
+            slots = [transport.LocalTransport()] * self.args.multicore
+        local_slots = [index for (index, slot) in enumerate(slots)
+                       if slot.is_local]
+        cpu_sets = [None] * len(slots)
+        placement = []
+        for (index, (node, cpus)) in zip(
+                local_slots, resources.worker_placement(len(local_slots))):
+            cpu_sets[index] = cpus
+            cpu_list = ','.join(str(cpu) for cpu in cpus)
+            logging.info('Slot %d: NUMA node %d, cpus %s',
+                         index, node, cpu_list)
+            placement.append('{0}:{1}'.format(node, cpu_list))
+        self.worker_placement = ' '.join(placement)
+        return cpu_sets
+
+    def run_clusters(self, cmd, clusters, multicore_dir, priority=None):
+        """Run the analysis of each cluster as a separate InferAnalyze
+        process, and record timing information about each of them. The
+        clusters of the captured directories in priority run first."""
+        history_path = os.path.join(self.args.infer_out,
+                                    config.CLUSTERS_HISTORY_FILENAME)
+        history = scheduler.load_history(history_path)
+        clusters = scheduler.order_longest_first(clusters, history)
+        if priority:
+            clusters = \
+                [cluster for cluster in clusters
+                 if cluster.source_name() in priority] + \
+                [cluster for cluster in clusters
+                 if cluster.source_name() not in priority]
+            logging.info('Analyzing the %d clusters of the changed files '
+                         'first', len(priority))
+        slots = None
+        if self.args.worker_hosts:
+            slots = transport.create_slots(self.args.worker_hosts,
+                                           self.args.multicore,
+                                           self.args.worker_command_template)
+            logging.info('Running the analysis on %d slots: %s', len(slots),
+                         ', '.join(self.args.worker_hosts))
+        if slots is not None and not all(slot.is_local for slot in slots):
+            # the CPU budget and the memory of this machine do not limit the
+            # jobs running elsewhere
+            shared_jobserver = None
+        else:
+            shared_jobserver = jobserver.from_environment()
+        # without a budget, memory does not limit the jobs given by -j
+        memory_budget = None
+        if self.args.memory_budget is not None:
+            memory_budget = self.args.memory_budget * 1024 * 1024
+        cpu_sets = None
+        if self.args.pin_workers:
+            cpu_sets = self.pin_slots(slots)
+        cluster_scheduler = scheduler.Scheduler(
+            cmd,
+            self.args.multicore,
+            load_average=self.args.load_average,
+            cwd=multicore_dir,
+            on_complete=self._on_cluster_complete,
+            jobserver=shared_jobserver,
+            memory_budget=memory_budget,
+            expected_memory=scheduler.expected_memory_from_history(history),
+            timeout=self.args.cluster_timeout,
+            retries=self.args.cluster_retries,
+            retry_options=self.args.cluster_retry_options.split(),
+            slots=slots,
+            cpu_sets=cpu_sets)
+        try:
+            results = cluster_scheduler.run(clusters)
+        finally:
+            if shared_jobserver is not None:
+                shared_jobserver.close()
+        scheduler.update_history(history, results,
+                                 self.args.cluster_timeout)
+        utils.dump_json_to_path(history, history_path)
+        stragglers_path = os.path.join(self.args.infer_out,
+                                       config.STRAGGLERS_FILENAME)
+        utils.dump_json_to_path(
+            scheduler.straggler_report(results, self.args.cluster_timeout),
+            stragglers_path)
+        final_results = scheduler.final_results(results)
+        self.stats.setdefault('clusters', {}).update(
+            (result.cluster.name, result.to_stats())
+            for result in final_results)
+        timed_out = [result.cluster.name for result in final_results
+                     if result.timed_out]
+        if timed_out:
+            # giving up on a few clusters is better than not reporting at all
+            logging.warning('Analysis timed out for clusters %s, see %s',
+                            ', '.join(timed_out), stragglers_path)
+        failed = [result.cluster.name for result in final_results
+                  if result.exit_status != os.EX_OK and not result.timed_out]
+        if failed:
+            logging.error('Analysis failed for clusters %s', ', '.join(failed))
+            return os.EX_SOFTWARE
+        return os.EX_OK
+
+    def update_stats_with_warnings(self, counts):
+        for (key, count) in counts.items():
+            previous_value = self.stats['int'].get(key, 0)
+            self.stats['int'][key] = previous_value + count
+
+    def create_report(self, errors=None):
         """Report statistics about the computation and create a CSV file
-        containing the list or errors found during the analysis"""
+        containing the list or errors found during the analysis. The issues
+        of the final JSON report are also added to errors, an
+        issues.ErrorsReport, while the report is post-processed."""
 
         out_dir = self.args.infer_out
         csv_report = os.path.join(out_dir, config.CSV_REPORT_FILENAME)
         json_report = os.path.join(out_dir, config.JSON_REPORT_FILENAME)
         procs_report = os.path.join(self.args.infer_out, 'procs.csv')
+        calls_report = os.path.join(self.args.infer_out, 'calls.csv')
 
         infer_print_cmd = [utils.get_cmd_in_bin_dir('InferPrint')]
         infer_print_options = [
@@ -473,6 +1132,8 @@ class AnalyzerWrapper(object):
             '-procs', procs_report,
             '-analyzer', self.args.analyzer
         ]
+        if self.warm_start_key is not None:
+            infer_print_options += ['-calls', calls_report]
         if self.args.debug or self.args.debug_exceptions:
             infer_print_options.append('-with_infer_src_loc')
         exit_status = subprocess.check_call(
@@ -482,9 +1143,31 @@ class AnalyzerWrapper(object):
             logging.error('Error with InferPrint with the command: '
                           + infer_print_cmd)
         else:
-            issues.clean_csv(self.args, csv_report)
-            issues.clean_json(self.args, json_report)
-            self.update_stats_with_warnings(csv_report)
+            issue_filter = issues.IssueFilter(
+                self.args.analyzer, self.args.no_filtering,
+                errors.files if errors is not None else None)
+            # read each report once, for all the outputs derived from it
+            counts = issues.clean_csv(issue_filter, csv_report,
+                                      self.args.streaming_report)
+            issues.clean_json(issue_filter, json_report,
+                              self.args.streaming_report, errors)
+            self.update_stats_with_warnings(counts)
+            if self.warm_start_key is not None:
+                manifest = warmstart.create_manifest(
+                    self.warm_start_key, procs_report, calls_report,
+                    self.file_index)
+                utils.dump_json_to_path(
+                    manifest,
+                    os.path.join(self.args.infer_out,
+                                 config.WARM_START_MANIFEST_FILENAME))
+            if self.file_index is not None:
+                self.file_index.update(
+                    set(row['file']
+                        for row in warmstart.read_csv(procs_report)),
+                    self.args.infer_out)
+                self.file_index.save(
+                    os.path.join(self.args.infer_out,
+                                 config.SOURCE_INDEX_FILENAME))
 
         return exit_status
 
@@ -510,36 +1193,331 @@ class AnalyzerWrapper(object):
         }
         self.stats['normal'] = {
             'analyzer': self.args.analyzer,
-            'infer_version': utils.infer_version()
+            'infer_version': utils.infer_version(),
+            'cores_reason': self.cores_reason,
         }
+        if self.worker_placement is not None:
+            self.stats['normal']['worker_placement'] = self.worker_placement
+        if self.args.shard is not None:
+            self.stats['normal']['shard'] = self.shard_options()[1]
 
         stats_path = os.path.join(self.args.infer_out, config.STATS_FILENAME)
         utils.dump_json_to_path(self.stats, stats_path)
 
-    def analyze_and_report(self):
-        should_print_errors = False
+    def analyze_and_report(self, quiet=False):
+        """Run the analysis and create the reports. When quiet is True,
+        nothing is printed and bugs.txt is not created."""
         if self.args.analyzer not in [config.ANALYZER_COMPILE,
                                       config.ANALYZER_CAPTURE]:
-            if self.analyze() == os.EX_OK:
-                reporting_start_time = time.time()
-                report_status = self.create_report()
-                elapsed = utils.elapsed_time(reporting_start_time)
-                self.timing['reporting'] = elapsed
+            json_report = os.path.join(self.args.infer_out,
+                                       config.JSON_REPORT_FILENAME)
+            errors = None
+            if not quiet and not self.args.buck:
+                xml_out = None
+                if self.args.pmd_xml:
+                    xml_out = os.path.join(self.args.infer_out,
+                                           config.PMD_XML_FILENAME)
+                errors = issues.ErrorsReport(
+                    os.path.join(self.args.infer_out, config.BUGS_FILENAME),
+                    xml_out)
+            # computing the options may build the specs index and update
+            # the jar specs cache, only do it once
+            infer_options = self.infer_options()
+            cache_key = self.results_cache_key(infer_options)
+            restored = cache_key is not None and \
+                self.restore_cached_results(cache_key)
+            if restored or self.analyze(infer_options) == os.EX_OK:
+                if restored:
+                    report_status = os.EX_OK
+                    if errors is not None:
+                        for report in reportstream.read_json_array_from_path(
+                                json_report):
+                            errors.add(report)
+                else:
+                    reporting_start_time = time.time()
+                    report_status = self.create_report(errors)
+                    elapsed = utils.elapsed_time(reporting_start_time)
+                    self.timing['reporting'] = elapsed
                 self.read_proc_stats()
+                if cache_key is not None and not restored and \
+                   report_status == os.EX_OK:
+                    self.cache_results(cache_key)
+                if quiet:
+                    return
                 self.print_analysis_stats()
-                if report_status == os.EX_OK and not self.args.buck:
-                    json_report = os.path.join(self.args.infer_out,
-                                               config.JSON_REPORT_FILENAME)
-                    bugs_out = os.path.join(self.args.infer_out,
-                                            config.BUGS_FILENAME)
-                    xml_out = None
-                    if self.args.pmd_xml:
-                        xml_out = os.path.join(self.args.infer_out,
-                                               config.PMD_XML_FILENAME)
-                    issues.print_and_save_errors(json_report,
-                                                 bugs_out, xml_out)
+                if report_status == os.EX_OK and errors is not None:
+                    errors.print_and_save()
+
+    def results_cache_key(self, infer_options):
+        """Return the key of the results of this analysis with the given
+        InferAnalyze options in the results cache, or None if they cannot be
+        cached"""
+        if self.args.results_cache is None and self.args.remote_cache is None:
+            return None
+        if self.args.reactive or self.args.continue_capture or \
+           self.args.warm_start:
+            # the results also depend on the previous analysis
+            logging.info('Not using the results cache in reactive or '
+                         'warm-start mode')
+            return None
+        if self.capture_thread is not None:
+            # the capture is not done yet
+            logging.info('Not using the results cache in pipeline mode')
+            return None
+        options = [option for option in infer_options
+                   if option != '-allow_specs_cleanup'] + \
+            self.shard_options()
+        # the options only name the library specs and jars
+        library_index_path = os.path.join(self.args.infer_out,
+                                          config.LIBRARY_INDEX_FILENAME)
+        library_index = fileindex.load(library_index_path, os.sep)
+        libraries = cache.libraries_hash(options, library_index)
+        library_index.save(library_index_path)
+        # InferAnalyze and InferPrint read the .inferconfig of the current
+        # directory, see infer_options
+        return cache.results_key(
+            self.args.infer_out, self.args.analyzer, options,
+            no_filtering=self.args.no_filtering,
+            inferconfig=os.path.join(os.getcwd(), config.INFERCONFIG_FILENAME),
+            libraries=libraries)
+
+    def _results_cache(self):
+        if self.args.results_cache is None:
+            return None
+        return cache.ResultsCache(self.args.results_cache,
+                                  self.args.results_cache_size * 1024 * 1024)
+
+    def _remote_cache(self):
+        if self.args.remote_cache is None:
+            return None
+        return remotecache.RemoteCache(
+            self.args.remote_cache, utils.infer_version(),
+            self.args.remote_cache_max_upload * 1024 * 1024)
+
+    def _restore_remote_results(self, cache_key, local_cache):
+        fd, bundle = tempfile.mkstemp(
+            dir=local_cache.cache_dir if local_cache is not None else None,
+            suffix=cache.BUNDLE_EXTENSION + '.tmp')
+        os.close(fd)
+        try:
+            if not self._remote_cache().get(cache_key, bundle):
+                return None
+            try:
+                cached_stats = cache.extract_bundle(bundle,
+                                                    self.args.infer_out)
+            except (IOError, OSError, ValueError, tarfile.TarError) as e:
+                logging.warning('Ignoring invalid remote results: %s', e)
+                return None
+            self.stats['int']['results_cache_remote_hits'] = 1
+            if local_cache is not None:
+                local_cache.add(cache_key, bundle)
+            return cached_stats
+        finally:
+            if os.path.exists(bundle):
+                os.remove(bundle)
+
+    def restore_cached_results(self, cache_key):
+        """Restore the cached results of this analysis, if any. Return True
+        if the results were restored."""
+        local_cache = self._results_cache()
+        cached_stats = None
+        if local_cache is not None:
+            cached_stats = local_cache.restore(cache_key, self.args.infer_out)
+        if cached_stats is None and self.args.remote_cache is not None:
+            cached_stats = self._restore_remote_results(cache_key,
+                                                        local_cache)
+        if cached_stats is None:
+            logging.info('Results cache miss for %s', cache_key)
+            self.stats['int']['results_cache_hits'] = 0
+            self.stats['int']['results_cache_misses'] = 1
+            return False
+        logging.info('Results cache hit for %s', cache_key)
+        for (key, value) in cached_stats.get('int', {}).items():
+            self.stats['int'].setdefault(key, value)
+        self.stats['int']['results_cache_hits'] = 1
+        self.stats['int']['results_cache_misses'] = 0
+        return True
+
+    def cache_results(self, cache_key):
+        stats = {'int': dict((key, value)
+                             for (key, value) in self.stats['int'].items()
+                             if not key.startswith('results_cache_'))}
+        local_cache = self._results_cache()
+        remote_cache = self._remote_cache()
+        try:
+            if local_cache is not None:
+                local_cache.store(cache_key, self.args.infer_out, stats)
+                bundle = local_cache.lookup(cache_key)
+                if remote_cache is not None and bundle is not None:
+                    remote_cache.put_in_background(cache_key, bundle)
+            elif remote_cache is not None:
+                fd, bundle = tempfile.mkstemp(suffix=cache.BUNDLE_EXTENSION)
+                os.close(fd)
+                try:
+                    cache.create_bundle(bundle, self.args.infer_out, stats)
+                    remote_cache.put_in_background(cache_key, bundle)
+                finally:
+                    os.remove(bundle)
+        except (IOError, OSError) as e:
+            logging.warning('Could not store the results in the cache: %s', e)
 
     def print_analysis_stats(self):
         files_total = self.stats['int']['files']
         files_str = utils.get_plural('file', files_total)
         print('Analyzed {}'.format(files_str))
+
+
+def _run_analyzer(args):
+    json_report = os.path.join(args.infer_out, config.JSON_REPORT_FILENAME)
+    # the report of a previous run would hide a failure of this one
+    if os.path.isfile(json_report):
+        os.remove(json_report)
+    analysis = AnalyzerWrapper(args)
+    analysis.analyze_and_report(quiet=True)
+    analysis.save_stats()
+    # the process exits without waiting for its threads
+    remotecache.wait_for_uploads()
+    if not os.path.isfile(json_report):
+        sys.exit(os.EX_SOFTWARE)
+
+
+def analyzer_summary(results_dir, exit_code):
+    """Return the summary of the run of an analyzer that wrote its results
+    into results_dir"""
+    entry = {
+        'results_dir': results_dir,
+        'exit_code': exit_code,
+    }
+    if exit_code == os.EX_OK:
+        # the report may be large, do not load it only to count the issues
+        json_report = os.path.join(results_dir, config.JSON_REPORT_FILENAME)
+        entry['issues'] = sum(
+            1 for _ in reportstream.read_json_array_from_path(json_report))
+    stats_path = os.path.join(results_dir, config.STATS_FILENAME)
+    if os.path.isfile(stats_path):
+        entry['stats'] = utils.load_json_from_path(stats_path)
+    return entry
+
+
+def analyze_and_report_with_analyzers(args, analyzers):
+    """Run several analyzers at the same time on the capture in
+    args.infer_out. Each analyzer runs in its own process and writes its
+    results into the subdirectory of infer_out named after it. The combined
+    report of all the analyzers is written into infer_out, together with a
+    summary of their runs."""
+    if args.memory_budget is not None:
+        # share the memory budget between the analyzers
+        args.memory_budget = max(1, args.memory_budget // len(analyzers))
+    processes = []
+    for analyzer in analyzers:
+        analyzer_args = copy.copy(args)
+        analyzer_args.analyzer = analyzer
+        analyzer_args.infer_out = create_analyzer_results_dir(
+            args.infer_out, analyzer)
+        logging.info('Starting analyzer %s in %s',
+                     analyzer, analyzer_args.infer_out)
+        # analyzers change the working directory and the environment, so
+        # they cannot run in threads of the same process
+        process = multiprocessing.Process(target=_run_analyzer,
+                                          args=(analyzer_args,))
+        process.start()
+        processes.append((analyzer, analyzer_args.infer_out, process))
+
+    summary = {}
+    report_paths = []
+    for (analyzer, results_dir, process) in processes:
+        process.join()
+        if process.exitcode == os.EX_OK:
+            report_paths.append(
+                os.path.join(results_dir, config.JSON_REPORT_FILENAME))
+        else:
+            logging.error('Analyzer %s failed with exit code %s',
+                          analyzer, process.exitcode)
+        summary[analyzer] = analyzer_summary(results_dir, process.exitcode)
+    utils.dump_json_to_path(
+        summary,
+        os.path.join(args.infer_out, config.ANALYZERS_SUMMARY_FILENAME))
+
+    for analyzer in analyzers:
+        entry = summary[analyzer]
+        if 'issues' in entry:
+            print('Analyzer {0}: {1}'.format(
+                analyzer, utils.get_plural('issue', entry['issues'])))
+        else:
+            print('Analyzer {0}: failed'.format(analyzer))
+    save_merged_report(args, report_paths)
+
+
+def save_merged_report(args, report_paths):
+    """Merge the given json reports into the report of args.infer_out, then
+    print the issues and save them into bugs.txt"""
+    json_report = os.path.join(args.infer_out, config.JSON_REPORT_FILENAME)
+    utils.dump_json_to_path(issues.merge_reports_from_paths(report_paths),
+                            json_report)
+    xml_out = None
+    if args.pmd_xml:
+        xml_out = os.path.join(args.infer_out, config.PMD_XML_FILENAME)
+    issues.print_and_save_errors(
+        json_report, os.path.join(args.infer_out, config.BUGS_FILENAME),
+        xml_out)
+
+
+def merge_stats(stats_of_shards):
+    """Combine the statistics of the shards of an analysis. The counts
+    add up, and the durations are the ones of the slowest shard since the
+    shards run at the same time."""
+    merged = {'int': {}, 'float': {}, 'normal': {}, 'clusters': {}}
+    for stats in stats_of_shards:
+        for (key, value) in stats.get('int', {}).items():
+            merged['int'][key] = merged['int'].get(key, 0) + value
+        for (key, value) in stats.get('float', {}).items():
+            merged['float'][key] = max(merged['float'].get(key, 0.0), value)
+        merged['normal'].update(stats.get('normal', {}))
+        merged['clusters'].update(stats.get('clusters', {}))
+    merged['normal'].pop('shard', None)
+    merged['normal']['shards'] = len(stats_of_shards)
+    return merged
+
+
+def merge_shards(args):
+    """Combine the results of the shards of an analysis, in the results
+    directories args.merge_shards, into args.infer_out: the reports, the
+    statistics, the specs and the clusters history"""
+    history_path = os.path.join(args.infer_out,
+                                config.CLUSTERS_HISTORY_FILENAME)
+    history = scheduler.load_history(history_path)
+    specs_dir = os.path.join(args.infer_out, 'specs')
+    utils.mkdir_if_not_exists(specs_dir)
+    report_paths = []
+    stats_of_shards = []
+    for results_dir in args.merge_shards:
+        json_report = os.path.join(results_dir, config.JSON_REPORT_FILENAME)
+        stats_path = os.path.join(results_dir, config.STATS_FILENAME)
+        if not os.path.isfile(json_report) or not os.path.isfile(stats_path):
+            utils.stderr('error: no results of an analysis in {}'
+                         .format(results_dir))
+            exit(os.EX_USAGE)
+        report_paths.append(json_report)
+        stats = utils.load_json_from_path(stats_path)
+        stats_of_shards.append(stats)
+        # only the clusters analyzed by the shard have a new duration
+        shard_history = scheduler.load_history(os.path.join(
+            results_dir, config.CLUSTERS_HISTORY_FILENAME))
+        for entry in stats.get('clusters', {}).values():
+            if entry['source'] in shard_history:
+                history[entry['source']] = shard_history[entry['source']]
+        shard_specs_dir = os.path.join(results_dir, 'specs')
+        if os.path.isdir(shard_specs_dir):
+            for name in os.listdir(shard_specs_dir):
+                # a procedure can be analyzed by several shards when it is
+                # called from each of them
+                if not os.path.exists(os.path.join(specs_dir, name)):
+                    shutil.copyfile(os.path.join(shard_specs_dir, name),
+                                    os.path.join(specs_dir, name))
+    logging.info('Merging the results of %d shards',
+                 len(args.merge_shards))
+    utils.dump_json_to_path(history, history_path)
+    utils.dump_json_to_path(
+        merge_stats(stats_of_shards),
+        os.path.join(args.infer_out, config.STATS_FILENAME))
+    save_merged_report(args, report_paths)
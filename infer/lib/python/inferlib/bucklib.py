@@ -17,7 +17,6 @@ import csv
 import io
 import json
 import logging
-import multiprocessing
 import os
 import platform
 import re
@@ -30,7 +29,7 @@ import time
 import traceback
 import zipfile
 
-from inferlib import analyze, config, issues, utils
+from inferlib import analyze, config, issues, jobserver, utils
 
 
 ANALYSIS_SUMMARY_OUTPUT = 'analysis_summary.txt'
@@ -46,10 +45,12 @@ INFER_STATS = os.path.join(config.BUCK_INFER_OUT, config.STATS_FILENAME)
 
 INFER_SCRIPT = """\
 #!/usr/bin/env {0}
+import os
 import subprocess
 import sys
 
 cmd = {1} + ['--', 'javac'] + sys.argv[1:]
+os.environ.update({2})
 subprocess.check_call(cmd)
 """
 
@@ -101,8 +102,15 @@ def prepare_build(args):
                                      suffix='.py',
                                      dir='.') as infer_script:
         logging.info('Creating %s' % infer_script.name)
+        # buck may not pass our environment down to javac, so forward the
+        # jobserver explicitly to share the CPU budget with the nested
+        # infer instances
+        env = {}
+        if jobserver.JOBSERVER_ENVVAR in os.environ:
+            env[jobserver.JOBSERVER_ENVVAR] = \
+                os.environ[jobserver.JOBSERVER_ENVVAR]
         infer_script.file.write(
-            utils.encode(INFER_SCRIPT.format(sys.executable, infer)))
+            utils.encode(INFER_SCRIPT.format(sys.executable, infer, env)))
 
     st = os.stat(infer_script.name)
     os.chmod(infer_script.name, st.st_mode | stat.S_IEXEC)
@@ -135,16 +143,18 @@ def get_normalized_targets(targets):
 def init_stats(args, start_time):
     """Returns dictionary with target independent statistics.
     """
+    cores, cores_reason = analyze.get_multicore(args)
     return {
         'float': {},
         'int': {
-            'cores': multiprocessing.cpu_count(),
+            'cores': cores,
             'time': int(time.time()),
             'start_time': int(round(start_time)),
         },
         'normal': {
             'debug': str(args.debug),
             'analyzer': args.analyzer,
+            'cores_reason': cores_reason,
             'machine': platform.machine(),
             'node': platform.node(),
             'project': utils.decode(os.path.basename(os.getcwd())),
@@ -0,0 +1,259 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+"""Cache of analysis results, indexed by the content of the capture.
+
+The results of an analysis are stored as a compressed tar bundle of the
+reports, the statistics and the specs, named after a hash of the captured
+files, the analyzer, the version of infer and the options of the analysis.
+When the cache grows larger than its maximum size, the least recently used
+bundles are removed.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import logging
+import os
+import tarfile
+import tempfile
+
+from . import config, specsindex, utils
+
+BUNDLE_EXTENSION = '.tar.gz'
+
+# entries of the results directory stored in a bundle
+BUNDLE_ENTRIES = [
+    config.CSV_REPORT_FILENAME,
+    config.JSON_REPORT_FILENAME,
+    config.PROC_STATS_FILENAME,
+    'procs.csv',
+    'specs',
+]
+
+# the statistics of the analysis, stored in the bundle under this name
+BUNDLE_STATS = config.STATS_FILENAME
+
+# directories of the results directory that make up the capture
+CAPTURE_DIRS = ['attributes', 'captured']
+
+# options of InferAnalyze followed by a specs directory or a jar to search
+# for the specs of library procedures
+LIBRARY_OPTIONS = ['-lib', '-ziplib']
+SPECS_DIR_LIST_FILE_OPTION = '-specs-dir-list-file'
+
+
+def capture_hash(infer_out):
+    """Return a hash of the content of the captured files"""
+    digest = hashlib.sha1()
+    for name in CAPTURE_DIRS:
+        top_dir = os.path.join(infer_out, name)
+        for root, dirs, files in os.walk(top_dir, followlinks=True):
+            dirs.sort()
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                digest.update(utils.encode_or_not(
+                    os.path.relpath(path, infer_out)) + b'\0')
+                try:
+                    with open(path, 'rb') as file_in:
+                        for chunk in iter(lambda: file_in.read(1 << 16),
+                                          b''):
+                            digest.update(chunk)
+                except (IOError, OSError):
+                    pass
+                digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _file_hash(path):
+    """Return a hash of the content of the file at path, or None if there
+    is no such file"""
+    digest = hashlib.sha1()
+    try:
+        with open(path, 'rb') as file_in:
+            for chunk in iter(lambda: file_in.read(1 << 16), b''):
+                digest.update(chunk)
+    except (IOError, OSError):
+        return None
+    return digest.hexdigest()
+
+
+def _library_paths(options):
+    paths = []
+    for (option, value) in zip(options, options[1:]):
+        if option in LIBRARY_OPTIONS:
+            paths.append(value)
+        elif option == SPECS_DIR_LIST_FILE_OPTION:
+            paths.append(value)
+            try:
+                paths += specsindex.read_specs_dir_list_file(value)
+            except IOError:
+                pass
+    return [os.path.abspath(path) for path in paths]
+
+
+def libraries_hash(options, file_index):
+    """Return a hash of the content of the specs directories and jars that
+    InferAnalyze searches with the given options for the specs of library
+    procedures. file_index, a FileIndex of absolute paths, saves hashing
+    the files that did not change again."""
+    digest = hashlib.sha1()
+    for library in _library_paths(options):
+        try:
+            files = sorted(os.path.join(library, name)
+                           for name in os.listdir(library)
+                           if name.endswith(specsindex.SPECS_EXTENSION))
+        except OSError:
+            # a jar or a list file
+            files = [library]
+        for path in files:
+            digest.update(utils.encode_or_not('{0}\0{1}\n'.format(
+                path, file_index.sha1(path))))
+    return digest.hexdigest()
+
+
+def results_key(infer_out, analyzer, options, no_filtering=False,
+                inferconfig=None, libraries=None):
+    """Return the key of the results of analyzing the capture in infer_out
+    with the given analyzer and InferAnalyze options. The reports also
+    depend on whether they are filtered, on the .inferconfig file at the
+    path inferconfig, which configures both the analysis and the filtering,
+    and on the library specs, whose hash is libraries, see
+    libraries_hash."""
+    key = json.dumps({
+        'capture': capture_hash(infer_out),
+        'analyzer': analyzer,
+        'infer_version': utils.infer_version(),
+        'options': options,
+        'no_filtering': bool(no_filtering),
+        'inferconfig': _file_hash(inferconfig) if inferconfig else None,
+        'libraries': libraries,
+    }, sort_keys=True)
+    return hashlib.sha1(utils.encode(key)).hexdigest()
+
+
+def create_bundle(path, infer_out, stats):
+    """Write the results in infer_out and the given statistics into a new
+    bundle at path"""
+    stats_file = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+    try:
+        with stats_file:
+            stats_file.write(utils.encode(json.dumps(stats)))
+        with tarfile.open(path, 'w:gz') as bundle:
+            for name in BUNDLE_ENTRIES:
+                entry = os.path.join(infer_out, name)
+                if os.path.exists(entry):
+                    bundle.add(entry, arcname=name)
+            bundle.add(stats_file.name, arcname=BUNDLE_STATS)
+    finally:
+        os.remove(stats_file.name)
+
+
+def _is_safe_member(member):
+    name = os.path.normpath(member.name)
+    return (member.isfile() or member.isdir()) and \
+        not os.path.isabs(name) and name != '..' and \
+        not name.startswith('..' + os.sep)
+
+
+def extract_bundle(path, infer_out):
+    """Restore the results of a bundle into infer_out, and return the
+    statistics stored in it"""
+    with tarfile.open(path, 'r:gz') as bundle:
+        members = bundle.getmembers()
+        unsafe = [member.name for member in members
+                  if not _is_safe_member(member)]
+        if unsafe:
+            raise tarfile.TarError('unexpected entries in {}: {}'.format(
+                path, ', '.join(unsafe)))
+        stats = json.loads(utils.decode(
+            bundle.extractfile(BUNDLE_STATS).read()))
+        bundle.extractall(infer_out, [member for member in members
+                                      if member.name != BUNDLE_STATS])
+    return stats
+
+
+class ResultsCache(object):
+    """Cache of analysis results in a local directory, holding at most
+    max_size bytes of bundles"""
+
+    def __init__(self, cache_dir, max_size):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        utils.mkdir_if_not_exists(cache_dir)
+
+    def _bundle_path(self, key):
+        return os.path.join(self.cache_dir, key + BUNDLE_EXTENSION)
+
+    def lookup(self, key):
+        """Return the path to the bundle of key, or None if it is not in
+        the cache"""
+        path = self._bundle_path(key)
+        try:
+            # mark the bundle as recently used
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def restore(self, key, infer_out):
+        """Restore the results of key into infer_out, and return their
+        statistics, or None if they are not in the cache"""
+        path = self.lookup(key)
+        if path is None:
+            return None
+        try:
+            return extract_bundle(path, infer_out)
+        except (IOError, OSError, ValueError, tarfile.TarError) as e:
+            logging.warning('Ignoring invalid cached results %s: %s', path, e)
+            return None
+
+    def add(self, key, bundle):
+        """Move a bundle into the cache, then shrink the cache down to its
+        maximum size"""
+        os.rename(bundle, self._bundle_path(key))
+        self.evict()
+
+    def store(self, key, infer_out, stats):
+        """Store the results in infer_out and their statistics"""
+        # write the bundle next to its final location, so that it can be
+        # renamed atomically and concurrent runs never see a partial bundle
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir,
+                                        suffix=BUNDLE_EXTENSION + '.tmp')
+        os.close(fd)
+        try:
+            create_bundle(tmp_path, infer_out, stats)
+            self.add(key, tmp_path)
+        except:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def evict(self):
+        bundles = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(BUNDLE_EXTENSION):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            bundles.append((st.st_mtime, st.st_size, name))
+        total = sum(size for (_, size, _) in bundles)
+        for (_, size, name) in sorted(bundles):
+            if total <= self.max_size:
+                break
+            logging.info('Evicting %s from the results cache', name)
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= size
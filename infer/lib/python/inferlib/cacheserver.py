@@ -0,0 +1,142 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+"""Reference server for the remote results cache, see remotecache.py.
+
+Usage: python -m inferlib.cacheserver --dir <cache dir> [--port <port>]
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import BaseHTTPServer
+import os
+import re
+import shutil
+import SocketServer
+import tempfile
+
+from . import cache
+
+# bundles larger than this are rejected
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+# only /<version>/<key>.tar.gz paths are served
+PATH_RE = re.compile(r'^/([0-9A-Za-z._-]+)/([0-9A-Za-z_-]+' +
+                     re.escape(cache.BUNDLE_EXTENSION) + r')$')
+
+CHUNK_SIZE = 1 << 16
+
+
+class CacheRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def _bundle_path(self):
+        match = PATH_RE.match(self.path)
+        if match is None or match.group(1) in ['.', '..']:
+            self.send_error(400, 'Bad path')
+            return None
+        return os.path.join(self.server.cache_dir,
+                            match.group(1), match.group(2))
+
+    def do_GET(self):
+        path = self._bundle_path()
+        if path is None:
+            return
+        try:
+            file_in = open(path, 'rb')
+        except IOError:
+            self.send_error(404, 'Not found')
+            return
+        with file_in:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length',
+                             str(os.fstat(file_in.fileno()).st_size))
+            self.end_headers()
+            shutil.copyfileobj(file_in, self.wfile, CHUNK_SIZE)
+
+    def do_PUT(self):
+        path = self._bundle_path()
+        if path is None:
+            return
+        try:
+            length = int(self.headers.getheader('Content-Length'))
+        except (TypeError, ValueError):
+            self.send_error(411, 'Length required')
+            return
+        if length > self.server.max_size:
+            self.send_error(413, 'Bundle too large')
+            return
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                pass
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file_out:
+                remaining = length
+                while remaining > 0:
+                    chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    file_out.write(chunk)
+                    remaining -= len(chunk)
+            if remaining > 0:
+                os.remove(tmp_path)
+                self.send_error(400, 'Incomplete bundle')
+                return
+            os.rename(tmp_path, path)
+        except:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class CacheServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, address, cache_dir, max_size=DEFAULT_MAX_SIZE):
+        BaseHTTPServer.HTTPServer.__init__(self, address, CacheRequestHandler)
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serve the bundles of the infer results cache')
+    parser.add_argument('--dir', required=True,
+                        help='Directory to store the bundles in')
+    parser.add_argument('--host', default='localhost',
+                        help='Address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8080,
+                        help='Port to listen on (default: %(default)s)')
+    parser.add_argument('--max-size', metavar='<MB>', type=int,
+                        default=DEFAULT_MAX_SIZE // (1024 * 1024),
+                        help='Reject bundles larger than <MB> megabytes '
+                        '(default: %(default)s)')
+    args = parser.parse_args()
+    server = CacheServer((args.host, args.port), args.dir,
+                         args.max_size * 1024 * 1024)
+    print('Serving {0} on http://{1}:{2}'.format(args.dir, args.host,
+                                                  server.server_port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
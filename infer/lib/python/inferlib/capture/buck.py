@@ -17,7 +17,7 @@ import os
 import subprocess
 import traceback
 
-from inferlib import config, issues, utils, bucklib
+from inferlib import analyze, config, issues, utils, bucklib
 from . import util
 
 MODULE_NAME = __name__
@@ -170,7 +170,7 @@ class BuckAnalyzer:
         env_vars['FCP_RUN_SYNTAX_ONLY'] = '1'
         env = utils.encode_env(env_vars)
         command = self.cmd
-        command += ['-j', str(self.args.multicore)]
+        command += ['-j', str(analyze.get_multicore(self.args)[0])]
         if self.args.load_average is not None:
             command += ['-L', str(self.args.load_average)]
         command += self.create_cxx_buck_configuration_args()
@@ -10,6 +10,7 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import os
 import sys
 
 try:
@@ -52,21 +53,41 @@ class Invalid_mode(Exception):
     pass
 
 
-def syntax_highlighting(source_name, mode, s):
-    if pygments is None or mode == PLAIN_FORMATTER:
-        return s
+# lexers by file name, or None when pygments has none. pygments matches the
+# whole name of some files, e.g. CMakeLists.txt, so the extension is not
+# enough to tell the lexer.
+_lexers = {}
+_terminal_formatter = None
 
-    try:
-        lexer = pygments.lexers.get_lexer_for_filename(source_name)
-    except pygments.lexers.ClassNotFound:
-        return s
 
-    formatter = None
-    if mode == TERMINAL_FORMATTER:
-        if not sys.stdout.isatty():
-            return s
-        formatter = pygments.formatters.TerminalFormatter()
-    return pygments.highlight(s, lexer, formatter)
+def _lexer(source_name):
+    name = os.path.basename(source_name)
+    if name not in _lexers:
+        try:
+            # keep the leading and trailing empty lines, so that each line of
+            # the output comes from the same line of the input
+            _lexers[name] = pygments.lexers.get_lexer_for_filename(
+                name, stripnl=False)
+        except pygments.lexers.ClassNotFound:
+            _lexers[name] = None
+    return _lexers[name]
+
+
+def can_highlight(source_name, mode):
+    """Whether syntax_highlighting changes the text of source_name"""
+    return (pygments is not None and
+            mode == TERMINAL_FORMATTER and
+            sys.stdout.isatty() and
+            _lexer(source_name) is not None)
+
+
+def syntax_highlighting(source_name, mode, s):
+    global _terminal_formatter
+    if not can_highlight(source_name, mode):
+        return s
+    if _terminal_formatter is None:
+        _terminal_formatter = pygments.formatters.TerminalFormatter()
+    return pygments.highlight(s, _lexer(source_name), _terminal_formatter)
 
 
 def color(s, color, mode):
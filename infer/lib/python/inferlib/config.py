@@ -43,6 +43,16 @@ DEFAULT_INFER_OUT = os.path.join(os.getcwd().decode(CODESET), 'infer-out')
 CSV_PERF_FILENAME = 'performances.csv'
 STATS_FILENAME = 'stats.json'
 PROC_STATS_FILENAME = 'proc_stats.json'
+CLUSTERS_HISTORY_FILENAME = 'clusters_history.json'
+STRAGGLERS_FILENAME = 'stragglers.json'
+ANALYSIS_JOURNAL_FILENAME = 'analysis_journal.txt'
+ANALYZERS_SUMMARY_FILENAME = 'analyzers.json'
+WARM_START_MANIFEST_FILENAME = 'warm_start.json'
+SOURCE_INDEX_FILENAME = 'source_index.json'
+LIBRARY_INDEX_FILENAME = 'library_index.json'
+CHANGED_FILES_FILENAME = 'changed_files.txt'
+SPECS_INDEX_DIRNAME = 'specs_library'
+EARLY_REPORT_FILENAME = 'early_report.json'
 
 CSV_REPORT_FILENAME = 'report.csv'
 JSON_REPORT_FILENAME = 'report.json'
@@ -50,6 +60,7 @@ INFER_BUCK_DEPS_FILENAME = 'infer-deps.txt'
 BUGS_FILENAME = 'bugs.txt'
 JAVAC_FILELISTS_FILENAME = 'filelists'
 PMD_XML_FILENAME = 'report.xml'
+INFERCONFIG_FILENAME = '.inferconfig'
 
 IOS_CAPTURE_ERRORS = 'errors'
 IOS_BUILD_OUTPUT = 'build_output'
@@ -0,0 +1,114 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+"""Print the issues of the changed source files during the analysis.
+
+With --changed-first, the clusters of the source files changed since the
+last analysis run before the others. Each time some of them finish,
+InferPrint reports on the specs computed so far, and the issues of the
+changed files that were not printed yet are printed right away. The full
+report is still created at the end of the analysis.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import os
+import subprocess
+import threading
+import time
+
+from . import config, issues, utils, warmstart
+
+
+class EarlyReporter(object):
+    """Report the issues of the changed captured directories while their
+    clusters finish"""
+
+    def __init__(self, args, changed_dirs):
+        self.args = args
+        self.changed_dirs = set(changed_dirs)
+        self.pending = set(changed_dirs)
+        self.printed = set()
+        self.issue_filter = issues.IssueFilter(args.analyzer,
+                                               args.no_filtering)
+        self.start_time = time.time()
+        self.report_path = os.path.join(args.infer_out,
+                                        config.EARLY_REPORT_FILENAME)
+        self._lock = threading.Lock()
+        self._thread = None
+        # whether clusters finished since the last report started
+        self._outdated = False
+
+    def cluster_done(self, source_name):
+        if source_name not in self.pending:
+            return
+        with self._lock:
+            self.pending.discard(source_name)
+            self._outdated = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._report_loop)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _report_loop(self):
+        while True:
+            with self._lock:
+                if not self._outdated:
+                    self._thread = None
+                    return
+                self._outdated = False
+                last = not self.pending
+            try:
+                self.report(last)
+            except (subprocess.CalledProcessError, IOError, OSError,
+                    ValueError) as e:
+                # the full report at the end does not depend on this one
+                logging.warning('Could not report the issues early: %s', e)
+
+    def report(self, last):
+        subprocess.check_call([
+            utils.get_cmd_in_bin_dir('InferPrint'), '-q',
+            '-results_dir', self.args.infer_out,
+            '-bugs_json', self.report_path,
+            '-analyzer', self.args.analyzer])
+        new_issues = self.new_issues(
+            utils.load_json_from_path(self.report_path))
+        logging.info('Early report after %.2fs: %d new issues in the '
+                     'changed files', utils.elapsed_time(self.start_time),
+                     len(new_issues))
+        if new_issues or last:
+            utils.stdout('Issues in the changed files{}:'.format(
+                '' if last else ' so far'))
+            issues.print_issues(new_issues)
+
+    def new_issues(self, rows):
+        """Return the issues of the changed files among rows, a json
+        report, that were not printed yet, and record them as printed"""
+        new_issues = []
+        for row in rows:
+            key = issues.issue_key(row)
+            if key in self.printed or \
+               warmstart.captured_dir_name(row[issues.JSON_INDEX_FILENAME]) \
+               not in self.changed_dirs or \
+               not self.issue_filter.keep_json(row):
+                continue
+            self.printed.add(key)
+            new_issues.append(row)
+        return new_issues
+
+    def wait(self):
+        """Wait for the reports in progress"""
+        while True:
+            with self._lock:
+                thread = self._thread
+            if thread is None:
+                return
+            thread.join()
@@ -0,0 +1,124 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+"""Index of the source files analyzed in a results directory.
+
+The index records the size, modification time and sha1 of the content of each
+analyzed source file, and the captured source directories that existed at
+the time. A file is only hashed again when its size or modification time
+changed, so that checking which files changed is cheap, and does not depend
+on the modification times of the files being preserved, e.g. by version
+control checkouts.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import hashlib
+import os
+
+from . import utils
+
+
+def hash_file(path):
+    """Return the sha1 of the content of a file, or None if it cannot be
+    read"""
+    digest = hashlib.sha1()
+    try:
+        with open(path, 'rb') as file_in:
+            for chunk in iter(lambda: file_in.read(1 << 16), b''):
+                digest.update(chunk)
+    except (IOError, OSError):
+        return None
+    return digest.hexdigest()
+
+
+def captured_dirs(infer_out):
+    """Return the names of the captured source directories"""
+    captured_dir = os.path.join(infer_out, 'captured')
+    try:
+        return sorted(name for name in os.listdir(captured_dir)
+                      if os.path.isdir(os.path.join(captured_dir, name)))
+    except OSError:
+        return []
+
+
+class FileIndex(object):
+
+    def __init__(self, root, files=None, captured_dirs=None):
+        # source file paths are relative to root, unless absolute
+        self.root = root
+        self.files = files or {}
+        # None when the index has never been saved
+        self.captured_dirs = captured_dirs
+
+    def sha1(self, path):
+        """Return the sha1 of the current content of a file, or None if it
+        does not exist, and update its entry"""
+        abs_path = os.path.join(self.root, path)
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            self.files.pop(path, None)
+            return None
+        entry = self.files.get(path)
+        if entry is not None and entry['size'] == st.st_size and \
+           entry['mtime'] == st.st_mtime:
+            return entry['sha1']
+        sha1 = hash_file(abs_path)
+        self.files[path] = {
+            'size': st.st_size,
+            'mtime': st.st_mtime,
+            'sha1': sha1,
+        }
+        return sha1
+
+    def changed_files(self):
+        """Return the indexed files whose content changed or that were
+        removed since they were indexed, and update their entries"""
+        changed = []
+        for (path, entry) in sorted(self.files.items()):
+            if self.sha1(path) != entry['sha1']:
+                changed.append(path)
+        return changed
+
+    def update(self, paths, infer_out):
+        """Index the given files and the current captured directories"""
+        for path in paths:
+            self.sha1(path)
+        self.captured_dirs = captured_dirs(infer_out)
+
+    def save(self, path):
+        utils.dump_json_to_path({
+            'root': self.root,
+            'files': self.files,
+            'captured_dirs': self.captured_dirs,
+        }, path)
+
+
+def load(path, root):
+    """Return the index saved at path, or an empty index if there is none or
+    if it was created for a different root"""
+    try:
+        data = utils.load_json_from_path(path)
+    except (IOError, ValueError):
+        return FileIndex(root)
+    if data.get('root') != root:
+        return FileIndex(root)
+    return FileIndex(root, data['files'], data['captured_dirs'])
+
+
+def unanalyzed_changes(path, root):
+    """Return the files that changed since the last analysis saved its index
+    at path, with the sha1 of their current content, None for the removed
+    ones. The saved index is left untouched, so that these files are still
+    seen as changed until an analysis succeeds."""
+    index = load(path, root)
+    return dict((changed, index.files.get(changed, {}).get('sha1'))
+                for changed in index.changed_files())
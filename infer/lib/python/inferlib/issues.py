@@ -10,9 +10,9 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-import codecs
 import csv
 import datetime
+import io
 import itertools
 import json
 import operator
@@ -28,7 +28,7 @@ try:
 except ImportError:
     etree = None
 
-from . import colorize, config, source, utils
+from . import colorize, config, reportstream, source, utils
 
 
 # Increase the limit of the CSV parser to sys.maxlimit
@@ -120,48 +120,129 @@ QUALIFIER_TAGS = 'qualifier_tags'
 BUCKET_TAGS = 'bucket'
 ISSUE_TYPES_URL = 'http://fbinfer.com/docs/infer-issue-types.html#'
 
-
-def clean_csv(args, csv_report):
-    collected_rows = []
+# bytes of the text of the issues kept in memory before spilling to disk
+TEXT_REPORT_MEMORY = 1 << 24
+
+_REPORT_ALL_ANALYZERS = frozenset([
+    config.ANALYZER_ERADICATE,
+    config.ANALYZER_CHECKERS,
+    config.ANALYZER_TRACING,
+])
+_REPORTED_KINDS = frozenset([
+    ISSUE_KIND_ERROR,
+    ISSUE_KIND_WARNING,
+    ISSUE_KIND_ADVICE,
+])
+_REPORTED_ISSUE_TYPES = frozenset(ISSUE_TYPES)
+_NULL_STYLE_ISSUE_TYPES = frozenset(NULL_STYLE_ISSUE_TYPES)
+_NULL_STYLE_BUCKETS = frozenset(['B1', 'B2'])
+
+# InferPrint writes the qualifier tags on a single line, with one element
+# per tag and the values escaped, see Io_infer.Xml.pp_document. Such flat
+# documents are read with regular expressions, anything else is parsed.
+_FLAT_QUALIFIER_TAGS_XML = re.compile(
+    r'<{0}>(?:<([\w.-]+)>[^<&]*</\1>)*</{0}>\Z'.format(QUALIFIER_TAGS))
+_BUCKET_XML = re.compile(r'<{0}>([^<&]*)</{0}>'.format(BUCKET_TAGS))
+
+
+class _FileCache(dict):
+    """Whether each path is a file, checked once per path"""
+
+    def __missing__(self, path):
+        is_file = os.path.isfile(path)
+        self[path] = is_file
+        return is_file
+
+
+class IssueFilter(object):
+    """The rules deciding which issues of the reports of analyzer are kept,
+    compiled once. The existence of each source file is only checked once,
+    in files."""
+
+    def __init__(self, analyzer, no_filtering=False, files=None):
+        self.report_all = no_filtering or analyzer in _REPORT_ALL_ANALYZERS
+        self.files = files if files is not None else _FileCache()
+
+    def _should_report(self, error_kind, error_type, bucket_of):
+        if error_kind not in _REPORTED_KINDS:
+            return False
+        if error_type in _NULL_STYLE_ISSUE_TYPES:
+            # only look for the bucket when it matters
+            return bucket_of() in _NULL_STYLE_BUCKETS
+        return error_type in _REPORTED_ISSUE_TYPES
+
+    def keep_csv(self, row):
+        """Whether an issue of the csv report is kept by clean_csv"""
+        return self.files[row[CSV_INDEX_FILENAME]] and (
+            self.report_all or
+            self._should_report(
+                row[CSV_INDEX_KIND], row[CSV_INDEX_TYPE],
+                lambda: _bucket_of_xml(row[CSV_INDEX_QUALIFIER_TAGS])))
+
+    def keep_json(self, row):
+        """Whether an issue of the json report is kept by clean_json"""
+        return self.files[row[JSON_INDEX_FILENAME]] and (
+            self.report_all or
+            self._should_report(
+                row[JSON_INDEX_KIND], row[JSON_INDEX_TYPE],
+                lambda: _bucket_of_json(row[QUALIFIER_TAGS])))
+
+
+def clean_csv(issue_filter, csv_report, streaming=False):
+    """Filter the issues of the csv report with issue_filter and sort them
+    in place, in bounded memory if streaming is True. Return the number of
+    issues of each type that were kept."""
+    counts = {}
     with open(csv_report, 'r') as file_in:
         reader = csv.reader(file_in)
-        rows = [row for row in reader]
-        if len(rows) <= 1:
-            return rows
+        header = next(reader, None)
+        if header is None:
+            return counts
+        rows = itertools.ifilter(issue_filter.keep_csv, reader)
+        key = operator.itemgetter(CSV_INDEX_FILENAME, CSV_INDEX_LINE)
+        if streaming:
+            rows = reportstream.external_sort(rows, key)
         else:
-            for row in rows[1:]:
-                filename = row[CSV_INDEX_FILENAME]
-                if os.path.isfile(filename):
-                    if args.no_filtering \
-                       or _should_report_csv(args.analyzer, row):
-                        collected_rows.append(row)
-            collected_rows.sort(key=operator.itemgetter(CSV_INDEX_FILENAME,
-                                                        CSV_INDEX_LINE))
-            collected_rows = [rows[0]] + collected_rows
-    temporary_file = tempfile.mktemp()
-    with open(temporary_file, 'w') as file_out:
-        writer = csv.writer(file_out)
-        writer.writerows(collected_rows)
-        file_out.flush()
-        shutil.move(temporary_file, csv_report)
-
-
-def clean_json(args, json_report):
-    rows = utils.load_json_from_path(json_report)
-
-    def is_clean(row):
-        filename = row[JSON_INDEX_FILENAME]
-        return (os.path.isfile(filename) and
-                (args.no_filtering or
-                 _should_report_json(args.analyzer, row)))
-
-    rows = filter(is_clean, rows)
-    rows.sort(key=operator.itemgetter(JSON_INDEX_FILENAME,
-                                      JSON_INDEX_LINE))
-    temporary_file = tempfile.mktemp()
-    utils.dump_json_to_path(rows, temporary_file)
+            rows = sorted(rows, key=key)
+        fd, temporary_file = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as file_out:
+            writer = csv.writer(file_out)
+            writer.writerow(header)
+            for row in rows:
+                writer.writerow(row)
+                issue_type = utils.decode(row[CSV_INDEX_TYPE])
+                counts[issue_type] = counts.get(issue_type, 0) + 1
+    shutil.move(temporary_file, csv_report)
+    return counts
+
+
+def clean_json(issue_filter, json_report, streaming=False, errors=None):
+    """Filter the issues of the json report with issue_filter and sort them
+    in place, in bounded memory if streaming is True. The issues kept are
+    also added to errors, an ErrorsReport, in the order of the report."""
+    if streaming:
+        rows = reportstream.read_json_array_from_path(json_report)
+    else:
+        rows = utils.load_json_from_path(json_report)
+    rows = itertools.ifilter(issue_filter.keep_json, rows)
+    key = operator.itemgetter(JSON_INDEX_FILENAME, JSON_INDEX_LINE)
+    fd, temporary_file = tempfile.mkstemp()
+    os.close(fd)
+    if streaming:
+        with reportstream.JsonArrayWriter(temporary_file) as writer:
+            for row in reportstream.external_sort(rows, key):
+                writer.write(row)
+                if errors is not None:
+                    errors.add(row)
+    else:
+        rows = sorted(rows, key=key)
+        if errors is not None:
+            for row in rows:
+                errors.add(row)
+        utils.dump_json_to_path(rows, temporary_file)
     shutil.move(temporary_file, json_report)
 
+
 def _text_of_infer_loc(loc):
     return ' ({}:{}:{}-{}:)'.format(
         loc[JSON_INDEX_ISL_FILE],
@@ -190,12 +271,23 @@ def text_of_report(report):
     )
 
 
-def _text_of_report_list(reports, formatter=colorize.TERMINAL_FORMATTER):
-    text_errors_list = []
-    error_types_count = {}
-    for report in reports:
+class _TextReport(object):
+    """Text of a list of issues, built one issue at a time. The text of
+    each issue is appended to a temporary file as soon as it is added. The
+    source context of the issues is read through source_index."""
+
+    def __init__(self, formatter, source_index):
+        self.formatter = formatter
+        self.source_index = source_index
+        self.issues = tempfile.SpooledTemporaryFile(
+            max_size=TEXT_REPORT_MEMORY)
+        self.error_types_count = {}
+        self.n_issues = 0
+
+    def add(self, report):
         filename = report[JSON_INDEX_FILENAME]
         line = report[JSON_INDEX_LINE]
+        formatter = self.formatter
 
         source_context = ''
         if formatter == colorize.TERMINAL_FORMATTER:
@@ -203,6 +295,7 @@ def _text_of_report_list(reports, formatter=colorize.TERMINAL_FORMATTER):
                 filename,
                 formatter,
                 line,
+                self.source_index,
             )
             indenter = source.Indenter() \
                              .indent_push() \
@@ -217,73 +310,131 @@ def _text_of_report_list(reports, formatter=colorize.TERMINAL_FORMATTER):
         elif report[JSON_INDEX_KIND] == ISSUE_KIND_ADVICE:
             msg = colorize.color(msg, colorize.ADVICE, formatter)
         text = '%s%s' % (msg, source_context)
-        text_errors_list.append(text)
+        if self.n_issues > 0:
+            self.issues.write(b'\n\n')
+        self.issues.write(utils.encode(text))
+        self.n_issues += 1
 
         t = report[JSON_INDEX_TYPE]
         # assert failures are not very informative without knowing
         # which assertion failed
         if t == 'Assert_failure' and JSON_INDEX_INFER_SOURCE_LOC in report:
             t += _text_of_infer_loc(report[JSON_INDEX_INFER_SOURCE_LOC])
-        if t not in error_types_count:
-            error_types_count[t] = 1
+        if t not in self.error_types_count:
+            self.error_types_count[t] = 1
         else:
-            error_types_count[t] += 1
+            self.error_types_count[t] += 1
+
+    def write(self, file_out):
+        """Write the encoded text into file_out"""
+        formatter = self.formatter
+        if self.n_issues == 0:
+            if formatter == colorize.TERMINAL_FORMATTER:
+                out = colorize.color('  No issues found  ',
+                                     colorize.SUCCESS, formatter)
+                file_out.write(utils.encode(out + '\n'))
+            else:
+                file_out.write(utils.encode('No issues found'))
+            return
+
+        max_type_length = max(map(len, self.error_types_count.keys())) + 2
+        sorted_error_types = self.error_types_count.items()
+        sorted_error_types.sort(key=operator.itemgetter(1), reverse=True)
+        types_text_list = map(lambda (t, count): '%s: %d' % (
+            t.rjust(max_type_length),
+            count,
+        ), sorted_error_types)
+
+        issues_found = 'Found {n_issues}'.format(
+            n_issues=utils.get_plural('issue', self.n_issues),
+        )
+        file_out.write(utils.encode('{issues_found}\n\n'.format(
+            issues_found=colorize.color(issues_found,
+                                        colorize.HEADER,
+                                        formatter))))
+        self.issues.seek(0)
+        shutil.copyfileobj(self.issues, file_out)
+        file_out.write(utils.encode('\n\n{header}\n\n{summary}'.format(
+            header=colorize.color('Summary of the reports',
+                                  colorize.HEADER, formatter),
+            summary='\n'.join(types_text_list),
+        )))
+
+    def text(self):
+        text_out = io.BytesIO()
+        self.write(text_out)
+        return utils.decode(text_out.getvalue())
 
-    n_issues = len(text_errors_list)
-    if n_issues == 0:
-        if formatter == colorize.TERMINAL_FORMATTER:
-            out = colorize.color('  No issues found  ',
-                                 colorize.SUCCESS, formatter)
-            return out + '\n'
-        else:
-            return 'No issues found'
 
-    max_type_length = max(map(len, error_types_count.keys())) + 2
-    sorted_error_types = error_types_count.items()
-    sorted_error_types.sort(key=operator.itemgetter(1), reverse=True)
-    types_text_list = map(lambda (t, count): '%s: %d' % (
-        t.rjust(max_type_length),
-        count,
-    ), sorted_error_types)
-
-    text_errors = '\n\n'.join(text_errors_list)
-
-    issues_found = 'Found {n_issues}'.format(
-        n_issues=utils.get_plural('issue', n_issues),
-    )
-    msg = '{issues_found}\n\n{issues}\n\n{header}\n\n{summary}'.format(
-        issues_found=colorize.color(issues_found,
-                                    colorize.HEADER,
-                                    formatter),
-        issues=text_errors,
-        header=colorize.color('Summary of the reports',
-                              colorize.HEADER, formatter),
-        summary='\n'.join(types_text_list),
-    )
-    return msg
+def _text_of_report_list(reports, formatter=colorize.TERMINAL_FORMATTER):
+    source_index = source.SourceIndex()
+    try:
+        text_report = _TextReport(formatter, source_index)
+        for report in reports:
+            text_report.add(report)
+    finally:
+        source_index.close()
+    return text_report.text()
 
 
-def _is_user_visible(report):
+def _is_user_visible(report, files):
     filename = report[JSON_INDEX_FILENAME]
     kind = report[JSON_INDEX_KIND]
-    return (os.path.isfile(filename) and
-            kind in [ISSUE_KIND_ERROR, ISSUE_KIND_WARNING, ISSUE_KIND_ADVICE])
+    return files[filename] and kind in _REPORTED_KINDS
+
+
+def print_issues(reports):
+    """Print the user-visible issues of a json report"""
+    files = _FileCache()
+    utils.stdout('\n' + _text_of_report_list(
+        [report for report in reports if _is_user_visible(report, files)]))
+
+
+class ErrorsReport(object):
+    """The text of the user-visible issues for the terminal and for
+    bugs_out, and their PMD XML if xml_out is not None, built in a single
+    pass over the issues"""
+
+    def __init__(self, bugs_out, xml_out=None):
+        self.bugs_out = bugs_out
+        self.xml_out = xml_out
+        # shared with the IssueFilter of the report, if any
+        self.files = _FileCache()
+        self.source_index = source.SourceIndex()
+        self.terminal_text = _TextReport(colorize.TERMINAL_FORMATTER,
+                                         self.source_index)
+        self.plain_text = _TextReport(colorize.PLAIN_FORMATTER,
+                                      self.source_index)
+        self.pmd_xml = None
+        if xml_out is not None:
+            self.pmd_xml = _pmd_xml_root()
+
+    def add(self, report):
+        if not _is_user_visible(report, self.files):
+            return
+        self.terminal_text.add(report)
+        self.plain_text.add(report)
+        if self.pmd_xml is not None:
+            self.pmd_xml.append(_pmd_xml_of_issue(report))
+
+    def print_and_save(self):
+        self.source_index.close()
+        sys.stdout.write(b'\n')
+        self.terminal_text.write(sys.stdout)
+        sys.stdout.write(b'\n')
+        with open(self.bugs_out, 'wb') as file_out:
+            self.plain_text.write(file_out)
+        if self.pmd_xml is not None:
+            with open(self.xml_out, 'wb') as file_out:
+                file_out.write(etree.tostring(self.pmd_xml, pretty_print=True,
+                                              encoding=config.CODESET))
 
 
 def print_and_save_errors(json_report, bugs_out, xml_out):
-    errors = utils.load_json_from_path(json_report)
-    errors = filter(_is_user_visible, errors)
-    utils.stdout('\n' + _text_of_report_list(errors))
-    plain_out = _text_of_report_list(errors,
-                                     formatter=colorize.PLAIN_FORMATTER)
-    with codecs.open(bugs_out, 'w',
-                     encoding=config.CODESET, errors='replace') as file_out:
-        file_out.write(plain_out)
-    if xml_out is not None:
-        with codecs.open(xml_out, 'w',
-                         encoding=config.CODESET,
-                         errors='replace') as file_out:
-            file_out.write(_pmd_xml_of_issues(errors))
+    errors = ErrorsReport(bugs_out, xml_out)
+    for report in reportstream.read_json_array_from_path(json_report):
+        errors.add(report)
+    errors.print_and_save()
 
 
 def merge_reports_from_paths(report_paths):
@@ -293,7 +444,7 @@ def merge_reports_from_paths(report_paths):
     return _sort_and_uniq_rows(json_data)
 
 
-def _pmd_xml_of_issues(issues):
+def _pmd_xml_root():
     if etree is None:
         print('ERROR: "etree" Python package not found.')
         print('ERROR: You need to install it to use Infer with --pmd-xml')
@@ -301,103 +452,76 @@ def _pmd_xml_of_issues(issues):
     root = etree.Element('pmd')
     root.attrib['version'] = '5.4.1'
     root.attrib['date'] = datetime.datetime.now().isoformat()
-    for issue in issues:
-        fully_qualifed_method_name = re.search('(.*)\(.*',
-                                               issue[JSON_INDEX_PROCEDURE_ID])
-        class_name = ''
-        package = ''
-        if fully_qualifed_method_name is not None:
-            # probably Java
-            info = fully_qualifed_method_name.groups()[0].split('.')
-            class_name = info[-2:-1][0]
-            method = info[-1]
-            package = '.'.join(info[0:-2])
-        else:
-            method = issue[JSON_INDEX_PROCEDURE]
-        file_node = etree.Element('file')
-        file_node.attrib['name'] = issue[JSON_INDEX_FILENAME]
-        violation = etree.Element('violation')
-        violation.attrib['begincolumn'] = '0'
-        violation.attrib['beginline'] = str(issue[JSON_INDEX_LINE])
-        violation.attrib['endcolumn'] = '0'
-        violation.attrib['endline'] = str(issue[JSON_INDEX_LINE] + 1)
-        violation.attrib['class'] = class_name
-        violation.attrib['method'] = method
-        violation.attrib['package'] = package
-        violation.attrib['priority'] = '1'
-        violation.attrib['rule'] = issue[JSON_INDEX_TYPE]
-        violation.attrib['ruleset'] = 'Infer Rules'
-        violation.attrib['externalinfourl'] = (
-            ISSUE_TYPES_URL + issue[JSON_INDEX_TYPE])
-        violation.text = issue[JSON_INDEX_QUALIFIER]
-        file_node.append(violation)
-        root.append(file_node)
-    return etree.tostring(root, pretty_print=True, encoding=config.CODESET)
+    return root
+
+
+def _pmd_xml_of_issue(issue):
+    fully_qualifed_method_name = re.search('(.*)\(.*',
+                                           issue[JSON_INDEX_PROCEDURE_ID])
+    class_name = ''
+    package = ''
+    if fully_qualifed_method_name is not None:
+        # probably Java
+        info = fully_qualifed_method_name.groups()[0].split('.')
+        class_name = info[-2:-1][0]
+        method = info[-1]
+        package = '.'.join(info[0:-2])
+    else:
+        method = issue[JSON_INDEX_PROCEDURE]
+    file_node = etree.Element('file')
+    file_node.attrib['name'] = issue[JSON_INDEX_FILENAME]
+    violation = etree.Element('violation')
+    violation.attrib['begincolumn'] = '0'
+    violation.attrib['beginline'] = str(issue[JSON_INDEX_LINE])
+    violation.attrib['endcolumn'] = '0'
+    violation.attrib['endline'] = str(issue[JSON_INDEX_LINE] + 1)
+    violation.attrib['class'] = class_name
+    violation.attrib['method'] = method
+    violation.attrib['package'] = package
+    violation.attrib['priority'] = '1'
+    violation.attrib['rule'] = issue[JSON_INDEX_TYPE]
+    violation.attrib['ruleset'] = 'Infer Rules'
+    violation.attrib['externalinfourl'] = (
+        ISSUE_TYPES_URL + issue[JSON_INDEX_TYPE])
+    violation.text = issue[JSON_INDEX_QUALIFIER]
+    file_node.append(violation)
+    return file_node
+
+
+# identifies an issue across reports
+issue_key = operator.itemgetter(JSON_INDEX_FILENAME,
+                                JSON_INDEX_LINE,
+                                JSON_INDEX_HASH,
+                                JSON_INDEX_QUALIFIER)
 
 
 def _sort_and_uniq_rows(l):
-    key = operator.itemgetter(JSON_INDEX_FILENAME,
-                              JSON_INDEX_LINE,
-                              JSON_INDEX_HASH,
-                              JSON_INDEX_QUALIFIER)
-    l.sort(key=key)
-    groups = itertools.groupby(l, key)
+    l.sort(key=issue_key)
+    groups = itertools.groupby(l, issue_key)
     # guaranteed to be at least one element in each group
     return map(lambda (keys, dups): dups.next(), groups)
 
 
-def _should_report(analyzer, error_kind, error_type, error_bucket):
-    analyzers_whitelist = [
-        config.ANALYZER_ERADICATE,
-        config.ANALYZER_CHECKERS,
-        config.ANALYZER_TRACING,
-    ]
-    error_kinds = [ISSUE_KIND_ERROR, ISSUE_KIND_WARNING, ISSUE_KIND_ADVICE]
-    null_style_buckets = ['B1', 'B2']
-
-    if analyzer in analyzers_whitelist:
-        return True
-
-    if error_kind not in error_kinds:
-        return False
-
-    if not error_type:
-        return False
-
-    if error_type in NULL_STYLE_ISSUE_TYPES:
-        return error_bucket in null_style_buckets
-
-    return error_type in ISSUE_TYPES
-
-
-def _should_report_csv(analyzer, row):
-    error_kind = row[CSV_INDEX_KIND]
-    error_type = row[CSV_INDEX_TYPE]
-    error_bucket = ''  # can be updated later once we extract it from qualifier
-
+def _bucket_of_xml(qualifier_xml):
+    if _FLAT_QUALIFIER_TAGS_XML.match(qualifier_xml) is not None:
+        match = _BUCKET_XML.search(qualifier_xml)
+        return match.group(1) if match is not None else ''
     try:
-        qualifier_xml = ET.fromstring(row[CSV_INDEX_QUALIFIER_TAGS])
+        qualifier_xml = ET.fromstring(qualifier_xml)
         if qualifier_xml.tag == QUALIFIER_TAGS:
             bucket = qualifier_xml.find(BUCKET_TAGS)
             if bucket is not None:
-                error_bucket = bucket.text
+                return bucket.text
     except ET.ParseError:
         pass  # this will skip any invalid xmls
+    return ''
 
-    return _should_report(analyzer, error_kind, error_type, error_bucket)
 
-
-def _should_report_json(analyzer, row):
-    error_kind = row[JSON_INDEX_KIND]
-    error_type = row[JSON_INDEX_TYPE]
-    error_bucket = ''  # can be updated later once we extract it from qualifier
-
-    for qual_tag in row[QUALIFIER_TAGS]:
+def _bucket_of_json(qualifier_tags):
+    for qual_tag in qualifier_tags:
         if qual_tag['tag'] == BUCKET_TAGS:
-            error_bucket = qual_tag['value']
-            break
-
-    return _should_report(analyzer, error_kind, error_type, error_bucket)
+            return qual_tag['value']
+    return ''
 
 
 def _print_and_write(file_out, message):
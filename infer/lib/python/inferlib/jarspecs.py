@@ -0,0 +1,168 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+"""Cache of the specs shipped in the jars of the classpath.
+
+InferAnalyze looks for the specs of a library procedure in each jar given
+with -ziplib in turn, and most jars of a classpath have no specs at all. The
+cache extracts the specs of each jar once per version of the jar, i.e. per
+sha1 of its content, into <cache dir>/<sha1>, so that they can be passed to
+InferAnalyze as a plain directory, and the jars without specs can be left
+out. The entries that were not used for a while are removed, then the least
+recently used ones until the cache is within its maximum size.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+from . import fileindex, utils
+
+SPECS_EXTENSION = '.specs'
+
+# InferAnalyze only reads the specs at specs/<name> in a jar, see
+# Specs.load_summary_to_spec_table
+SPECS_DIR_IN_JAR = 'specs/'
+
+# version of the layout of the entries, entries of other versions are
+# extracted again
+ENTRY_VERSION = 2
+
+# file of each entry describing the jar the specs were extracted from
+ENTRY_INFO_FILENAME = '.jar.json'
+
+# hashes of the jars, by path, size and modification time
+JAR_INDEX_FILENAME = '.jars.json'
+
+
+def extract_specs(jar, directory):
+    """Extract the specs of jar into directory, and return the information
+    about the entry"""
+    count = 0
+    size = 0
+    with zipfile.ZipFile(jar) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if not name.startswith(SPECS_DIR_IN_JAR) or \
+               not name.endswith(SPECS_EXTENSION):
+                continue
+            basename = name[len(SPECS_DIR_IN_JAR):]
+            if '/' in basename:
+                continue
+            path = os.path.join(directory, basename)
+            with open(path, 'wb') as file_out:
+                file_out.write(archive.read(info))
+            count += 1
+            size += info.file_size
+    return {'jar': jar, 'specs': count, 'size': size,
+            'version': ENTRY_VERSION}
+
+
+class JarSpecsCache(object):
+    """Specs of jars in a local directory, holding at most max_size bytes of
+    specs and removing the entries not used for max_age seconds"""
+
+    def __init__(self, cache_dir, max_size, max_age):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        utils.mkdir_if_not_exists(cache_dir)
+        # jar paths are absolute
+        self.jar_index = fileindex.load(
+            os.path.join(cache_dir, JAR_INDEX_FILENAME), os.sep)
+
+    def _entry_info(self, entry):
+        try:
+            info = utils.load_json_from_path(
+                os.path.join(entry, ENTRY_INFO_FILENAME))
+        except (IOError, ValueError):
+            return None
+        if info.get('version') != ENTRY_VERSION:
+            return None
+        return info
+
+    def _add(self, jar, entry):
+        # extract next to the final location, so that the entry can be
+        # renamed atomically and concurrent runs never see a partial entry
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix='.jar_')
+        try:
+            os.chmod(tmp_dir, 0o755)
+            info = extract_specs(jar, tmp_dir)
+            utils.dump_json_to_path(
+                info, os.path.join(tmp_dir, ENTRY_INFO_FILENAME))
+            try:
+                os.rename(tmp_dir, entry)
+            except OSError:
+                # another run added the same jar in the meantime
+                if self._entry_info(entry) is None:
+                    raise
+                shutil.rmtree(tmp_dir, True)
+        except:
+            shutil.rmtree(tmp_dir, True)
+            raise
+        logging.info('Extracted %d specs of %s into %s',
+                     info['specs'], jar, entry)
+
+    def specs_dir(self, jar):
+        """Return the directory of the specs of jar, or None if the jar has
+        no specs. Raise IOError or zipfile.BadZipfile if the jar cannot be
+        read."""
+        sha1 = self.jar_index.sha1(jar)
+        if sha1 is None:
+            raise IOError('Cannot read {}'.format(jar))
+        entry = os.path.join(self.cache_dir, sha1)
+        info = self._entry_info(entry)
+        if info is None:
+            shutil.rmtree(entry, True)
+            self._add(jar, entry)
+            info = self._entry_info(entry)
+        # mark the entry as recently used
+        os.utime(entry, None)
+        return entry if info['specs'] > 0 else None
+
+    def close(self):
+        """Save the hashes of the jars and shrink the cache"""
+        index_path = os.path.join(self.cache_dir, JAR_INDEX_FILENAME)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            self.jar_index.save(tmp_path)
+            os.rename(tmp_path, index_path)
+        except:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith('.'):
+                continue
+            entry = os.path.join(self.cache_dir, name)
+            info = self._entry_info(entry)
+            try:
+                mtime = os.stat(entry).st_mtime
+            except OSError:
+                continue
+            entries.append((mtime, info['size'] if info else 0, entry))
+        total = sum(size for (_, size, _) in entries)
+        for (mtime, size, entry) in sorted(entries):
+            if total <= self.max_size and now - mtime <= self.max_age:
+                break
+            logging.info('Evicting %s from the jar specs cache', entry)
+            shutil.rmtree(entry, True)
+            total -= size
@@ -0,0 +1,125 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+"""Share a CPU budget between nested infer instances.
+
+This follows the GNU make jobserver protocol: the budget is a pool of token
+bytes in a pipe. Every client may always run one job without a token, and
+must read a token from the pool before starting each additional job and
+write it back once the job has finished.
+
+The top-level infer instance creates the pool as a named pipe and advertises
+it to the infer instances it spawns through the INFER_JOBSERVER environment
+variable, e.g. INFER_JOBSERVER=fifo:/tmp/infer_jobserver_xyz/fifo. When infer
+itself runs as part of `make -j`, it uses the jobserver of make instead.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import errno
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+from . import utils
+
+JOBSERVER_ENVVAR = 'INFER_JOBSERVER'
+FIFO_PREFIX = 'fifo:'
+TOKEN = b'+'
+
+MAKEFLAGS_JOBSERVER_RE = re.compile(
+    r'--jobserver-(?:auth|fds)=(fifo:\S+|\d+,\d+)')
+
+
+class JobServer(object):
+
+    def __init__(self, read_fd, write_fd, auth, fifo_dir=None):
+        self.read_fd = read_fd
+        self.write_fd = write_fd
+        # how to reach the pool, in the syntax of make's --jobserver-auth
+        self.auth = auth
+        self._fifo_dir = fifo_dir
+
+    def acquire(self):
+        """Return a token, or None if there is none available right now"""
+        try:
+            token = os.read(self.read_fd, 1)
+        except OSError as e:
+            if e.errno in [errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR]:
+                return None
+            raise
+        return token if token else None
+
+    def release(self, token):
+        os.write(self.write_fd, token)
+
+    def close(self):
+        for fd in [self.read_fd, self.write_fd]:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if self._fifo_dir is not None:
+            shutil.rmtree(self._fifo_dir, True)
+            self._fifo_dir = None
+
+
+def _open_fifo(path):
+    read_fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    write_fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+    return read_fd, write_fd
+
+
+def create(tokens):
+    """Create a pool of `tokens` tokens, and advertise it to the processes
+    started from now on"""
+    fifo_dir = tempfile.mkdtemp(prefix='infer_jobserver_')
+    path = os.path.join(fifo_dir, 'fifo')
+    os.mkfifo(path, 0o600)
+    read_fd, write_fd = _open_fifo(path)
+    os.write(write_fd, TOKEN * tokens)
+    jobserver = JobServer(read_fd, write_fd, FIFO_PREFIX + path, fifo_dir)
+    os.environ[JOBSERVER_ENVVAR] = utils.encode(jobserver.auth)
+    logging.info('Created jobserver %s with %d tokens', jobserver.auth, tokens)
+    return jobserver
+
+
+def _connect(auth):
+    if auth.startswith(FIFO_PREFIX):
+        read_fd, write_fd = _open_fifo(auth[len(FIFO_PREFIX):])
+    else:
+        # reopen the pipe inherited from make rather than using the file
+        # descriptors directly, so that we can read from it without blocking
+        # and without changing the mode of the descriptors shared with make
+        read_fd, write_fd = [
+            os.open('/proc/self/fd/{}'.format(fd), mode | os.O_NONBLOCK)
+            for (fd, mode) in zip(auth.split(','),
+                                  [os.O_RDONLY, os.O_WRONLY])]
+    return JobServer(read_fd, write_fd, auth)
+
+
+def from_environment():
+    """Return the jobserver advertised by a parent infer or make process, or
+    None if there is none"""
+    auth = utils.read_env().get(JOBSERVER_ENVVAR)
+    if auth is None:
+        match = MAKEFLAGS_JOBSERVER_RE.search(
+            utils.read_env().get('MAKEFLAGS', ''))
+        if match is None:
+            return None
+        auth = match.group(1)
+    try:
+        return _connect(auth)
+    except OSError as e:
+        # e.g. make did not pass its file descriptors down to us
+        logging.info('Ignoring unusable jobserver %s: %s', auth, e)
+        return None
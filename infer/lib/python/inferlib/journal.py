@@ -0,0 +1,90 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import codecs
+import hashlib
+import json
+import os
+
+from . import config, utils
+
+
+def capture_fingerprint(infer_out):
+    """Return a hash identifying the current content of the capture, based on
+    the names, sizes and modification times of the captured files"""
+    captured_dir = os.path.join(infer_out, 'captured')
+    fingerprint = hashlib.sha1()
+    for root, dirs, files in os.walk(captured_dir):
+        dirs.sort()
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            fingerprint.update(utils.encode_or_not('{0}\0{1}\0{2}\n'.format(
+                os.path.relpath(path, captured_dir),
+                st.st_size,
+                st.st_mtime)))
+    return fingerprint.hexdigest()
+
+
+class AnalysisJournal(object):
+    """Record of the clusters analyzed successfully so far, used to resume an
+    interrupted analysis. The first line identifies the capture and the
+    options of the analysis, each following line is the name of the captured
+    source directory of an analyzed cluster."""
+
+    def __init__(self, path, key):
+        self.path = path
+        self.header = json.dumps(key, sort_keys=True)
+        self._file = None
+
+    def completed(self):
+        """Return the clusters already analyzed in a previous run of the same
+        analysis on the same capture"""
+        try:
+            with codecs.open(self.path, 'r',
+                             encoding=config.CODESET) as file_in:
+                lines = file_in.read().splitlines()
+        except IOError:
+            return set()
+        if not lines or lines[0] != self.header:
+            return set()
+        return set(lines[1:])
+
+    def start(self, resume):
+        if resume:
+            self._file = codecs.open(self.path, 'a', encoding=config.CODESET)
+        else:
+            self._file = codecs.open(self.path, 'w', encoding=config.CODESET)
+            self._file.write(self.header + '\n')
+            self._file.flush()
+
+    def record(self, source_name):
+        self._file.write(source_name + '\n')
+        # make sure that the entry survives if we are killed right after
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """The analysis is complete, there will be nothing to resume"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,166 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+"""Analyze the source files while the build is still being captured.
+
+The capture runs in a background thread. Each captured source directory
+that did not change between two looks at infer_out/captured is analyzed in
+the next round. Procedures analyzed early may have called procedures that
+were not captured yet, so once the capture is done, the specs of the
+procedures calling a procedure whose attributes were written after their
+round started are removed, along with the specs of their transitive callers
+and of the source files captured again, and the corresponding source files
+are analyzed again in a final round.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import os
+import threading
+
+from . import fileindex, warmstart
+
+# a captured source directory is complete once it has a call graph, see
+# DB.find_source_dirs
+CALL_GRAPH_EXTENSION = '.cg'
+
+ATTRIBUTES_EXTENSION = '.attr'
+
+# some file systems only record modification times in whole seconds
+MTIME_RESOLUTION = 1.0
+
+
+class CaptureThread(threading.Thread):
+    """Run the capture of the build in the background"""
+
+    def __init__(self, capture):
+        threading.Thread.__init__(self, name='capture')
+        self.daemon = True
+        self.capture = capture
+        self.exit_status = None
+
+    def run(self):
+        try:
+            self.exit_status = self.capture.capture()
+        except SystemExit as e:
+            self.exit_status = e.code
+        except Exception:
+            logging.exception('Error during capture phase')
+            self.exit_status = os.EX_SOFTWARE
+
+
+def dir_signature(source_dir):
+    """Return the names, sizes and modification times of the files of a
+    captured source directory, or None if it is not complete yet"""
+    signature = []
+    try:
+        for name in sorted(os.listdir(source_dir)):
+            st = os.stat(os.path.join(source_dir, name))
+            signature.append((name, st.st_size, st.st_mtime))
+    except OSError:
+        return None
+    if not any(name.endswith(CALL_GRAPH_EXTENSION)
+               for (name, _, _) in signature):
+        return None
+    return signature
+
+
+class CaptureWatcher(object):
+    """Keep track of the captured source directories and of the round in
+    which each of them was analyzed"""
+
+    def __init__(self, infer_out):
+        self.infer_out = infer_out
+        # signature of each captured directory at the previous poll
+        self._previous = {}
+        # start time and signature of each directory when it was scheduled
+        self.scheduled = {}
+
+    def _source_dir(self, name):
+        return os.path.join(self.infer_out, 'captured', name)
+
+    def poll(self):
+        """Return the captured directories that did not change since the
+        previous poll and that were not scheduled yet"""
+        current = {}
+        for name in fileindex.captured_dirs(self.infer_out):
+            if name not in self.scheduled:
+                signature = dir_signature(self._source_dir(name))
+                if signature is not None:
+                    current[name] = signature
+        stable = [name for (name, signature) in current.items()
+                  if self._previous.get(name) == signature]
+        self._previous = current
+        return sorted(stable)
+
+    def schedule(self, names, start_time):
+        for name in names:
+            self.scheduled[name] = (start_time,
+                                    dir_signature(self._source_dir(name)))
+
+    def unschedule(self, names):
+        for name in names:
+            self.scheduled.pop(name, None)
+
+    def unscheduled(self):
+        """Return the captured directories that were never scheduled"""
+        return [name for name in fileindex.captured_dirs(self.infer_out)
+                if name not in self.scheduled]
+
+    def recaptured(self):
+        """Return the directories that changed after being scheduled"""
+        return set(name for (name, (_, signature)) in self.scheduled.items()
+                   if dir_signature(self._source_dir(name)) != signature)
+
+
+def attributes_file(infer_out, name_id):
+    """Return the path to the attributes of a procedure, as in
+    AttributesTable.res_dir_attr_filename"""
+    bucket = name_id[-2:] if len(name_id) >= 2 else os.curdir
+    return os.path.join(infer_out, 'attributes', bucket,
+                        name_id + ATTRIBUTES_EXTENSION)
+
+
+def invalidate(infer_out, watcher, procs_csv, calls_csv):
+    """Remove the specs that may be out of date because a callee was
+    captured after the round of the caller started, or because their source
+    file was captured again. Return the names of the captured directories
+    to analyze again."""
+    recaptured = watcher.recaptured()
+    procs = dict((row['name_id'], warmstart.captured_dir_name(row['file']))
+                 for row in warmstart.read_csv(procs_csv))
+    stale = set(name_id for (name_id, name) in procs.items()
+                if name in recaptured)
+    callers = {}
+    attributes_mtimes = {}
+    for row in warmstart.read_csv(calls_csv):
+        caller = row['caller_id']
+        callee = row['callee_id']
+        callers.setdefault(callee, set()).add(caller)
+        scheduled = watcher.scheduled.get(
+            warmstart.captured_dir_name(row['file']))
+        if scheduled is None:
+            continue
+        if callee not in attributes_mtimes:
+            try:
+                attributes_mtimes[callee] = os.path.getmtime(
+                    attributes_file(infer_out, callee))
+            except OSError:
+                attributes_mtimes[callee] = None
+        mtime = attributes_mtimes[callee]
+        if mtime is not None and mtime >= scheduled[0] - MTIME_RESOLUTION:
+            stale.add(caller)
+    invalid = warmstart.transitive_callers(callers, stale)
+    warmstart.remove_specs(os.path.join(infer_out, 'specs'), invalid)
+    logging.info('Pipeline: %d source files captured again, %d specs '
+                 'invalidated', len(recaptured), len(invalid))
+    return recaptured | set(procs[name_id] for name_id in invalid
+                            if name_id in procs)
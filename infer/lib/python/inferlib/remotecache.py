@@ -0,0 +1,99 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+"""Share the bundles of the results cache between machines over HTTP.
+
+The protocol is plain HTTP: the bundle of a key for a given version of infer
+is at <url>/<infer version>/<key>.tar.gz. GET returns it, or 404 if there is
+none, and PUT stores it. See cacheserver.py for a reference server.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import os
+import socket
+import threading
+import urllib2
+
+from . import cache, utils
+
+# seconds to wait for the server before giving up
+DEFAULT_TIMEOUT = 30
+
+# size of the chunks in which bundles are downloaded
+CHUNK_SIZE = 1 << 16
+
+_uploads = []
+
+
+class RemoteCache(object):
+
+    def __init__(self, url, version, max_upload_size,
+                 timeout=DEFAULT_TIMEOUT):
+        self.url = url.rstrip('/')
+        self.version = version
+        self.max_upload_size = max_upload_size
+        self.timeout = timeout
+
+    def _bundle_url(self, key):
+        return '{0}/{1}/{2}{3}'.format(self.url, self.version, key,
+                                       cache.BUNDLE_EXTENSION)
+
+    def get(self, key, path):
+        """Download the bundle of key into path. Return True if it was
+        found."""
+        url = self._bundle_url(key)
+        try:
+            response = urllib2.urlopen(url, timeout=self.timeout)
+            with open(path, 'wb') as file_out:
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                    file_out.write(chunk)
+            return True
+        except urllib2.HTTPError as e:
+            if e.code != 404:
+                logging.warning('Could not get %s: %s', url, e)
+        except (urllib2.URLError, socket.error, IOError) as e:
+            logging.warning('Could not get %s: %s', url, e)
+        return False
+
+    def _put(self, url, data):
+        # httplib fails to send binary data after unicode headers
+        request = urllib2.Request(utils.encode(url), data=data, headers={
+            b'Content-Type': b'application/octet-stream',
+        })
+        request.get_method = lambda: b'PUT'
+        try:
+            urllib2.urlopen(request, timeout=self.timeout).close()
+            logging.info('Uploaded %s', url)
+        except (urllib2.URLError, socket.error, IOError) as e:
+            logging.warning('Could not upload %s: %s', url, e)
+
+    def put_in_background(self, key, path):
+        """Upload the bundle of key at path from a background thread,
+        unless it is larger than the maximum upload size. The bundle is
+        read before returning, so the file can be removed right away."""
+        size = os.path.getsize(path)
+        if size > self.max_upload_size:
+            logging.info('Not uploading %s: %d bytes is more than the '
+                         'maximum of %d', path, size, self.max_upload_size)
+            return
+        with open(path, 'rb') as file_in:
+            data = file_in.read()
+        upload = threading.Thread(target=self._put,
+                                  args=(self._bundle_url(key), data))
+        upload.start()
+        _uploads.append(upload)
+
+
+def wait_for_uploads():
+    """Wait until the background uploads are done"""
+    while _uploads:
+        _uploads.pop().join()
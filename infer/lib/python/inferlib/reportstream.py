@@ -0,0 +1,214 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+"""Process reports one issue at a time, in bounded memory.
+
+The JSON reports are read and written one element of the top-level array at
+a time, and the issues are sorted by an external merge sort that spills
+sorted runs of at most a fixed number of issues to temporary files.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import codecs
+import cPickle as pickle
+import heapq
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from . import config
+
+# characters read from a JSON report at a time
+CHUNK_SIZE = 1 << 16
+
+# issues held in memory by external_sort
+SORT_RUN_SIZE = 10000
+
+# sorted runs merged at the same time by external_sort
+MERGE_FAN_IN = 64
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# what read_json_array expects next
+_ARRAY_START = 0
+_FIRST_ELEMENT = 1
+_ELEMENT = 2
+_SEPARATOR = 3
+
+
+def read_json_array(file_in, chunk_size=CHUNK_SIZE):
+    """Yield the elements of the JSON array in file_in, a file of unicode
+    characters, one at a time"""
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    expected = _ARRAY_START
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos < len(buf):
+            if expected == _ARRAY_START:
+                if buf[pos] != '[':
+                    raise ValueError('Expected a JSON array')
+                expected = _FIRST_ELEMENT
+                pos += 1
+                continue
+            if expected == _SEPARATOR:
+                if buf[pos] == ']':
+                    return
+                if buf[pos] != ',':
+                    raise ValueError('Expected , or ] in the JSON array')
+                expected = _ELEMENT
+                pos += 1
+                continue
+            if expected == _FIRST_ELEMENT and buf[pos] == ']':
+                return
+            try:
+                element, end = decoder.raw_decode(buf, pos)
+                end = _WHITESPACE.match(buf, end).end()
+            except ValueError:
+                if eof:
+                    raise
+                end = len(buf)
+            # the element may continue in the next chunk, e.g. a number,
+            # unless it is followed by a separator
+            if eof or (end < len(buf) and buf[end] in ',]'):
+                yield element
+                pos = end
+                expected = _SEPARATOR
+                continue
+        elif eof:
+            raise ValueError('Unexpected end of the JSON array')
+        # read at least as much as is buffered so that large elements are
+        # not parsed again and again
+        chunk = file_in.read(max(chunk_size, len(buf) - pos))
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+def read_json_array_from_path(path):
+    """Yield the elements of the JSON array in the file at path"""
+    with codecs.open(path, 'r', encoding=config.CODESET,
+                     errors='replace') as file_in:
+        for element in read_json_array(file_in):
+            yield element
+
+
+class JsonArrayWriter(object):
+    """Write a JSON array into a file one element at a time, formatted as
+    utils.dump_json_to_path formats the whole array"""
+
+    # the indentation of utils.dump_json_to_path, and the separator that
+    # json uses between the elements of an indented array in python 2
+    INDENT = 2
+    SEPARATOR = ', '
+
+    def __init__(self, path):
+        self.file_out = codecs.open(path, 'w', encoding=config.CODESET,
+                                    errors='replace')
+        self.file_out.write('[')
+        self.count = 0
+
+    def write(self, element):
+        if self.count > 0:
+            self.file_out.write(self.SEPARATOR)
+        newline = '\n' + ' ' * self.INDENT
+        # the strings of the element cannot contain newlines, they are
+        # escaped
+        self.file_out.write(newline)
+        self.file_out.write(json.dumps(element, indent=self.INDENT,
+                                       encoding=config.CODESET)
+                            .replace('\n', newline))
+        self.count += 1
+
+    def close(self):
+        if self.count > 0:
+            self.file_out.write('\n')
+        self.file_out.write(']')
+        self.file_out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _write_run(rows, tmp_dir):
+    fd, path = tempfile.mkstemp(dir=tmp_dir, suffix='.run')
+    with os.fdopen(fd, 'wb') as file_out:
+        pickler = pickle.Pickler(file_out, pickle.HIGHEST_PROTOCOL)
+        for row in rows:
+            pickler.dump(row)
+            # do not keep a reference to every row in the memo
+            pickler.clear_memo()
+    return path
+
+
+def _read_run(path):
+    with open(path, 'rb') as file_in:
+        unpickler = pickle.Unpickler(file_in)
+        while True:
+            try:
+                yield unpickler.load()
+            except EOFError:
+                return
+
+
+def _decorate_run(path, index, key):
+    # the index of the run breaks ties, so that the sort is stable and the
+    # rows themselves are never compared
+    for row in _read_run(path):
+        yield (key(row), index, row)
+
+
+def _merge_runs(paths, key):
+    runs = [_decorate_run(path, index, key)
+            for (index, path) in enumerate(paths)]
+    for (_, _, row) in heapq.merge(*runs):
+        yield row
+
+
+def external_sort(rows, key, run_size=SORT_RUN_SIZE):
+    """Yield the rows sorted by key, holding at most run_size rows in
+    memory at a time. The sort is stable."""
+    tmp_dir = tempfile.mkdtemp(prefix='infer_sort_')
+    try:
+        runs = []
+        rows = iter(rows)
+        while True:
+            run = list(itertools.islice(rows, run_size))
+            if not run:
+                break
+            run.sort(key=key)
+            if not runs and len(run) < run_size:
+                # everything fits in memory
+                for row in run:
+                    yield row
+                return
+            runs.append(_write_run(run, tmp_dir))
+            del run
+        # merge the runs in order, to keep the sort stable
+        while len(runs) > MERGE_FAN_IN:
+            merged = _write_run(_merge_runs(runs[:MERGE_FAN_IN], key),
+                                tmp_dir)
+            for path in runs[:MERGE_FAN_IN]:
+                os.remove(path)
+            runs = [merged] + runs[MERGE_FAN_IN:]
+        for row in _merge_runs(runs, key):
+            yield row
+    finally:
+        shutil.rmtree(tmp_dir, True)
@@ -0,0 +1,243 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import glob
+import math
+import multiprocessing
+import os
+import re
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+PROC_SELF_CGROUP = '/proc/self/cgroup'
+PROC_SELF_STATUS = '/proc/self/status'
+PROC_MEMINFO = '/proc/meminfo'
+NUMA_NODES_DIR = '/sys/devices/system/node'
+
+# peak memory assumed for the analysis of a cluster that has no history,
+# when the number of jobs is limited by --memory-budget
+WORKER_MEMORY_ESTIMATE = 1024 * 1024 * 1024
+
+# cgroup v1 reports "no limit" on memory with a huge number
+CGROUP_V1_NO_MEMORY_LIMIT = 1 << 62
+
+
+def _read_first_line(path):
+    try:
+        with open(path, 'r') as file_in:
+            return file_in.readline().strip()
+    except (IOError, OSError):
+        return None
+
+
+def _cgroup_paths():
+    """Return a map from cgroup controllers to the cgroup of the current
+    process. The cgroup v2 hierarchy is mapped from ''."""
+    paths = {}
+    try:
+        with open(PROC_SELF_CGROUP, 'r') as file_in:
+            for line in file_in:
+                parts = line.strip().split(':', 2)
+                if len(parts) != 3:
+                    continue
+                for controller in parts[1].split(','):
+                    paths[controller] = parts[2]
+    except (IOError, OSError):
+        pass
+    return paths
+
+
+def _cgroup_file(controller, filename):
+    """Return the content of the first line of a cgroup file for the current
+    process, or None if there is no such file. With controller=None, look in
+    the unified (v2) hierarchy."""
+    cgroup_path = _cgroup_paths().get(controller or '', '/').lstrip('/')
+    if controller is None:
+        # hybrid setups mount the v2 hierarchy next to the v1 controllers
+        mount_points = [CGROUP_ROOT, os.path.join(CGROUP_ROOT, 'unified')]
+    else:
+        mount_points = [os.path.join(CGROUP_ROOT, name)
+                        for name in os.listdir(CGROUP_ROOT)
+                        if controller in name.split(',')] \
+            if os.path.isdir(CGROUP_ROOT) else []
+    for mount_point in mount_points:
+        # inside a container the cgroup of the process is usually mounted
+        # as the root of the hierarchy
+        for path in [os.path.join(mount_point, cgroup_path, filename),
+                     os.path.join(mount_point, filename)]:
+            line = _read_first_line(path)
+            if line is not None:
+                return line
+    return None
+
+
+def cpu_quota():
+    """Return the number of CPUs allowed by the cgroup CPU quota, as a float,
+    or None if there is no quota"""
+    # cgroup v2: "<quota> <period>", or "max <period>"
+    cpu_max = _cgroup_file(None, 'cpu.max')
+    if cpu_max is not None:
+        fields = cpu_max.split()
+        if len(fields) == 2 and fields[0] != 'max':
+            return int(fields[0]) / int(fields[1])
+        return None
+    # cgroup v1: the quota is -1 when there is none
+    quota = _cgroup_file('cpu', 'cpu.cfs_quota_us')
+    period = _cgroup_file('cpu', 'cpu.cfs_period_us')
+    if quota is not None and period is not None and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def _parse_cpu_list(cpu_list):
+    """Parse a list of CPUs such as "0-3,8,10-11" """
+    cpus = []
+    for item in cpu_list.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if '-' in item:
+            first, last = item.split('-')
+            cpus += range(int(first), int(last) + 1)
+        else:
+            cpus.append(int(item))
+    return cpus
+
+
+def affinity_cpus():
+    """Return the list of CPUs the current process is allowed to run on, or
+    None if it cannot be determined"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    try:
+        with open(PROC_SELF_STATUS, 'r') as file_in:
+            for line in file_in:
+                if line.startswith('Cpus_allowed_list:'):
+                    return _parse_cpu_list(line.split(':', 1)[1])
+    except (IOError, OSError):
+        pass
+    return None
+
+
+def numa_nodes():
+    """Return a list of (node, cpus) pairs for the NUMA nodes of the machine,
+    restricted to the CPUs the current process is allowed to run on. Without
+    NUMA information, all the CPUs are considered to be on node 0."""
+    allowed = affinity_cpus()
+    nodes = []
+    for path in glob.glob(os.path.join(NUMA_NODES_DIR, 'node*', 'cpulist')):
+        match = re.match(r'node(\d+)$', os.path.basename(os.path.dirname(path)))
+        cpu_list = _read_first_line(path)
+        if match is None or cpu_list is None:
+            continue
+        cpus = [cpu for cpu in _parse_cpu_list(cpu_list)
+                if allowed is None or cpu in allowed]
+        if cpus:
+            nodes.append((int(match.group(1)), cpus))
+    if not nodes:
+        cpus = allowed or range(multiprocessing.cpu_count())
+        nodes = [(0, list(cpus))]
+    return sorted(nodes)
+
+
+def worker_placement(slots):
+    """Return a list of `slots` (node, cpus) pairs, assigning each worker
+    slot to a NUMA node in proportion to the number of CPUs of the node and
+    to a set of CPUs of its own within the node. When a node has more slots
+    than CPUs, its slots share all the CPUs of the node."""
+    nodes = numa_nodes()
+    slots_per_node = [0] * len(nodes)
+    node_of_slot = []
+    for _ in range(slots):
+        # the node with the fewest slots per CPU so far
+        index = min(range(len(nodes)),
+                    key=lambda i: (slots_per_node[i] / len(nodes[i][1]), i))
+        node_of_slot.append(index)
+        slots_per_node[index] += 1
+    placement = []
+    seen_per_node = [0] * len(nodes)
+    for index in node_of_slot:
+        node, cpus = nodes[index]
+        count = slots_per_node[index]
+        rank = seen_per_node[index]
+        seen_per_node[index] += 1
+        if count <= len(cpus):
+            cpus = cpus[rank * len(cpus) // count:
+                        (rank + 1) * len(cpus) // count]
+        placement.append((node, cpus))
+    return placement
+
+
+def _meminfo(key):
+    try:
+        with open(PROC_MEMINFO, 'r') as file_in:
+            for line in file_in:
+                if line.startswith(key + ':'):
+                    # values are in kB
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError):
+        pass
+    return None
+
+
+def _cgroup_memory_available():
+    # cgroup v2
+    limit = _cgroup_file(None, 'memory.max')
+    usage = _cgroup_file(None, 'memory.current')
+    if limit is not None:
+        if limit == 'max' or usage is None:
+            return None
+        return max(0, int(limit) - int(usage))
+    # cgroup v1
+    limit = _cgroup_file('memory', 'memory.limit_in_bytes')
+    usage = _cgroup_file('memory', 'memory.usage_in_bytes')
+    if limit is None or usage is None or \
+       int(limit) >= CGROUP_V1_NO_MEMORY_LIMIT:
+        return None
+    return max(0, int(limit) - int(usage))
+
+
+def process_rss(pid):
+    """Return the resident set size of a process in bytes, or None if it
+    cannot be determined, e.g. because the process has terminated"""
+    try:
+        with open('/proc/{}/status'.format(pid), 'r') as file_in:
+            for line in file_in:
+                if line.startswith('VmRSS:'):
+                    # values are in kB
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError):
+        pass
+    return None
+
+
+def memory_available():
+    """Return the number of bytes of memory available to new processes, taking
+    the cgroup memory limit into account, or None if it is unknown"""
+    available = [mem for mem in [_meminfo('MemAvailable'),
+                                 _cgroup_memory_available()]
+                 if mem is not None]
+    return min(available) if available else None
+
+
+def default_parallelism():
+    """Return the number of analysis workers to use by default, together
+    with a description of what limited it"""
+    limits = [(multiprocessing.cpu_count(), 'cpu count')]
+    cpus = affinity_cpus()
+    if cpus:
+        limits.append((len(cpus), 'cpu affinity'))
+    quota = cpu_quota()
+    if quota is not None:
+        limits.append((max(1, int(math.ceil(quota))), 'cgroup cpu quota'))
+    # memory is left to the admission control of --memory-budget
+    cores, reason = min(limits, key=lambda limit: limit[0])
+    return int(cores), reason
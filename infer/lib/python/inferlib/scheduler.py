@@ -0,0 +1,505 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import collections
+import distutils.spawn
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from . import resources, transport, utils
+
+# name of the file generated by InferAnalyze -makefile
+CLUSTERS_MAKEFILE = 'Makefile'
+
+# how long to wait before checking again on the running jobs
+POLL_INTERVAL = 0.05
+
+CLUSTERS_VARIABLE = 'CLUSTERS='
+CLUSTER_CMD_OPTION = '-cluster'
+
+
+class Cluster(object):
+    """A unit of work of the analysis: the captured source directory
+    serialized by InferAnalyze into cluster_file"""
+
+    def __init__(self, name, cluster_file, source_dir):
+        self.name = name
+        self.cluster_file = cluster_file
+        self.source_dir = source_dir
+
+    def source_name(self):
+        return os.path.basename(self.source_dir.rstrip(os.sep))
+
+
+class ClusterResult(object):
+
+    def __init__(self, cluster, exit_status, wall_time, cpu_time, peak_rss,
+                 attempt=1, timed_out=False, host=transport.LOCAL_HOST):
+        self.cluster = cluster
+        self.exit_status = exit_status
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.peak_rss = peak_rss
+        self.attempt = attempt
+        self.timed_out = timed_out
+        self.host = host
+
+    def to_stats(self):
+        return {
+            'source': self.cluster.source_name(),
+            'exit_status': self.exit_status,
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'peak_rss': self.peak_rss,
+            'attempt': self.attempt,
+            'timed_out': self.timed_out,
+            'host': self.host,
+        }
+
+
+def read_clusters(makefile):
+    """Return the clusters to analyze, in the order in which they are listed
+    in the Makefile generated by InferAnalyze -makefile"""
+    to_analyze = []
+    source_dirs = {}
+    cluster_files = {}
+    source_dir = None
+    with open(makefile, 'r') as file_in:
+        for line in file_in:
+            line = utils.decode(line.rstrip('\n'))
+            if line.startswith(CLUSTERS_VARIABLE):
+                to_analyze = line[len(CLUSTERS_VARIABLE):].split()
+            elif line.startswith('#'):
+                source_dir = line[1:]
+            elif line.startswith('\t') and CLUSTER_CMD_OPTION in line:
+                # "\t$(INFERANALYZE) -cluster xcl1.cluster >cl1"
+                tokens = line.split()
+                index = tokens.index(CLUSTER_CMD_OPTION)
+                name = tokens[-1].lstrip('>')
+                cluster_files[name] = tokens[index + 1]
+                source_dirs[name] = source_dir
+    return [Cluster(name, cluster_files[name], source_dirs[name])
+            for name in to_analyze if name in cluster_files]
+
+
+def _source_dir_size(source_dir):
+    size = 0
+    try:
+        for filename in os.listdir(source_dir):
+            size += os.path.getsize(os.path.join(source_dir, filename))
+    except OSError:
+        pass
+    return size
+
+
+def load_history(history_path):
+    """Return the per-cluster information recorded by previous runs, indexed
+    by the name of the captured source directory"""
+    try:
+        return utils.load_json_from_path(history_path)
+    except (IOError, ValueError):
+        return {}
+
+
+def update_history(history, results, timeout=None):
+    """Record the duration and the peak memory use of each cluster, the
+    largest over all its attempts, e.g. not the ones of a cheaper retry
+    after a timeout. An attempt that timed out took at least timeout."""
+    entries = {}
+    for result in results:
+        wall_time = result.wall_time
+        if result.timed_out and timeout is not None:
+            wall_time = max(wall_time, timeout)
+        entry = entries.setdefault(result.cluster.source_name(),
+                                   {'wall_time': wall_time})
+        entry['wall_time'] = max(entry['wall_time'], wall_time)
+        if result.peak_rss is not None:
+            entry['peak_rss'] = max(entry.get('peak_rss', 0),
+                                    result.peak_rss)
+    for (source_name, entry) in entries.items():
+        history.setdefault(source_name, {}).update(entry)
+
+
+def expected_times(clusters, history):
+    """Return the expected duration of each cluster, indexed by name. The
+    expected duration of a cluster is its duration in a previous run, or
+    otherwise is estimated from the size of its captured data using the time
+    per byte observed on the clusters seen before."""
+    sizes = dict((cluster.name, _source_dir_size(cluster.source_dir))
+                 for cluster in clusters)
+    known_time = 0.0
+    known_size = 0
+    for cluster in clusters:
+        entry = history.get(cluster.source_name())
+        if entry is not None:
+            known_time += entry['wall_time']
+            known_size += sizes[cluster.name]
+    time_per_byte = known_time / known_size if known_size > 0 else 1.0
+
+    def expected_time(cluster):
+        entry = history.get(cluster.source_name())
+        if entry is not None:
+            return entry['wall_time']
+        return sizes[cluster.name] * time_per_byte
+
+    return dict((cluster.name, expected_time(cluster)) for cluster in clusters)
+
+
+def order_longest_first(clusters, history):
+    """Sort the clusters so that the ones expected to take longest are
+    started first"""
+    times = expected_times(clusters, history)
+    return sorted(clusters, key=lambda cluster: times[cluster.name],
+                  reverse=True)
+
+
+def shard(clusters, history, index, count):
+    """Return the clusters of shard index out of count (from 1 to count).
+    The clusters are split so that the shards are expected to take about
+    the same time, by giving the longest remaining cluster to the shard
+    with the least work so far. The split only depends on the captured data
+    and on the history, so every shard computes the same one."""
+    times = expected_times(clusters, history)
+    # do not depend on the order of the clusters in the Makefile, which
+    # depends on the order in which the file system lists the directories
+    ordered = sorted(clusters, key=lambda cluster: (-times[cluster.name],
+                                                    cluster.source_name()))
+    loads = [0.0] * count
+    selected = []
+    for cluster in ordered:
+        lightest = loads.index(min(loads))
+        loads[lightest] += times[cluster.name]
+        if lightest == index - 1:
+            selected.append(cluster)
+    logging.info('Shard %d/%d: %d of %d clusters, expected %.2fs out of '
+                 '%.2fs', index, count, len(selected), len(clusters),
+                 loads[index - 1], sum(loads))
+    return selected
+
+
+class _Job(object):
+
+    def __init__(self, cluster, proc, token, attempt, slot):
+        self.cluster = cluster
+        self.proc = proc
+        self.slot = slot
+        # jobserver token held by the job, None for the implicit token
+        self.token = token
+        self.attempt = attempt
+        self.timed_out = False
+        self.start_time = time.time()
+
+    def kill(self):
+        # InferAnalyze runs in its own process group, kill all of it
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+def expected_memory_from_history(history):
+    """Return a function estimating the peak memory use of a cluster in
+    bytes, from its peak memory use in a previous run if there is one"""
+    def expected_memory(cluster):
+        entry = history.get(cluster.source_name(), {})
+        return entry.get('peak_rss', resources.WORKER_MEMORY_ESTIMATE)
+    return expected_memory
+
+
+def _peak_rss_of_rusage(rusage):
+    # ru_maxrss is in bytes on OS X and in kilobytes on Linux
+    if sys.platform == 'darwin':
+        return rusage.ru_maxrss
+    return rusage.ru_maxrss * 1024
+
+
+def can_pin_jobs():
+    # python 2 has no os.sched_setaffinity, use taskset instead
+    return hasattr(os, 'sched_setaffinity') or \
+        distutils.spawn.find_executable('taskset') is not None
+
+
+def _taskset_command(cpus):
+    return ['taskset', '-c', ','.join(str(cpu) for cpu in cpus)]
+
+
+def _preexec(cpus):
+    def preexec():
+        # run in a separate process group, so that we can kill all of it
+        os.setpgrp()
+        if cpus is not None and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, cpus)
+    return preexec
+
+
+def _exit_status_of_wait_status(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class Scheduler(object):
+    """Run one InferAnalyze process per cluster, keeping at most `jobs` of
+    them running at the same time. Like `make -l`, no new job is started
+    while others are running and the load average is at least
+    `load_average`. When a jobserver is given, every job but one needs a
+    token from it. With a `memory_budget` in bytes, no new job is started
+    while others are running if the memory they are expected to use,
+    according to `expected_memory`, would exceed the budget or the memory
+    available. Jobs running for more than `timeout` seconds are killed,
+    and run again up to `retries` times with `retry_options` added to their
+    command. `on_complete` is called with each final ClusterResult, the
+    number of completed clusters and the total, as soon as a job ends.
+
+    `slots` is a list of transports, one per job that may run at the same
+    time, and overrides `jobs`. By default all the jobs run locally. The
+    memory budget only accounts for the jobs that run locally. With
+    `cpu_sets`, a list with one list of CPUs or None per slot, the jobs of
+    each slot are pinned to the CPUs of the slot."""
+
+    def __init__(self, cmd, jobs, load_average=None, cwd=None,
+                 on_complete=None, jobserver=None, memory_budget=None,
+                 expected_memory=None, timeout=None, retries=0,
+                 retry_options=None, slots=None, cpu_sets=None):
+        self.cmd = cmd
+        self.slots = slots or [transport.LocalTransport()] * max(1, jobs)
+        self.jobs = len(self.slots)
+        self._free_slots = list(range(self.jobs))
+        self.cpu_sets = cpu_sets or [None] * self.jobs
+        self.load_average = load_average
+        self.cwd = cwd if cwd is not None else os.getcwd()
+        self.on_complete = on_complete
+        self.jobserver = jobserver
+        self.memory_budget = memory_budget
+        self.expected_memory = expected_memory or \
+            expected_memory_from_history({})
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_options = retry_options or []
+        self.results = []
+        self._running = {}
+        self._delayed = set()
+        # whether the memory budget held back jobs below `jobs` yet
+        self._memory_limited = False
+        self._pending = collections.deque()
+        self._attempts = {}
+        self._completed = 0
+
+    def _can_start(self, cluster):
+        if len(self._running) >= self.jobs:
+            return False
+        if self.load_average is not None and len(self._running) > 0:
+            if os.getloadavg()[0] >= self.load_average:
+                return False
+        if not self.slots[self._free_slots[0]].is_local:
+            return True
+        return self._memory_allows(cluster)
+
+    def _log_delay(self, cluster, message, *args):
+        if cluster.name not in self._delayed:
+            self._delayed.add(cluster.name)
+            logging.info('Delaying %s: ' + message, cluster.name, *args)
+
+    def _log_memory_limit(self):
+        if not self._memory_limited:
+            self._memory_limited = True
+            logging.warning('Running %d analysis jobs instead of %d to stay '
+                            'within the memory budget', len(self._running),
+                            self.jobs)
+
+    def _memory_allows(self, cluster):
+        if self.memory_budget is None or len(self._running) == 0:
+            return True
+        needed = self.expected_memory(cluster)
+        # the running jobs will use at least the memory they used in the
+        # past, and may still grow up to that point
+        projected = 0
+        growth = 0
+        for job in self._running.values():
+            if not self.slots[job.slot].is_local:
+                continue
+            rss = resources.process_rss(job.proc.pid) or 0
+            expected = max(rss, self.expected_memory(job.cluster))
+            projected += expected
+            growth += expected - rss
+        if projected + needed > self.memory_budget:
+            self._log_delay(cluster, '%d bytes needed, %d projected, budget '
+                            'is %d', needed, projected, self.memory_budget)
+            self._log_memory_limit()
+            return False
+        available = resources.memory_available()
+        if available is not None and growth + needed > available:
+            self._log_delay(cluster, '%d bytes needed, %d available',
+                            growth + needed, available)
+            self._log_memory_limit()
+            return False
+        return True
+
+    def _acquire_token(self):
+        """Return (True, token) if a new job may start, where token is None
+        when the job runs on the implicit token"""
+        if self.jobserver is None:
+            return True, None
+        if all(job.token is not None for job in self._running.values()):
+            return True, None
+        token = self.jobserver.acquire()
+        return token is not None, token
+
+    def _release(self, job):
+        if job.token is not None:
+            self.jobserver.release(job.token)
+            job.token = None
+        if job.slot is not None:
+            self._free_slots.append(job.slot)
+            job.slot = None
+
+    def _start(self, cluster, token):
+        attempt = self._attempts.get(cluster.name, 0) + 1
+        self._attempts[cluster.name] = attempt
+        cmd = self.cmd
+        if attempt > 1:
+            cmd = cmd + self.retry_options
+        cmd = cmd + [CLUSTER_CMD_OPTION, cluster.cluster_file]
+        # take the slot that has been free for the longest time
+        slot = self._free_slots.pop(0)
+        cpus = self.cpu_sets[slot]
+        if cpus is not None and not hasattr(os, 'sched_setaffinity'):
+            cmd = _taskset_command(cpus) + cmd
+        cmd = self.slots[slot].wrap(cmd, self.cwd)
+        logging.debug('Starting %s (attempt %d) on %s: %s',
+                      cluster.name, attempt, self.slots[slot].host,
+                      ' '.join(cmd))
+        try:
+            with open(os.path.join(self.cwd, cluster.name), 'w') as out:
+                proc = subprocess.Popen(map(utils.encode_or_not, cmd),
+                                        cwd=self.cwd, stdout=out,
+                                        preexec_fn=_preexec(cpus))
+        except:
+            self._free_slots.insert(0, slot)
+            if token is not None:
+                self.jobserver.release(token)
+            raise
+        self._running[proc.pid] = _Job(cluster, proc, token, attempt, slot)
+
+    def _kill_timed_out(self):
+        if self.timeout is None:
+            return
+        for job in self._running.values():
+            if not job.timed_out and \
+               utils.elapsed_time(job.start_time) > self.timeout:
+                logging.warning('Cluster %s (%s) timed out after %.1fs',
+                                job.cluster.name, job.cluster.source_name(),
+                                self.timeout)
+                job.timed_out = True
+                job.kill()
+
+    def _reap(self, total):
+        """Collect the jobs that have terminated. Return True if any did."""
+        reaped = False
+        for pid in list(self._running):
+            pid_done, status, rusage = os.wait4(pid, os.WNOHANG)
+            if pid_done == 0:
+                continue
+            job = self._running.pop(pid)
+            slot = self.slots[job.slot]
+            self._release(job)
+            job.proc.returncode = _exit_status_of_wait_status(status)
+            if slot.is_local:
+                cpu_time = rusage.ru_utime + rusage.ru_stime
+                peak_rss = _peak_rss_of_rusage(rusage)
+            else:
+                # the resources used by the transport, not by the job
+                cpu_time = None
+                peak_rss = None
+            result = ClusterResult(job.cluster,
+                                   job.proc.returncode,
+                                   utils.elapsed_time(job.start_time),
+                                   cpu_time,
+                                   peak_rss,
+                                   attempt=job.attempt,
+                                   timed_out=job.timed_out,
+                                   host=slot.host)
+            self.results.append(result)
+            reaped = True
+            if job.timed_out and job.attempt <= self.retries:
+                # retry as soon as possible, as this is a long job
+                self._pending.appendleft(job.cluster)
+                continue
+            self._completed += 1
+            if self.on_complete is not None:
+                self.on_complete(result, self._completed, total)
+        return reaped
+
+    def _kill_all(self):
+        for job in self._running.values():
+            job.kill()
+            try:
+                job.proc.wait()
+            except OSError:
+                pass
+            self._release(job)
+        self._running = {}
+
+    def run(self, clusters):
+        """Run all the clusters, and return the results of all the attempts
+        to analyze them, in order of completion"""
+        self._pending.extend(clusters)
+        total = len(self._pending)
+        try:
+            while self._pending or self._running:
+                while self._pending and self._can_start(self._pending[0]):
+                    can_start, token = self._acquire_token()
+                    if not can_start:
+                        break
+                    self._start(self._pending.popleft(), token)
+                self._kill_timed_out()
+                if not self._reap(total):
+                    time.sleep(POLL_INTERVAL)
+        finally:
+            # kill the jobs left running after an error or an interruption
+            self._kill_all()
+        return self.results
+
+
+def final_results(results):
+    """Return the result of the last attempt for each cluster"""
+    final = collections.OrderedDict()
+    for result in results:
+        final[result.cluster.name] = result
+    return list(final.values())
+
+
+def straggler_report(results, timeout, count=10):
+    """Describe the clusters that timed out and the slowest ones"""
+    def describe(result):
+        return {
+            'cluster': result.cluster.name,
+            'source': result.cluster.source_name(),
+            'attempt': result.attempt,
+            'wall_time': result.wall_time,
+            'cpu_time': result.cpu_time,
+        }
+    final = final_results(results)
+    slowest = sorted(final, key=lambda result: result.wall_time,
+                     reverse=True)[:count]
+    return {
+        'timeout': timeout,
+        'timed_out': [describe(result) for result in final
+                      if result.timed_out],
+        'retried': [describe(result) for result in results
+                    if result.timed_out and result not in final],
+        'slowest': [describe(result) for result in slowest],
+    }
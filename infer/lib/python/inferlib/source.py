@@ -10,13 +10,18 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-import codecs
+import collections
+import mmap
 
 from . import colorize, config, utils
 
 BASE_INDENT = 2
 # how many lines of context around each report
 SOURCE_CONTEXT = 2
+# how many source files a SourceIndex keeps mapped in memory
+SOURCE_INDEX_MAX_OPEN = 64
+# larger source files are highlighted one excerpt at a time
+HIGHLIGHT_MAX_SIZE = 1 << 20
 
 class Indenter(str):
     def __init__(self):
@@ -58,22 +63,112 @@ class Indenter(str):
         return unicode(self).encode(config.CODESET)
 
 
-def build_source_context(source_name, mode, report_line):
+class _MappedSource(object):
+    """A source file mapped in memory, with the offset of each line"""
+
+    def __init__(self, source_name):
+        with open(source_name, 'rb') as source_file:
+            try:
+                self.data = mmap.mmap(source_file.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty files cannot be mapped
+                self.data = b''
+        size = len(self.data)
+        # offsets[i] is where line i + 1 starts, and the last offset is the
+        # end of the file
+        self.offsets = [0]
+        pos = self.data.find(b'\n')
+        while pos != -1:
+            self.offsets.append(pos + 1)
+            pos = self.data.find(b'\n', pos + 1)
+        if self.offsets[-1] != size:
+            self.offsets.append(size)
+        # highlighted lines of the whole file, by mode
+        self.highlighted = {}
+
+    def excerpt(self, start_line, end_line):
+        last_line = len(self.offsets) - 1
+        start = self.offsets[min(start_line - 1, last_line)]
+        end = self.offsets[min(end_line, last_line)]
+        return self.data[start:end]
+
+    def highlighted_lines(self, source_name, mode):
+        """Return the lines of the whole file highlighted for mode, or None
+        if they do not match the lines of the file"""
+        if mode not in self.highlighted:
+            lines = None
+            if len(self.data) <= HIGHLIGHT_MAX_SIZE:
+                text = colorize.syntax_highlighting(
+                    source_name, mode, utils.decode(self.data[:]))
+                # the formatter ends each line with a newline, and pygments
+                # also treats a lone carriage return as the end of a line
+                lines = [line + '\n' for line in text.split('\n')[:-1]]
+                if len(lines) != len(self.offsets) - 1:
+                    lines = None
+            self.highlighted[mode] = lines
+        return self.highlighted[mode]
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+class SourceIndex(object):
+    """Excerpts of source files, for all the issues of a report. Each file
+    is read once, and at most max_open files are kept mapped in memory,
+    the least recently used ones being closed first."""
+
+    def __init__(self, max_open=SOURCE_INDEX_MAX_OPEN):
+        self.max_open = max_open
+        self._sources = collections.OrderedDict()
+
+    def _source(self, source_name):
+        source = self._sources.pop(source_name, None)
+        if source is None:
+            source = _MappedSource(source_name)
+            if len(self._sources) >= self.max_open:
+                (_, oldest) = self._sources.popitem(last=False)
+                oldest.close()
+        self._sources[source_name] = source
+        return source
+
+    def excerpt(self, source_name, start_line, end_line,
+                mode=colorize.PLAIN_FORMATTER):
+        """Return the lines start_line to end_line of source_name, both
+        included and counting from 1, with their line endings, and with
+        the syntax highlighted for mode. Each file is highlighted at most
+        once."""
+        source = self._source(source_name)
+        if colorize.can_highlight(source_name, mode):
+            lines = source.highlighted_lines(source_name, mode)
+            if lines is not None:
+                return ''.join(lines[start_line - 1:end_line])
+        excerpt = utils.decode(source.excerpt(start_line, end_line))
+        return colorize.syntax_highlighting(source_name, mode, excerpt)
+
+    def close(self):
+        for source in self._sources.values():
+            source.close()
+        self._sources.clear()
+
+
+def build_source_context(source_name, mode, report_line, source_index=None):
     start_line = max(1, report_line - SOURCE_CONTEXT)
-    # could go beyond last line, checked in the loop
+    # could go beyond last line, checked by the index
     end_line = report_line + SOURCE_CONTEXT
 
     # get source excerpt
-    line_number = 1
-    excerpt = ''
-    with codecs.open(source_name, 'r',
-                     encoding=config.CODESET, errors="replace") as source_file:
-        # avoid going past the end of the file
-        for line in source_file:
-            if start_line <= line_number <= end_line:
-                excerpt += line
-            line_number += 1
-    excerpt = colorize.syntax_highlighting(source_name, mode, excerpt)
+    if source_index is None:
+        source_index = SourceIndex(max_open=1)
+        try:
+            excerpt = source_index.excerpt(source_name, start_line, end_line,
+                                           mode)
+        finally:
+            source_index.close()
+    else:
+        excerpt = source_index.excerpt(source_name, start_line, end_line,
+                                       mode)
 
     # number lines and add caret at the right position
     n_length = len(str(end_line))
@@ -0,0 +1,106 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+"""Merge several directories of specs into a single one.
+
+InferAnalyze looks for the specs of a library procedure in each directory
+given with -lib in turn. With many directories, merging them into a single
+directory of links up front saves all but one lookup per procedure. The
+merged directory is only rebuilt when the modification time of one of the
+directories changes, i.e. when specs are added, removed or replaced.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import codecs
+import logging
+import os
+import shutil
+import tempfile
+
+from . import config, utils
+
+SPECS_EXTENSION = '.specs'
+
+# file of the merged directory describing the directories merged into it
+INDEX_FILENAME = '.index.json'
+
+
+def read_specs_dir_list_file(path):
+    """Return the directories listed in a --specs-dir-list-file file"""
+    with codecs.open(path, 'r', encoding=config.CODESET) as file_in:
+        return [line.strip() for line in file_in if line.strip()]
+
+
+def search_order(specs_dirs, list_file_dirs):
+    """Return the directories in the order in which InferAnalyze searches
+    them, given the -lib directories in command-line order and the
+    directories of the -specs-dir-list-file passed after them"""
+    # InferAnalyze prepends each -lib directory to the search path, then the
+    # directories of the list file
+    return list(list_file_dirs) + list(reversed(specs_dirs))
+
+
+def _index_key(dirs):
+    key = []
+    for directory in dirs:
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            mtime = None
+        key.append([directory, mtime])
+    return key
+
+
+def _link(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        # e.g. the directories are on different file systems
+        os.symlink(source, destination)
+
+
+def build(merged_dir, dirs):
+    """Merge the specs of dirs into merged_dir, unless it is up to date.
+    When several directories have specs for the same procedure, the first
+    one in dirs wins, like in InferAnalyze."""
+    key = _index_key(dirs)
+    try:
+        if utils.load_json_from_path(
+                os.path.join(merged_dir, INDEX_FILENAME)) == key:
+            logging.info('Specs index %s is up to date', merged_dir)
+            return
+    except (IOError, ValueError):
+        pass
+    parent_dir = os.path.dirname(merged_dir.rstrip(os.sep))
+    tmp_dir = tempfile.mkdtemp(dir=parent_dir, prefix='.specs_index_')
+    try:
+        os.chmod(tmp_dir, 0o755)
+        seen = set()
+        for directory in dirs:
+            try:
+                names = os.listdir(directory)
+            except OSError as e:
+                logging.warning('Cannot read specs directory %s: %s',
+                                directory, e)
+                continue
+            for name in names:
+                if name.endswith(SPECS_EXTENSION) and name not in seen:
+                    seen.add(name)
+                    _link(os.path.join(directory, name),
+                          os.path.join(tmp_dir, name))
+        utils.dump_json_to_path(key, os.path.join(tmp_dir, INDEX_FILENAME))
+        shutil.rmtree(merged_dir, True)
+        os.rename(tmp_dir, merged_dir)
+    except:
+        shutil.rmtree(tmp_dir, True)
+        raise
+    logging.info('Merged %d specs from %d directories into %s',
+                 len(seen), len(dirs), merged_dir)
@@ -0,0 +1,101 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import pipes
+import shlex
+
+from . import utils
+
+# the name of the host that stands for the local machine
+LOCAL_HOST = 'local'
+
+# -tt allocates a terminal for the job even though ssh does not run in
+# one, so that the remote job gets SIGHUP when the connection is lost, and
+# -n keeps ssh from reading the standard input of infer
+DEFAULT_COMMAND_TEMPLATE = \
+    "ssh -n -tt -o BatchMode=yes {host} cd {cwd} '&&' {cmd}"
+
+
+class LocalTransport(object):
+    """Run the analysis jobs as subprocesses of the current process"""
+
+    host = LOCAL_HOST
+    is_local = True
+
+    def wrap(self, cmd, cwd):
+        return cmd
+
+
+class CommandTemplateTransport(object):
+    """Run the analysis jobs on another host through a command template, such
+    as DEFAULT_COMMAND_TEMPLATE. In the template, {host} is replaced with the
+    name of the host, {cwd} with the directory to run the job from and {cmd}
+    with the command of the job, both quoted for a POSIX shell. The host must
+    see the results directory at the same path as the local machine.
+    The local command is killed when the job times out, and the template
+    must make sure that this terminates the remote job, as ssh does with a
+    terminal allocated for the job. Without a terminal, the remote job keeps
+    running until it writes to its closed output."""
+
+    is_local = False
+
+    def __init__(self, host, template):
+        self.host = host
+        self.template = template
+
+    def wrap(self, cmd, cwd):
+        quoted_cmd = ' '.join(pipes.quote(utils.decode_or_not(arg))
+                              for arg in cmd)
+        quoted_cwd = pipes.quote(utils.decode_or_not(cwd))
+        # shlex does not support unicode in python 2
+        return [utils.decode(arg).format(host=self.host,
+                                         cwd=quoted_cwd,
+                                         cmd=quoted_cmd)
+                for arg in shlex.split(utils.encode_or_not(self.template))]
+
+
+def parse_host(host_spec, default_slots):
+    """Parse "<host>[:<slots>]" into the host name and its number of slots.
+    Raise ValueError if host_spec is malformed."""
+    host, slots = host_spec, default_slots
+    if ':' in host_spec:
+        host, slots = host_spec.rsplit(':', 1)
+        try:
+            slots = int(slots)
+        except ValueError:
+            slots = 0
+        if slots < 1:
+            raise ValueError('expected <host>[:<slots>] with a positive '
+                             'number of slots, got "{}"'.format(host_spec))
+    if not host:
+        raise ValueError('missing host name in "{}"'.format(host_spec))
+    return host, slots
+
+
+def create_slots(host_specs, default_slots, template):
+    """Return one transport per job that may run at the same time on the
+    given hosts. The slots of the different hosts are interleaved so that
+    the jobs are spread over all the hosts."""
+    per_host = []
+    for host_spec in host_specs:
+        host, host_slots = parse_host(host_spec, default_slots)
+        if host == LOCAL_HOST:
+            transport = LocalTransport()
+        else:
+            transport = CommandTemplateTransport(host, template)
+        per_host.append([transport] * host_slots)
+    slots = []
+    for index in range(max([len(host_slots) for host_slots in per_host] +
+                           [0])):
+        slots += [host_slots[index] for host_slots in per_host
+                  if index < len(host_slots)]
+    return slots
@@ -109,20 +109,26 @@ def dump_json_to_path(
                   default=default, sort_keys=sort_keys, **kw)
 
 
+_version_json = None
+
+
+def _infer_version_json():
+    global _version_json
+    # the version does not change while infer runs, e.g. in --watch mode
+    if _version_json is None:
+        _version_json = json.loads(subprocess.check_output([
+            get_cmd_in_bin_dir('InferAnalyze'),
+            '-version_json',
+        ]).decode())
+    return _version_json
+
+
 def infer_version():
-    version = json.loads(subprocess.check_output([
-        get_cmd_in_bin_dir('InferAnalyze'),
-        '-version_json',
-    ]).decode())
-    return version['commit']
+    return _infer_version_json()['commit']
 
 
 def infer_branch():
-    version = json.loads(subprocess.check_output([
-        get_cmd_in_bin_dir('InferAnalyze'),
-        '-version_json',
-    ]).decode())
-    return version['branch']
+    return _infer_version_json()['branch']
 
 
 def infer_key(analyzer):
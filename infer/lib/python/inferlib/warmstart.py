@@ -0,0 +1,142 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+"""Reuse the specs of a previous analysis for the unchanged sources.
+
+After each warm-start analysis, a manifest records the content hash of each
+analyzed source file, the specs of the procedures defined in it, and the
+callers of each procedure. The next analysis deletes the specs of the
+procedures of the changed source files and of their transitive callers, and
+only analyzes the clusters of these files and of the new ones. InferAnalyze
+does not analyze again the procedures that already have specs.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import hashlib
+import logging
+import os
+
+from . import utils
+
+SPECS_EXTENSION = '.specs'
+
+# cutoff on the length of the base name of a source file in the names of the
+# captured source directories, see DB.source_file_encoding
+SOURCE_DIR_NAME_CUTOFF = 100
+
+
+def captured_dir_name(source_file):
+    """Return the name of the directory under captured/ of a source file, as
+    in DB.source_file_encoding"""
+    source_file = utils.encode_or_not(source_file)
+    base = os.path.basename(source_file)
+    directory = os.path.dirname(source_file)
+    crc = hashlib.md5(base + directory).hexdigest()
+    return utils.decode(base[:SOURCE_DIR_NAME_CUTOFF] + b'.' + crc)
+
+
+def read_csv(path):
+    """Return the rows of a csv file written by InferPrint as dicts"""
+    with open(path, 'r') as file_in:
+        reader = utils.locale_csv_reader(file_in)
+        header = next(reader, None)
+        if header is None:
+            return
+        for row in reader:
+            yield dict(zip(header, row))
+
+
+def read_callers(calls_csv):
+    """Return the set of callers of each procedure in a calls csv file
+    written by InferPrint"""
+    callers = {}
+    for row in read_csv(calls_csv):
+        callers.setdefault(row['callee_id'], set()).add(row['caller_id'])
+    return callers
+
+
+def transitive_callers(callers, name_ids):
+    """Return the given procedures and their transitive callers"""
+    result = set(name_ids)
+    to_visit = list(result)
+    while to_visit:
+        for caller in callers.get(to_visit.pop(), []):
+            if caller not in result:
+                result.add(caller)
+                to_visit.append(caller)
+    return result
+
+
+def remove_specs(specs_dir, name_ids):
+    """Remove the specs of the given procedures from specs_dir"""
+    for name_id in name_ids:
+        try:
+            os.remove(os.path.join(specs_dir, name_id + SPECS_EXTENSION))
+        except OSError:
+            pass
+
+
+def create_manifest(key, procs_csv, calls_csv, file_index):
+    """Create the manifest of the specs listed in the procs and calls csv
+    files written by InferPrint"""
+    procs = {}
+    files = {}
+    for row in read_csv(procs_csv):
+        source_file = row['file']
+        procs[row['name_id']] = source_file
+        if source_file not in files:
+            files[source_file] = file_index.sha1(source_file)
+    callers = read_callers(calls_csv)
+    return {
+        'key': key,
+        'files': files,
+        'procs': procs,
+        'callers': dict((callee, sorted(callers_of_callee))
+                        for (callee, callers_of_callee) in callers.items()),
+    }
+
+
+def load_manifest(path, key):
+    """Return the manifest at path, or None if there is none or if it was
+    created with a different key"""
+    try:
+        manifest = utils.load_json_from_path(path)
+    except (IOError, ValueError):
+        return None
+    if manifest.get('key') != key:
+        logging.info('Warm start: the analysis options changed, starting '
+                     'from scratch')
+        return None
+    return manifest
+
+
+def invalidate(manifest, file_index, specs_dir):
+    """Delete the specs that are out of date because their source file or
+    the source file of one of their transitive callees changed. Return the
+    names of the captured directories of the source files whose specs are
+    still valid."""
+    changed = set(source_file
+                  for (source_file, sha1) in manifest['files'].items()
+                  if sha1 is None or file_index.sha1(source_file) != sha1)
+    invalid = transitive_callers(
+        manifest['callers'],
+        [name_id for (name_id, source_file) in manifest['procs'].items()
+         if source_file in changed])
+    remove_specs(specs_dir, invalid)
+    to_analyze = changed | set(manifest['procs'][name_id]
+                               for name_id in invalid
+                               if name_id in manifest['procs'])
+    logging.info('Warm start: %d changed files, %d specs invalidated, '
+                 '%d files to analyze again',
+                 len(changed), len(invalid), len(to_analyze))
+    return set(captured_dir_name(source_file)
+               for source_file in manifest['files']
+               if source_file not in to_analyze)
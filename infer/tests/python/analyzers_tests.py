@@ -0,0 +1,94 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import analyze, config, utils
+
+
+class AnalyzersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.infer_out = tempfile.mkdtemp()
+        analyze.create_results_dir(self.infer_out)
+        analyze.reset_start_file(self.infer_out)
+        os.mkdir(os.path.join(self.infer_out, 'attributes'))
+
+    def tearDown(self):
+        shutil.rmtree(self.infer_out, True)
+
+    def test_split_analyzers(self):
+        self.assertEqual(analyze.split_analyzers('infer'), ['infer'])
+        self.assertEqual(analyze.split_analyzers('infer, checkers,'),
+                         ['infer', 'checkers'])
+
+    def test_results_dirs(self):
+        results_dirs = [analyze.create_analyzer_results_dir(self.infer_out,
+                                                            analyzer)
+                        for analyzer in ['infer', 'checkers']]
+        self.assertEqual(results_dirs,
+                         [os.path.join(self.infer_out, 'infer'),
+                          os.path.join(self.infer_out, 'checkers')])
+        for results_dir in results_dirs:
+            # the analyzers share the capture
+            for name in ['.start', 'attributes', 'captured', 'sources']:
+                path = os.path.join(results_dir, name)
+                self.assertTrue(os.path.islink(path))
+                self.assertEqual(os.path.realpath(path),
+                                 os.path.realpath(
+                                     os.path.join(self.infer_out, name)))
+            # but not the results
+            specs_dir = os.path.join(results_dir, 'specs')
+            self.assertTrue(os.path.isdir(specs_dir))
+            self.assertFalse(os.path.islink(specs_dir))
+        # creating the directory again, e.g. for another run, is harmless
+        self.assertEqual(
+            analyze.create_analyzer_results_dir(self.infer_out, 'infer'),
+            results_dirs[0])
+
+    def test_summary(self):
+        results_dir = analyze.create_analyzer_results_dir(self.infer_out,
+                                                          'infer')
+        utils.dump_json_to_path(
+            [{'bug_type': 'NULL_DEREFERENCE'}, {'bug_type': 'RESOURCE_LEAK'}],
+            os.path.join(results_dir, config.JSON_REPORT_FILENAME))
+        stats = {'int': {'files': 3}}
+        utils.dump_json_to_path(
+            stats, os.path.join(results_dir, config.STATS_FILENAME))
+        self.assertEqual(analyze.analyzer_summary(results_dir, os.EX_OK), {
+            'results_dir': results_dir,
+            'exit_code': os.EX_OK,
+            'issues': 2,
+            'stats': stats,
+        })
+
+    def test_summary_of_failure(self):
+        results_dir = analyze.create_analyzer_results_dir(self.infer_out,
+                                                          'checkers')
+        # the failed analyzer did not write its report
+        self.assertEqual(
+            analyze.analyzer_summary(results_dir, os.EX_SOFTWARE),
+            {'results_dir': results_dir, 'exit_code': os.EX_SOFTWARE})
+
+
+if __name__ == '__main__':
+    unittest.main()
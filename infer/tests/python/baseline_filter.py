@@ -0,0 +1,94 @@
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+"""The filter of the reports as it was before issues.IssueFilter, used as
+a reference by issues_tests.py and issue_filter_benchmark.py"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import config, issues
+
+
+def is_clean_csv(args, row):
+    filename = row[issues.CSV_INDEX_FILENAME]
+    return (os.path.isfile(filename) and
+            (args.no_filtering or
+             _should_report_csv(args.analyzer, row)))
+
+
+def is_clean_json(args, row):
+    filename = row[issues.JSON_INDEX_FILENAME]
+    return (os.path.isfile(filename) and
+            (args.no_filtering or
+             _should_report_json(args.analyzer, row)))
+
+
+def _should_report(analyzer, error_kind, error_type, error_bucket):
+    analyzers_whitelist = [
+        config.ANALYZER_ERADICATE,
+        config.ANALYZER_CHECKERS,
+        config.ANALYZER_TRACING,
+    ]
+    error_kinds = [issues.ISSUE_KIND_ERROR, issues.ISSUE_KIND_WARNING,
+                   issues.ISSUE_KIND_ADVICE]
+    null_style_buckets = ['B1', 'B2']
+
+    if analyzer in analyzers_whitelist:
+        return True
+
+    if error_kind not in error_kinds:
+        return False
+
+    if not error_type:
+        return False
+
+    if error_type in issues.NULL_STYLE_ISSUE_TYPES:
+        return error_bucket in null_style_buckets
+
+    return error_type in issues.ISSUE_TYPES
+
+
+def _should_report_csv(analyzer, row):
+    error_kind = row[issues.CSV_INDEX_KIND]
+    error_type = row[issues.CSV_INDEX_TYPE]
+    error_bucket = ''
+
+    try:
+        qualifier_xml = ET.fromstring(row[issues.CSV_INDEX_QUALIFIER_TAGS])
+        if qualifier_xml.tag == issues.QUALIFIER_TAGS:
+            bucket = qualifier_xml.find(issues.BUCKET_TAGS)
+            if bucket is not None:
+                error_bucket = bucket.text
+    except ET.ParseError:
+        pass
+
+    return _should_report(analyzer, error_kind, error_type, error_bucket)
+
+
+def _should_report_json(analyzer, row):
+    error_kind = row[issues.JSON_INDEX_KIND]
+    error_type = row[issues.JSON_INDEX_TYPE]
+    error_bucket = ''
+
+    for qual_tag in row[issues.QUALIFIER_TAGS]:
+        if qual_tag['tag'] == issues.BUCKET_TAGS:
+            error_bucket = qual_tag['value']
+            break
+
+    return _should_report(analyzer, error_kind, error_type, error_bucket)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import logging
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import cache, config, fileindex, utils
+
+
+def write(path, content):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as file_out:
+        file_out.write(content)
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.infer_out = os.path.join(self.tmp_dir, 'infer-out')
+        write(os.path.join(self.infer_out, 'captured', 'a.c', 'a.cfg'), 'a')
+        write(os.path.join(self.infer_out, 'attributes', 'a.attr'), 'b')
+        # do not run InferAnalyze -version_json
+        self.version_json = utils._version_json
+        utils._version_json = {'commit': 'test', 'branch': 'test'}
+
+    def tearDown(self):
+        utils._version_json = self.version_json
+        shutil.rmtree(self.tmp_dir, True)
+
+
+class ResultsKeyTest(CacheTestCase):
+
+    def key(self, **kwargs):
+        args = {
+            'analyzer': config.ANALYZER_INFER,
+            'options': ['-j', '1'],
+            'no_filtering': False,
+            'inferconfig': os.path.join(self.tmp_dir,
+                                        config.INFERCONFIG_FILENAME),
+        }
+        args.update(kwargs)
+        return cache.results_key(self.infer_out, **args)
+
+    def test_same_inputs(self):
+        self.assertEqual(self.key(), self.key())
+
+    def test_options(self):
+        key = self.key()
+        self.assertNotEqual(self.key(analyzer=config.ANALYZER_CHECKERS), key)
+        self.assertNotEqual(self.key(options=['-j', '2']), key)
+        self.assertNotEqual(self.key(no_filtering=True), key)
+
+    def test_inferconfig(self):
+        inferconfig = os.path.join(self.tmp_dir, config.INFERCONFIG_FILENAME)
+        no_inferconfig = self.key()
+        write(inferconfig, '{}')
+        key = self.key()
+        self.assertNotEqual(key, no_inferconfig)
+        self.assertEqual(self.key(), key)
+        write(inferconfig, '{"infer_blacklist_path_regex": ["x"]}')
+        self.assertNotEqual(self.key(), key)
+        os.remove(inferconfig)
+        self.assertEqual(self.key(), no_inferconfig)
+
+    def test_capture(self):
+        key = self.key()
+        write(os.path.join(self.infer_out, 'captured', 'a.c', 'a.cfg'), 'c')
+        changed = self.key()
+        self.assertNotEqual(changed, key)
+        write(os.path.join(self.infer_out, 'attributes', 'b.attr'), '')
+        self.assertNotEqual(self.key(), changed)
+
+    def test_not_capture(self):
+        key = self.key()
+        write(os.path.join(self.infer_out, 'specs', 'p.specs'), 'x')
+        write(os.path.join(self.infer_out, config.JSON_REPORT_FILENAME), '')
+        self.assertEqual(self.key(), key)
+
+
+class LibrariesHashTest(CacheTestCase):
+
+    def setUp(self):
+        super(LibrariesHashTest, self).setUp()
+        self.specs_dir = os.path.join(self.tmp_dir, 'lib')
+        write(os.path.join(self.specs_dir, 'p.specs'), 'p')
+        self.listed_dir = os.path.join(self.tmp_dir, 'listed')
+        write(os.path.join(self.listed_dir, 'q.specs'), 'q')
+        self.list_file = os.path.join(self.tmp_dir, 'specs_dirs.txt')
+        write(self.list_file, self.listed_dir + '\n')
+        self.jar = os.path.join(self.tmp_dir, 'lib.jar')
+        write(self.jar, 'jar')
+        self.options = ['-j', '1', '-lib', self.specs_dir,
+                        '-specs-dir-list-file', self.list_file,
+                        '-ziplib', self.jar]
+        self.file_index = fileindex.FileIndex(os.sep)
+
+    def libraries_hash(self, options=None):
+        return cache.libraries_hash(options or self.options, self.file_index)
+
+    def test_same_libraries(self):
+        libraries = self.libraries_hash()
+        self.assertEqual(self.libraries_hash(), libraries)
+        # other files of the specs directories are not read by InferAnalyze
+        write(os.path.join(self.specs_dir, 'notes.txt'), 'x')
+        self.assertEqual(self.libraries_hash(), libraries)
+        self.assertNotEqual(self.libraries_hash(['-j', '1']), libraries)
+
+    def test_specs_changed(self):
+        libraries = self.libraries_hash()
+        write(os.path.join(self.specs_dir, 'p.specs'), 'changed')
+        changed = self.libraries_hash()
+        self.assertNotEqual(changed, libraries)
+        write(os.path.join(self.specs_dir, 'r.specs'), 'r')
+        added = self.libraries_hash()
+        self.assertNotEqual(added, changed)
+        write(os.path.join(self.listed_dir, 'q.specs'), 'changed')
+        self.assertNotEqual(self.libraries_hash(), added)
+
+    def test_list_file_changed(self):
+        libraries = self.libraries_hash()
+        other_dir = os.path.join(self.tmp_dir, 'other')
+        write(os.path.join(other_dir, 'q.specs'), 'q')
+        write(self.list_file, other_dir + '\n')
+        self.assertNotEqual(self.libraries_hash(), libraries)
+
+    def test_jar_changed(self):
+        libraries = self.libraries_hash()
+        write(self.jar, 'changed jar')
+        self.assertNotEqual(self.libraries_hash(), libraries)
+
+    def test_relative_paths(self):
+        cwd = os.getcwd()
+        os.chdir(self.tmp_dir)
+        try:
+            relative = self.libraries_hash(['-lib', 'lib', '-ziplib',
+                                            'lib.jar'])
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(relative, self.libraries_hash(
+            ['-lib', self.specs_dir, '-ziplib', self.jar]))
+
+    def test_results_key(self):
+        key = cache.results_key(self.infer_out, config.ANALYZER_INFER,
+                                self.options)
+        libraries = self.libraries_hash()
+        with_libraries = cache.results_key(
+            self.infer_out, config.ANALYZER_INFER, self.options,
+            libraries=libraries)
+        self.assertNotEqual(with_libraries, key)
+        write(self.jar, 'changed jar')
+        self.assertNotEqual(
+            cache.results_key(self.infer_out, config.ANALYZER_INFER,
+                              self.options,
+                              libraries=self.libraries_hash()),
+            with_libraries)
+
+
+class BundleTest(CacheTestCase):
+
+    def setUp(self):
+        super(BundleTest, self).setUp()
+        write(os.path.join(self.infer_out, config.JSON_REPORT_FILENAME),
+              '[]')
+        write(os.path.join(self.infer_out, 'specs', 'p.specs'), 'specs')
+        self.cache = cache.ResultsCache(os.path.join(self.tmp_dir, 'cache'),
+                                        1 << 20)
+        self.restored = os.path.join(self.tmp_dir, 'restored')
+        os.mkdir(self.restored)
+
+    def test_store_and_restore(self):
+        stats = {'normal': {'files': 1}}
+        self.cache.store('key', self.infer_out, stats)
+        self.assertEqual(self.cache.restore('key', self.restored), stats)
+        with open(os.path.join(self.restored, 'specs', 'p.specs')) as f:
+            self.assertEqual(f.read(), 'specs')
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.restored, config.JSON_REPORT_FILENAME)))
+        # the capture is not part of the bundle
+        self.assertFalse(os.path.exists(
+            os.path.join(self.restored, 'captured')))
+        self.assertIsNone(self.cache.restore('other', self.restored))
+
+    def bundle_with(self, member, content=b''):
+        path = os.path.join(self.cache.cache_dir,
+                            'unsafe' + cache.BUNDLE_EXTENSION)
+        with tarfile.open(path, 'w:gz') as bundle:
+            stats = tarfile.TarInfo(cache.BUNDLE_STATS)
+            stats.size = 2
+            bundle.addfile(stats, io.BytesIO(b'{}'))
+            member.size = len(content)
+            bundle.addfile(member, io.BytesIO(content))
+        return path
+
+    def check_rejected(self, member):
+        path = self.bundle_with(member, b'x')
+        with self.assertRaises(tarfile.TarError):
+            cache.extract_bundle(path, self.restored)
+        # the cache warns about the bundle and ignores it
+        logging.disable(logging.WARNING)
+        try:
+            self.assertIsNone(self.cache.restore('unsafe', self.restored))
+        finally:
+            logging.disable(logging.NOTSET)
+        self.assertEqual(os.listdir(self.restored), [])
+
+    def test_absolute_path(self):
+        self.check_rejected(
+            tarfile.TarInfo(os.path.join(self.tmp_dir, 'outside')))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.tmp_dir, 'outside')))
+
+    def test_parent_dir(self):
+        for name in ['../outside', 'specs/../../outside', '..']:
+            self.check_rejected(tarfile.TarInfo(name))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.tmp_dir, 'outside')))
+
+    def test_links(self):
+        for link_type in [tarfile.SYMTYPE, tarfile.LNKTYPE]:
+            member = tarfile.TarInfo('specs')
+            member.type = link_type
+            member.linkname = self.tmp_dir
+            self.check_rejected(member)
+
+    def test_evict_least_recently_used(self):
+        paths = {}
+        for (key, mtime) in [('old', 1), ('used', 2), ('recent', 3)]:
+            self.cache.store(key, self.infer_out, {})
+            paths[key] = self.cache.lookup(key)
+            os.utime(paths[key], (mtime, mtime))
+        # using a bundle makes it the most recent one
+        self.cache.lookup('used')
+        self.cache.max_size = sum(os.path.getsize(paths[key])
+                                  for key in ['used', 'recent'])
+        self.cache.evict()
+        self.assertFalse(os.path.exists(paths['old']))
+        self.assertTrue(os.path.exists(paths['used']))
+        self.assertTrue(os.path.exists(paths['recent']))
+        self.cache.max_size = 0
+        self.cache.evict()
+        self.assertEqual(os.listdir(self.cache.cache_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import sys
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import colorize
+
+
+@unittest.skipIf(colorize.pygments is None, 'pygments is not installed')
+class LexerTest(unittest.TestCase):
+
+    def setUp(self):
+        colorize._lexers.clear()
+
+    def lexer_name(self, source_name):
+        lexer = colorize._lexer(source_name)
+        return None if lexer is None else lexer.name
+
+    def test_whole_file_name(self):
+        # pygments matches CMakeLists.txt by name, and other .txt files as
+        # plain text
+        self.assertEqual(self.lexer_name('b/notes.txt'), 'Text only')
+        self.assertEqual(self.lexer_name('a/CMakeLists.txt'), 'CMake')
+        self.assertEqual(self.lexer_name('b/notes.txt'), 'Text only')
+        self.assertEqual(self.lexer_name('Makefile.am'), 'Makefile')
+
+    def test_cached(self):
+        lexer = colorize._lexer('a/x.c')
+        self.assertIs(colorize._lexer('b/x.c'), lexer)
+        self.assertIsNone(colorize._lexer('a/x.not-a-language'))
+        self.assertIsNone(colorize._lexer('b/x.not-a-language'))
+
+
+if __name__ == '__main__':
+    unittest.main()
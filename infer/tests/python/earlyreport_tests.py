@@ -0,0 +1,113 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import config, earlyreport, issues, warmstart
+
+
+class RecordingReporter(earlyreport.EarlyReporter):
+    """Record the reports instead of running InferPrint"""
+
+    def __init__(self, args, changed_dirs):
+        super(RecordingReporter, self).__init__(args, changed_dirs)
+        self.reports = []
+        self.started = threading.Event()
+        # released to let a report finish
+        self.proceed = threading.Event()
+        self.proceed.set()
+
+    def report(self, last):
+        self.started.set()
+        self.proceed.wait()
+        self.reports.append(last)
+
+
+class EarlyReporterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.args = argparse.Namespace(analyzer=config.ANALYZER_INFER,
+                                       no_filtering=False,
+                                       infer_out=self.tmp_dir)
+        self.sources = {}
+        for name in ['a.c', 'b.c']:
+            path = os.path.join(self.tmp_dir, name)
+            open(path, 'w').close()
+            self.sources[name] = path
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, True)
+
+    def captured_dir(self, name):
+        return warmstart.captured_dir_name(self.sources[name])
+
+    def issue(self, name, line, bug_type='NULL_DEREFERENCE'):
+        return {
+            issues.JSON_INDEX_FILENAME: self.sources[name],
+            issues.JSON_INDEX_LINE: line,
+            issues.JSON_INDEX_HASH: line,
+            issues.JSON_INDEX_QUALIFIER: 'qualifier',
+            issues.JSON_INDEX_KIND: issues.ISSUE_KIND_ERROR,
+            issues.JSON_INDEX_TYPE: bug_type,
+            issues.QUALIFIER_TAGS: [{'tag': issues.BUCKET_TAGS,
+                                     'value': 'B1'}],
+        }
+
+    def test_new_issues(self):
+        reporter = earlyreport.EarlyReporter(self.args,
+                                             [self.captured_dir('a.c')])
+        first = self.issue('a.c', 1)
+        # an issue of a file that did not change, and a filtered one
+        rows = [first, self.issue('b.c', 2),
+                self.issue('a.c', 3, bug_type='NOT_REPORTED')]
+        self.assertEqual(reporter.new_issues(rows), [first])
+        # the issues already printed are not printed again
+        second = self.issue('a.c', 4)
+        self.assertEqual(reporter.new_issues(rows + [second]), [second])
+
+    def test_cluster_done(self):
+        changed = [self.captured_dir('a.c'), self.captured_dir('b.c')]
+        reporter = RecordingReporter(self.args, changed)
+        reporter.proceed.clear()
+        reporter.cluster_done(changed[0])
+        reporter.started.wait()
+        # the clusters of the other files do not trigger a report
+        reporter.cluster_done('other')
+        # finished while the first report runs, and reported after it
+        reporter.cluster_done(changed[1])
+        reporter.proceed.set()
+        reporter.wait()
+        self.assertEqual(reporter.reports, [False, True])
+        self.assertEqual(reporter.pending, set())
+
+    def test_nothing_changed(self):
+        reporter = RecordingReporter(self.args, [])
+        reporter.cluster_done('other')
+        reporter.wait()
+        self.assertEqual(reporter.reports, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
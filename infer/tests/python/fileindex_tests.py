@@ -0,0 +1,124 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import fileindex
+
+
+class FileIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.infer_out = os.path.join(self.root, 'infer-out')
+        os.makedirs(os.path.join(self.infer_out, 'captured', 'a.c.123'))
+        self.write('a.c', 'int a;')
+        self.write('b.c', 'int b;')
+        self.index = fileindex.FileIndex(self.root)
+        self.index.update(['a.c', 'b.c'], self.infer_out)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, True)
+
+    def write(self, path, content, mtime=None):
+        path = os.path.join(self.root, path)
+        with open(path, 'w') as file_out:
+            file_out.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def mtime(self, path):
+        return os.path.getmtime(os.path.join(self.root, path))
+
+    def test_unchanged(self):
+        self.assertEqual(self.index.changed_files(), [])
+
+    def test_content_changed(self):
+        self.write('a.c', 'int c;', self.mtime('a.c') + 10)
+        self.assertEqual(self.index.changed_files(), ['a.c'])
+        # the entry is updated
+        self.assertEqual(self.index.changed_files(), [])
+
+    def test_size_changed(self):
+        # same modification time, e.g. restored by a checkout
+        self.write('a.c', 'int ab;', self.mtime('a.c'))
+        self.assertEqual(self.index.changed_files(), ['a.c'])
+
+    def test_only_mtime_changed(self):
+        # e.g. a checkout of another revision and back
+        self.write('a.c', 'int a;', self.mtime('a.c') + 10)
+        self.assertEqual(self.index.changed_files(), [])
+
+    def test_removed(self):
+        os.remove(os.path.join(self.root, 'b.c'))
+        self.assertEqual(self.index.changed_files(), ['b.c'])
+        self.assertNotIn('b.c', self.index.files)
+
+    def test_not_hashed_again(self):
+        sha1 = self.index.files['a.c']['sha1']
+        self.index.files['a.c']['sha1'] = 'stale'
+        self.assertEqual(self.index.sha1('a.c'), 'stale')
+        self.index.files['a.c']['size'] += 1
+        self.assertEqual(self.index.sha1('a.c'), sha1)
+
+    def test_save_and_load(self):
+        path = os.path.join(self.root, 'index.json')
+        self.index.save(path)
+        loaded = fileindex.load(path, self.root)
+        self.assertEqual(loaded.files, self.index.files)
+        self.assertEqual(loaded.captured_dirs, ['a.c.123'])
+        # an index of another root is not reused
+        other = fileindex.load(path, os.path.join(self.root, 'other'))
+        self.assertEqual(other.files, {})
+        self.assertIsNone(other.captured_dirs)
+        missing = fileindex.load(os.path.join(self.root, 'missing.json'),
+                                 self.root)
+        self.assertIsNone(missing.captured_dirs)
+
+    def test_unanalyzed_changes(self):
+        path = os.path.join(self.root, 'index.json')
+        self.index.save(path)
+        self.assertEqual(fileindex.unanalyzed_changes(path, self.root), {})
+        self.write('a.c', 'int c;', self.mtime('a.c') + 10)
+        os.remove(os.path.join(self.root, 'b.c'))
+        changes = fileindex.unanalyzed_changes(path, self.root)
+        self.assertEqual(changes, {
+            'a.c': fileindex.hash_file(os.path.join(self.root, 'a.c')),
+            'b.c': None,
+        })
+        # e.g. the analysis of the changes failed and did not save the index
+        self.assertEqual(fileindex.unanalyzed_changes(path, self.root),
+                         changes)
+        self.write('a.c', 'int d;', self.mtime('a.c') + 10)
+        self.assertNotEqual(fileindex.unanalyzed_changes(path, self.root),
+                            changes)
+
+    def test_captured_dirs(self):
+        os.makedirs(os.path.join(self.infer_out, 'captured', 'b.c.456'))
+        open(os.path.join(self.infer_out, 'captured', 'file'), 'w').close()
+        self.assertEqual(fileindex.captured_dirs(self.infer_out),
+                         ['a.c.123', 'b.c.456'])
+        self.assertEqual(fileindex.captured_dirs(self.root), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+# Measure how many issues per second the filter of the reports goes
+# through, on a synthetic report.
+#
+# example usage:
+# # 1M issues over 2000 source files, half of which do not exist
+# ./issue_filter_benchmark.py
+# # 100k issues
+# ./issue_filter_benchmark.py --issues 100000
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import csv
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import baseline_filter
+from inferlib import issues
+
+ISSUE_KINDS = [
+    issues.ISSUE_KIND_ERROR,
+    issues.ISSUE_KIND_WARNING,
+    issues.ISSUE_KIND_INFO,
+    issues.ISSUE_KIND_ADVICE,
+]
+
+# the null-style types are the ones that need the bucket
+ISSUE_TYPES = issues.ISSUE_TYPES + ['DEAD_STORE', 'UNINITIALIZED_VALUE'] + \
+    issues.NULL_STYLE_ISSUE_TYPES * 3
+
+BUCKETS = ['B1', 'B2', 'B3', 'B5']
+
+
+def create_sources(count):
+    """Create the first half of count source files in the current
+    directory, and return the names of all of them"""
+    names = ['f{}.java'.format(i) for i in range(count)]
+    for name in names[:count // 2]:
+        open(name, 'w').close()
+    return names
+
+
+def synthetic_rows(count, sources):
+    """Return count random issues, as rows of the csv report and of the
+    json report"""
+    random.seed(0)
+    csv_rows = []
+    json_rows = []
+    for i in range(count):
+        source_name = random.choice(sources)
+        kind = random.choice(ISSUE_KINDS)
+        issue_type = random.choice(ISSUE_TYPES)
+        tags = [('value', 'x'), ('bucket', random.choice(BUCKETS)),
+                ('field', 'f')]
+        csv_row = [b''] * (issues.CSV_INDEX_ADVICE + 1)
+        csv_row[issues.CSV_INDEX_FILENAME] = source_name.encode()
+        csv_row[issues.CSV_INDEX_KIND] = kind.encode()
+        csv_row[issues.CSV_INDEX_TYPE] = issue_type.encode()
+        csv_row[issues.CSV_INDEX_LINE] = str(i % 500).encode()
+        csv_row[issues.CSV_INDEX_QUALIFIER_TAGS] = (
+            '<qualifier_tags>' +
+            ''.join('<{0}>{1}</{0}>'.format(tag, value)
+                    for (tag, value) in tags) +
+            '</qualifier_tags>').encode()
+        csv_rows.append(csv_row)
+        json_rows.append({
+            issues.JSON_INDEX_FILENAME: source_name,
+            issues.JSON_INDEX_KIND: kind,
+            issues.JSON_INDEX_TYPE: issue_type,
+            issues.JSON_INDEX_LINE: i % 500,
+            issues.QUALIFIER_TAGS: [{'tag': tag, 'value': value}
+                                    for (tag, value) in tags],
+        })
+    return csv_rows, json_rows
+
+
+def measure(name, keep, rows):
+    start = time.time()
+    kept = sum(1 for row in rows if keep(row))
+    elapsed = time.time() - start
+    print('{:<24} {:>9} rows/s  ({} of {} kept, {:.2f}s)'.format(
+        name, int(len(rows) / elapsed), kept, len(rows), elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--issues', type=int, default=1000000)
+    parser.add_argument('--sources', type=int, default=2000)
+    parser.add_argument('--analyzer', default='infer')
+    args = parser.parse_args()
+    args.no_filtering = False
+
+    tmp_dir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        os.chdir(tmp_dir)
+        sources = create_sources(args.sources)
+        csv_rows, json_rows = synthetic_rows(args.issues, sources)
+        measure('csv filter, baseline',
+                lambda row: baseline_filter.is_clean_csv(args, row),
+                csv_rows)
+        measure('csv filter', issues.IssueFilter(args.analyzer).keep_csv,
+                csv_rows)
+        measure('json filter, baseline',
+                lambda row: baseline_filter.is_clean_json(args, row),
+                json_rows)
+        measure('json filter', issues.IssueFilter(args.analyzer).keep_json,
+                json_rows)
+
+        with open('report.csv', 'wb') as file_out:
+            writer = csv.writer(file_out)
+            writer.writerow([b'header'] * len(csv_rows[0]))
+            writer.writerows(csv_rows)
+        start = time.time()
+        issues.clean_csv(issues.IssueFilter(args.analyzer), 'report.csv')
+        elapsed = time.time() - start
+        print('{:<24} {:>9} rows/s  ({:.2f}s)'.format(
+            'clean_csv', int(args.issues / elapsed), elapsed))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp_dir, True)
+
+
+if __name__ == '__main__':
+    main()
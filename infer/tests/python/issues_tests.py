@@ -0,0 +1,238 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import io
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+import baseline_filter
+from inferlib import colorize, config, issues, utils
+
+ANALYZERS = [
+    config.ANALYZER_INFER,
+    config.ANALYZER_ERADICATE,
+    config.ANALYZER_CHECKERS,
+    config.ANALYZER_TRACING,
+]
+
+KINDS = [
+    issues.ISSUE_KIND_ERROR,
+    issues.ISSUE_KIND_WARNING,
+    issues.ISSUE_KIND_INFO,
+    issues.ISSUE_KIND_ADVICE,
+    '',
+]
+
+TYPES = ['', 'DEAD_STORE', issues.ISSUE_TYPES[0]] + \
+    issues.NULL_STYLE_ISSUE_TYPES
+
+# qualifier tags as in the csv report, and as in the json report, or None
+# when the json report cannot have them
+QUALIFIER_TAGS = [
+    ('<qualifier_tags><bucket>B1</bucket></qualifier_tags>',
+     [{'tag': 'bucket', 'value': 'B1'}]),
+    ('<qualifier_tags><value>x</value><bucket>B2</bucket></qualifier_tags>',
+     [{'tag': 'value', 'value': 'x'}, {'tag': 'bucket', 'value': 'B2'}]),
+    ('<qualifier_tags><bucket>B5</bucket></qualifier_tags>',
+     [{'tag': 'bucket', 'value': 'B5'}]),
+    ('<qualifier_tags><value>x</value></qualifier_tags>',
+     [{'tag': 'value', 'value': 'x'}]),
+    ('<qualifier_tags><value>\u00e9</value><bucket>B1</bucket>'
+     '</qualifier_tags>',
+     [{'tag': 'value', 'value': '\u00e9'}, {'tag': 'bucket', 'value': 'B1'}]),
+    ('<qualifier_tags><bucket>B&amp;1</bucket></qualifier_tags>',
+     [{'tag': 'bucket', 'value': 'B&1'}]),
+    ('<qualifier_tags></qualifier_tags>', []),
+    ('<qualifier_tags/>', []),
+    ('', []),
+    # not parsed by the baseline, hence no bucket
+    ('<qualifier_tags><bucket>B1</bucket>', None),
+    ('<qualifier_tags><bucket>B1</qualifier_tags>', None),
+    ('<other><bucket>B1</bucket></other>', None),
+    ('<qualifier_tags><x><bucket>B1</bucket></x></qualifier_tags>', None),
+    ('<qualifier_tags><x><bucket>B1</bucket></qualifier_tags>', None),
+]
+
+EXISTING_FILE = 'exists.java'
+MISSING_FILE = 'missing.java'
+
+
+def csv_row(filename, kind, issue_type, qualifier_tags):
+    row = [b''] * (issues.CSV_INDEX_ADVICE + 1)
+    row[issues.CSV_INDEX_FILENAME] = filename.encode()
+    row[issues.CSV_INDEX_KIND] = kind.encode()
+    row[issues.CSV_INDEX_TYPE] = issue_type.encode()
+    row[issues.CSV_INDEX_QUALIFIER_TAGS] = qualifier_tags.encode('utf-8')
+    return row
+
+
+def json_row(filename, kind, issue_type, qualifier_tags):
+    return {
+        issues.JSON_INDEX_FILENAME: filename,
+        issues.JSON_INDEX_KIND: kind,
+        issues.JSON_INDEX_TYPE: issue_type,
+        issues.QUALIFIER_TAGS: qualifier_tags,
+    }
+
+
+class IssueFilterTest(unittest.TestCase):
+    """IssueFilter keeps the same issues as the filter it replaced"""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.mkdtemp()
+        os.chdir(self.tmp_dir)
+        open(EXISTING_FILE, 'w').close()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp_dir, True)
+
+    def cases(self):
+        return itertools.product(ANALYZERS, [False, True],
+                                 [EXISTING_FILE, MISSING_FILE],
+                                 KINDS, TYPES, QUALIFIER_TAGS)
+
+    def test_keep_csv(self):
+        for (analyzer, no_filtering, filename, kind, issue_type,
+             (xml_tags, _)) in self.cases():
+            args = argparse.Namespace(analyzer=analyzer,
+                                      no_filtering=no_filtering)
+            issue_filter = issues.IssueFilter(analyzer, no_filtering)
+            row = csv_row(filename, kind, issue_type, xml_tags)
+            self.assertEqual(
+                bool(issue_filter.keep_csv(row)),
+                bool(baseline_filter.is_clean_csv(args, row)),
+                row)
+
+    def test_keep_json(self):
+        for (analyzer, no_filtering, filename, kind, issue_type,
+             (_, json_tags)) in self.cases():
+            if json_tags is None:
+                continue
+            args = argparse.Namespace(analyzer=analyzer,
+                                      no_filtering=no_filtering)
+            issue_filter = issues.IssueFilter(analyzer, no_filtering)
+            row = json_row(filename, kind, issue_type, json_tags)
+            self.assertEqual(
+                bool(issue_filter.keep_json(row)),
+                bool(baseline_filter.is_clean_json(args, row)),
+                row)
+
+    def test_files_checked_once(self):
+        issue_filter = issues.IssueFilter(config.ANALYZER_INFER)
+        row = json_row(MISSING_FILE, issues.ISSUE_KIND_ERROR,
+                       issues.ISSUE_TYPES[0], [])
+        self.assertFalse(issue_filter.keep_json(row))
+        # the existence of the file is not checked again
+        open(MISSING_FILE, 'w').close()
+        self.assertFalse(issue_filter.keep_json(row))
+        self.assertTrue(issues.IssueFilter(config.ANALYZER_INFER)
+                        .keep_json(row))
+
+
+
+class ErrorsReportTest(unittest.TestCase):
+    """ErrorsReport writes the same text as formatting the list of the
+    visible issues"""
+
+    SOURCE = ''.join('line {}\n'.format(i) for i in range(1, 11))
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.mkdtemp()
+        os.chdir(self.tmp_dir)
+        for name in ['A.java', 'B.java']:
+            with open(name, 'w') as file_out:
+                file_out.write(self.SOURCE)
+        self.bugs_out = os.path.join(self.tmp_dir, config.BUGS_FILENAME)
+        self.stdout = sys.stdout
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp_dir, True)
+
+    def issue(self, filename, line, kind=issues.ISSUE_KIND_ERROR,
+              issue_type='NULL_DEREFERENCE'):
+        return {
+            issues.JSON_INDEX_FILENAME: filename,
+            issues.JSON_INDEX_LINE: line,
+            issues.JSON_INDEX_KIND: kind,
+            issues.JSON_INDEX_TYPE: issue_type,
+            issues.JSON_INDEX_QUALIFIER: 'qualifier of {}'.format(line),
+        }
+
+    def print_and_save(self, reports):
+        """Return the text printed and the text saved by ErrorsReport"""
+        errors = issues.ErrorsReport(self.bugs_out)
+        for report in reports:
+            errors.add(report)
+        sys.stdout = io.BytesIO()
+        try:
+            errors.print_and_save()
+            printed = utils.decode(sys.stdout.getvalue())
+        finally:
+            sys.stdout = self.stdout
+        with open(self.bugs_out, 'rb') as file_in:
+            saved = utils.decode(file_in.read())
+        return (printed, saved)
+
+    def test_same_text(self):
+        visible = [self.issue('A.java', 1),
+                   self.issue('B.java', 5, kind=issues.ISSUE_KIND_WARNING,
+                              issue_type='RESOURCE_LEAK'),
+                   self.issue('A.java', 10)]
+        hidden = [self.issue(MISSING_FILE, 2),
+                  self.issue('A.java', 3, kind=issues.ISSUE_KIND_INFO)]
+        (printed, saved) = self.print_and_save(visible[:2] + hidden +
+                                               visible[2:])
+        self.assertEqual(printed, '\n{}\n'.format(
+            issues._text_of_report_list(visible)))
+        self.assertEqual(saved, issues._text_of_report_list(
+            visible, colorize.PLAIN_FORMATTER))
+        self.assertIn('Found 3 issues', saved)
+        self.assertIn('line 10', printed)
+
+    def test_no_issues(self):
+        (printed, saved) = self.print_and_save([self.issue(MISSING_FILE, 1)])
+        self.assertIn('No issues found', printed)
+        self.assertEqual(saved, 'No issues found')
+
+    def test_print_and_save_errors(self):
+        json_report = os.path.join(self.tmp_dir, config.JSON_REPORT_FILENAME)
+        reports = [self.issue('A.java', 1), self.issue('B.java', 2)]
+        utils.dump_json_to_path(reports, json_report)
+        sys.stdout = io.BytesIO()
+        try:
+            issues.print_and_save_errors(json_report, self.bugs_out, None)
+        finally:
+            sys.stdout = self.stdout
+        with open(self.bugs_out, 'rb') as file_in:
+            self.assertEqual(utils.decode(file_in.read()),
+                             issues._text_of_report_list(
+                                 reports, colorize.PLAIN_FORMATTER))
+
+
+if __name__ == '__main__':
+    unittest.main()
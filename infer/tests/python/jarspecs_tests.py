@@ -0,0 +1,177 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+import zipfile
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import jarspecs, utils
+
+DAY = 24 * 3600
+
+
+class JarSpecsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.tmp_dir, True)
+
+    def jar(self, name, entries):
+        path = os.path.join(self.tmp_dir, name)
+        with zipfile.ZipFile(path, 'w') as archive:
+            for (entry, content) in entries:
+                archive.writestr(entry, content)
+        return path
+
+
+class ExtractSpecsTest(JarSpecsTestCase):
+
+    def test_only_specs_read_by_infer(self):
+        jar = self.jar('lib.jar', [
+            ('specs/a.specs', b'a'),
+            ('specs/sub/b.specs', b'b'),
+            ('other/c.specs', b'c'),
+            ('d.specs', b'd'),
+            ('specs/e.txt', b'e'),
+            ('specs/../f.specs', b'f'),
+            ('/specs/g.specs', b'g'),
+            ('com/A.class', b'class'),
+        ])
+        directory = os.path.join(self.tmp_dir, 'out')
+        os.mkdir(directory)
+        info = jarspecs.extract_specs(jar, directory)
+        self.assertEqual(os.listdir(directory), ['a.specs'])
+        self.assertEqual(info, {'jar': jar, 'specs': 1, 'size': 1,
+                                'version': jarspecs.ENTRY_VERSION})
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)),
+                         ['lib.jar', 'out'])
+
+
+class JarSpecsCacheTest(JarSpecsTestCase):
+
+    def cache(self, max_size=1 << 20, max_age=DAY):
+        return jarspecs.JarSpecsCache(self.cache_dir, max_size, max_age)
+
+    def entries(self):
+        return sorted(name for name in os.listdir(self.cache_dir)
+                      if not name.startswith('.'))
+
+    def test_specs_dir(self):
+        cache = self.cache()
+        jar = self.jar('lib.jar', [('specs/a.specs', b'a')])
+        specs_dir = cache.specs_dir(jar)
+        with open(os.path.join(specs_dir, 'a.specs')) as file_in:
+            self.assertEqual(file_in.read(), 'a')
+        self.assertEqual(cache.specs_dir(jar), specs_dir)
+        # the same jar elsewhere has the same specs
+        copy = os.path.join(self.tmp_dir, 'copy.jar')
+        shutil.copy(jar, copy)
+        self.assertEqual(cache.specs_dir(copy), specs_dir)
+        self.assertEqual(len(self.entries()), 1)
+
+    def test_no_specs(self):
+        cache = self.cache()
+        jar = self.jar('lib.jar', [('com/A.class', b'class')])
+        self.assertIsNone(cache.specs_dir(jar))
+        # the jar is not extracted again
+        self.assertEqual(len(self.entries()), 1)
+        self.assertIsNone(cache.specs_dir(jar))
+
+    def test_jar_changed(self):
+        cache = self.cache()
+        jar = self.jar('lib.jar', [('specs/a.specs', b'a')])
+        specs_dir = cache.specs_dir(jar)
+        self.jar('lib.jar', [('specs/b.specs', b'b')])
+        # make the change visible even within the resolution of mtimes
+        os.utime(jar, (0, 0))
+        new_specs_dir = cache.specs_dir(jar)
+        self.assertNotEqual(new_specs_dir, specs_dir)
+        self.assertEqual(sorted(os.listdir(new_specs_dir)),
+                         [jarspecs.ENTRY_INFO_FILENAME, 'b.specs'])
+
+    def test_index_saved(self):
+        cache = self.cache()
+        jar = self.jar('lib.jar', [('specs/a.specs', b'a')])
+        specs_dir = cache.specs_dir(jar)
+        cache.close()
+        cache = self.cache()
+        self.assertIn(jar, cache.jar_index.files)
+        self.assertEqual(cache.specs_dir(jar), specs_dir)
+
+    def test_previous_version(self):
+        cache = self.cache()
+        jar = self.jar('lib.jar', [('specs/a.specs', b'a'),
+                                   ('specs/sub/b.specs', b'b')])
+        specs_dir = cache.specs_dir(jar)
+        # an entry of the previous version, with all the specs
+        info_path = os.path.join(specs_dir, jarspecs.ENTRY_INFO_FILENAME)
+        info = utils.load_json_from_path(info_path)
+        del info['version']
+        utils.dump_json_to_path(info, info_path)
+        open(os.path.join(specs_dir, 'b.specs'), 'w').close()
+        self.assertEqual(cache.specs_dir(jar), specs_dir)
+        self.assertEqual(sorted(os.listdir(specs_dir)),
+                         [jarspecs.ENTRY_INFO_FILENAME, 'a.specs'])
+
+    def test_unreadable_jar(self):
+        cache = self.cache()
+        with self.assertRaises(IOError):
+            cache.specs_dir(os.path.join(self.tmp_dir, 'missing.jar'))
+        not_a_jar = os.path.join(self.tmp_dir, 'not_a.jar')
+        with open(not_a_jar, 'w') as file_out:
+            file_out.write('not a jar')
+        with self.assertRaises(zipfile.BadZipfile):
+            cache.specs_dir(not_a_jar)
+        self.assertEqual(self.entries(), [])
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_evict(self):
+        cache = self.cache()
+        jars = [self.jar('lib{}.jar'.format(i),
+                         [('specs/a.specs', b'a' * (i + 1))])
+                for i in range(3)]
+        specs_dirs = [cache.specs_dir(jar) for jar in jars]
+        for (i, specs_dir) in enumerate(specs_dirs):
+            os.utime(specs_dir, (1000 + i, 1000 + i))
+        # the entries last used long ago are removed
+        cache.max_size = 1 << 20
+        cache.evict()
+        self.assertEqual(self.entries(), [])
+        specs_dirs = [cache.specs_dir(jar) for jar in jars]
+        now = time.time()
+        for (i, specs_dir) in enumerate(specs_dirs):
+            os.utime(specs_dir, (now - 30 + i, now - 30 + i))
+        # then the least recently used ones down to the maximum size
+        cache.max_size = 3
+        cache.evict()
+        self.assertEqual(self.entries(),
+                         [os.path.basename(specs_dirs[2])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import jobserver, scheduler
+
+# each job logs when it starts and ends, the arguments of the job are
+# ignored
+JOB_CMD = ['sh', '-c', 'echo start >>jobs.log; sleep 0.2; '
+           'echo end >>jobs.log', 'job']
+
+
+def available_tokens(pool):
+    tokens = []
+    while True:
+        token = pool.acquire()
+        if token is None:
+            break
+        tokens.append(token)
+    for token in tokens:
+        pool.release(token)
+    return len(tokens)
+
+
+class JobServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.environ = dict(os.environ)
+        os.environ.pop(jobserver.JOBSERVER_ENVVAR, None)
+        os.environ.pop('MAKEFLAGS', None)
+        self.pools = []
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        for pool in self.pools:
+            pool.close()
+        os.environ.clear()
+        os.environ.update(self.environ)
+
+    def create(self, tokens):
+        pool = jobserver.create(tokens)
+        self.pools.append(pool)
+        return pool
+
+
+class JobServerTest(JobServerTestCase):
+
+    def test_tokens(self):
+        pool = self.create(2)
+        first = pool.acquire()
+        second = pool.acquire()
+        self.assertEqual([first, second], [jobserver.TOKEN] * 2)
+        self.assertIsNone(pool.acquire())
+        pool.release(first)
+        self.assertEqual(pool.acquire(), jobserver.TOKEN)
+        self.assertIsNone(pool.acquire())
+
+    def test_shared_with_children(self):
+        pool = self.create(3)
+        self.assertEqual(os.environ[jobserver.JOBSERVER_ENVVAR],
+                         pool.auth)
+        child = jobserver.from_environment()
+        self.pools.append(child)
+        token = child.acquire()
+        self.assertIsNotNone(token)
+        self.assertEqual(available_tokens(pool), 2)
+        child.release(token)
+        self.assertEqual(available_tokens(pool), 3)
+
+    def test_make_jobserver(self):
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b'++')
+        try:
+            os.environ['MAKEFLAGS'] = \
+                ' -j --jobserver-fds={},{}'.format(read_fd, write_fd)
+            pool = jobserver.from_environment()
+            self.pools.append(pool)
+            self.assertEqual(available_tokens(pool), 2)
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+    def test_no_jobserver(self):
+        self.assertIsNone(jobserver.from_environment())
+        # e.g. make did not pass its file descriptors
+        os.environ['MAKEFLAGS'] = '--jobserver-auth=1000,1001'
+        self.assertIsNone(jobserver.from_environment())
+
+    def test_close(self):
+        pool = self.create(1)
+        fifo_dir = os.path.dirname(pool.auth[len(jobserver.FIFO_PREFIX):])
+        pool.close()
+        self.assertFalse(os.path.exists(fifo_dir))
+
+
+class SchedulerTokensTest(JobServerTestCase):
+
+    def setUp(self):
+        super(SchedulerTokensTest, self).setUp()
+        self.cwd = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cwd, True)
+        super(SchedulerTokensTest, self).tearDown()
+
+    def clusters(self, count):
+        return [scheduler.Cluster('cl{}'.format(i), 'x{}.cluster'.format(i),
+                                  'source{}'.format(i))
+                for i in range(count)]
+
+    def max_running(self):
+        running = 0
+        max_running = 0
+        with open(os.path.join(self.cwd, 'jobs.log')) as file_in:
+            for line in file_in:
+                running += 1 if line.strip() == 'start' else -1
+                max_running = max(max_running, running)
+        return max_running
+
+    def test_jobs_limited_by_tokens(self):
+        pool = self.create(1)
+        results = scheduler.Scheduler(JOB_CMD, 4, cwd=self.cwd,
+                                      jobserver=pool).run(self.clusters(6))
+        self.assertEqual([result.exit_status for result in results], [0] * 6)
+        # one job on the implicit token, and one with the token of the pool
+        self.assertEqual(self.max_running(), 2)
+        self.assertEqual(available_tokens(pool), 1)
+
+    def test_jobs_limited_by_jobs(self):
+        pool = self.create(8)
+        scheduler.Scheduler(JOB_CMD, 3, cwd=self.cwd,
+                            jobserver=pool).run(self.clusters(6))
+        self.assertEqual(self.max_running(), 3)
+        self.assertEqual(available_tokens(pool), 8)
+
+    def test_tokens_released_on_error(self):
+        pool = self.create(2)
+        # the output of the third job cannot be written
+        os.mkdir(os.path.join(self.cwd, 'cl2'))
+        sched = scheduler.Scheduler(JOB_CMD, 4, cwd=self.cwd, jobserver=pool)
+        with self.assertRaises(IOError):
+            sched.run(self.clusters(4))
+        self.assertEqual(available_tokens(pool), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
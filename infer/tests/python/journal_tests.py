@@ -0,0 +1,120 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import journal
+
+KEY = {'capture': 'abc', 'options': ['-j', '2']}
+
+
+class AnalysisJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'journal.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, True)
+
+    def journal(self, key=KEY):
+        return journal.AnalysisJournal(self.path, key)
+
+    def run_analysis(self, source_names, key=KEY):
+        """Analyze source_names after the clusters already analyzed, and
+        return these"""
+        analysis = self.journal(key)
+        completed = analysis.completed()
+        analysis.start(resume=bool(completed))
+        for source_name in source_names:
+            analysis.record(source_name)
+        analysis.close()
+        return completed
+
+    def test_resume(self):
+        self.assertEqual(self.run_analysis(['a', 'b']), set())
+        # interrupted, then started again
+        self.assertEqual(self.run_analysis(['c']), set(['a', 'b']))
+        self.assertEqual(self.journal().completed(), set(['a', 'b', 'c']))
+
+    def test_recorded_right_away(self):
+        analysis = self.journal()
+        analysis.start(resume=False)
+        analysis.record('a')
+        # e.g. infer is killed before closing the journal
+        self.assertEqual(self.journal().completed(), set(['a']))
+        analysis.close()
+
+    def test_other_key(self):
+        self.run_analysis(['a', 'b'])
+        other_key = dict(KEY, capture='def')
+        self.assertEqual(self.run_analysis(['c'], other_key), set())
+        # the entries of the previous analysis are gone
+        self.assertEqual(self.journal(other_key).completed(), set(['c']))
+        self.assertEqual(self.journal().completed(), set())
+
+    def test_finish(self):
+        self.run_analysis(['a'])
+        analysis = self.journal()
+        analysis.start(resume=True)
+        analysis.finish()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(self.journal().completed(), set())
+        # finishing twice is harmless
+        analysis.finish()
+
+
+class CaptureFingerprintTest(unittest.TestCase):
+
+    def setUp(self):
+        self.infer_out = tempfile.mkdtemp()
+        self.source_dir = os.path.join(self.infer_out, 'captured', 'a.c')
+        os.makedirs(self.source_dir)
+        self.write('a.cfg', 'cfg', 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.infer_out, True)
+
+    def write(self, name, content, mtime):
+        path = os.path.join(self.source_dir, name)
+        with open(path, 'w') as file_out:
+            file_out.write(content)
+        os.utime(path, (mtime, mtime))
+
+    def test_fingerprint(self):
+        fingerprint = journal.capture_fingerprint(self.infer_out)
+        self.assertEqual(journal.capture_fingerprint(self.infer_out),
+                         fingerprint)
+        # results of the analysis do not change the capture
+        os.mkdir(os.path.join(self.infer_out, 'specs'))
+        self.assertEqual(journal.capture_fingerprint(self.infer_out),
+                         fingerprint)
+        self.write('a.cfg', 'cfg', 2000)
+        touched = journal.capture_fingerprint(self.infer_out)
+        self.assertNotEqual(touched, fingerprint)
+        self.write('a.cg', '', 2000)
+        self.assertNotEqual(journal.capture_fingerprint(self.infer_out),
+                            touched)
+
+
+if __name__ == '__main__':
+    unittest.main()
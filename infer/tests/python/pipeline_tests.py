@@ -0,0 +1,187 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import csv
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import pipeline, warmstart
+
+# procedure -> source file
+PROCS = {
+    'pa': 'a.c',
+    'pb': 'b.c',
+    'pc': 'c.c',
+    'pd': 'd.c',
+}
+
+# (caller, callee)
+CALLS = [
+    ('pb', 'pa'),
+    ('pc', 'pb'),
+]
+
+START_TIME = 1000000.0
+
+
+def write_csv(path, header, rows):
+    with open(path, 'wb') as file_out:
+        writer = csv.writer(file_out)
+        writer.writerow([cell.encode() for cell in header])
+        for row in rows:
+            writer.writerow([cell.encode() for cell in row])
+
+
+def touch(path, mtime=None):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'a'):
+        pass
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+class PipelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.infer_out = tempfile.mkdtemp()
+        self.watcher = pipeline.CaptureWatcher(self.infer_out)
+
+    def tearDown(self):
+        shutil.rmtree(self.infer_out, True)
+
+    def capture(self, name, complete=True):
+        source_dir = os.path.join(self.infer_out, 'captured', name)
+        touch(os.path.join(source_dir, name + '.cfg'))
+        if complete:
+            touch(os.path.join(source_dir, name + '.cg'))
+
+    def recapture(self, name):
+        path = os.path.join(self.infer_out, 'captured', name, name + '.cfg')
+        with open(path, 'a') as file_out:
+            file_out.write('changed')
+
+
+class CaptureWatcherTest(PipelineTestCase):
+
+    def test_poll(self):
+        self.capture('a')
+        self.capture('b', complete=False)
+        # a directory is stable once it did not change between two polls
+        self.assertEqual(self.watcher.poll(), [])
+        self.capture('c')
+        self.assertEqual(self.watcher.poll(), ['a'])
+        self.recapture('c')
+        self.assertEqual(self.watcher.poll(), ['a'])
+        self.capture('b')
+        self.assertEqual(self.watcher.poll(), ['a', 'c'])
+        self.assertEqual(self.watcher.poll(), ['a', 'b', 'c'])
+
+    def test_schedule(self):
+        for name in ['a', 'b', 'c']:
+            self.capture(name)
+        self.watcher.poll()
+        self.watcher.schedule(self.watcher.poll(), START_TIME)
+        self.capture('d')
+        self.watcher.poll()
+        self.assertEqual(self.watcher.poll(), ['d'])
+        self.assertEqual(self.watcher.unscheduled(), ['d'])
+        self.assertEqual(self.watcher.recaptured(), set())
+        self.recapture('b')
+        self.assertEqual(self.watcher.recaptured(), set(['b']))
+        self.watcher.unschedule(['b'])
+        self.assertEqual(self.watcher.recaptured(), set())
+        self.assertEqual(self.watcher.unscheduled(), ['b', 'd'])
+
+
+class InvalidateTest(PipelineTestCase):
+
+    def setUp(self):
+        super(InvalidateTest, self).setUp()
+        self.procs_csv = os.path.join(self.infer_out, 'procs.csv')
+        write_csv(self.procs_csv, ['name_id', 'file'], sorted(PROCS.items()))
+        self.calls_csv = os.path.join(self.infer_out, 'calls.csv')
+        write_csv(self.calls_csv, ['caller_id', 'callee_id', 'file'],
+                  [(caller, callee, PROCS[caller])
+                   for (caller, callee) in CALLS])
+        self.names = {}
+        for (name_id, source_file) in PROCS.items():
+            name = warmstart.captured_dir_name(source_file)
+            self.names[name_id] = name
+            self.capture(name)
+            touch(os.path.join(self.infer_out, 'specs',
+                               name_id + warmstart.SPECS_EXTENSION))
+            # captured long before the analysis started
+            touch(pipeline.attributes_file(self.infer_out, name_id),
+                  START_TIME - 100)
+        self.watcher.schedule(sorted(self.names.values()), START_TIME)
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        super(InvalidateTest, self).tearDown()
+
+    def invalidate(self):
+        to_analyze = pipeline.invalidate(self.infer_out, self.watcher,
+                                         self.procs_csv, self.calls_csv)
+        specs = set(os.path.splitext(name)[0] for name in os.listdir(
+            os.path.join(self.infer_out, 'specs')))
+        return (to_analyze, specs)
+
+    def assert_invalidated(self, name_ids):
+        to_analyze, specs = self.invalidate()
+        self.assertEqual(to_analyze,
+                         set(self.names[name_id] for name_id in name_ids))
+        self.assertEqual(specs, set(PROCS) - set(name_ids))
+
+    def test_nothing_changed(self):
+        self.assert_invalidated([])
+
+    def test_callee_captured_late(self):
+        # the attributes of the callee were written after the analysis of
+        # its caller started
+        touch(pipeline.attributes_file(self.infer_out, 'pa'), START_TIME + 1)
+        self.assert_invalidated(['pb', 'pc'])
+
+    def test_mtime_resolution(self):
+        touch(pipeline.attributes_file(self.infer_out, 'pb'),
+              START_TIME - pipeline.MTIME_RESOLUTION / 2)
+        self.assert_invalidated(['pc'])
+
+    def test_recaptured(self):
+        self.recapture(self.names['pa'])
+        self.assert_invalidated(['pa', 'pb', 'pc'])
+
+    def test_missing_attributes(self):
+        os.remove(pipeline.attributes_file(self.infer_out, 'pa'))
+        self.assert_invalidated([])
+
+    def test_attributes_file(self):
+        self.assertEqual(pipeline.attributes_file('out', 'abc123'),
+                         os.path.join('out', 'attributes', '23',
+                                      'abc123.attr'))
+        self.assertEqual(pipeline.attributes_file('out', 'a'),
+                         os.path.join('out', 'attributes', '.', 'a.attr'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+import urllib2
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import cache, cacheserver, remotecache, utils
+
+VERSION = 'v1.0-abc'
+
+
+class QuietRequestHandler(cacheserver.CacheRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RemoteCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'server')
+        os.mkdir(self.cache_dir)
+        self.server = cacheserver.CacheServer(('127.0.0.1', 0),
+                                              self.cache_dir, max_size=100)
+        self.server.RequestHandlerClass = QuietRequestHandler
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{}/'.format(self.server.server_port)
+        self.cache = remotecache.RemoteCache(self.url, VERSION, 50,
+                                             timeout=5)
+        # do not go through a proxy to reach the local server
+        self.environ = dict(os.environ)
+        os.environ['no_proxy'] = '127.0.0.1'
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        os.environ.clear()
+        os.environ.update(self.environ)
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.tmp_dir, True)
+
+    def bundle(self, content):
+        path = os.path.join(self.tmp_dir, 'bundle' + cache.BUNDLE_EXTENSION)
+        with open(path, 'wb') as file_out:
+            file_out.write(content)
+        return path
+
+    def stored(self):
+        stored = []
+        for (directory, _, names) in os.walk(self.cache_dir):
+            stored += [os.path.relpath(os.path.join(directory, name),
+                                       self.cache_dir)
+                       for name in names]
+        return sorted(stored)
+
+    def http_status(self, method, path, data=None):
+        request = urllib2.Request(utils.encode(self.url.rstrip('/') + path),
+                                  data=data)
+        request.get_method = lambda: method
+        try:
+            return urllib2.urlopen(request, timeout=5).getcode()
+        except urllib2.HTTPError as e:
+            return e.code
+
+    def test_put_and_get(self):
+        path = self.bundle(b'bundle')
+        self.cache.put_in_background('key', path)
+        # the bundle was read, it may be removed before the upload is done
+        os.remove(path)
+        remotecache.wait_for_uploads()
+        self.assertEqual(self.stored(),
+                         [os.path.join(VERSION,
+                                       'key' + cache.BUNDLE_EXTENSION)])
+        downloaded = os.path.join(self.tmp_dir, 'downloaded')
+        self.assertTrue(self.cache.get('key', downloaded))
+        with open(downloaded, 'rb') as file_in:
+            self.assertEqual(file_in.read(), b'bundle')
+
+    def test_missing(self):
+        downloaded = os.path.join(self.tmp_dir, 'downloaded')
+        self.assertFalse(self.cache.get('key', downloaded))
+        # another version of infer does not share the bundles
+        self.cache.put_in_background('key', self.bundle(b'bundle'))
+        remotecache.wait_for_uploads()
+        other = remotecache.RemoteCache(self.url, 'v2', 50, timeout=5)
+        self.assertFalse(other.get('key', downloaded))
+
+    def test_too_large(self):
+        # larger than the maximum upload size of the client
+        self.cache.put_in_background('key', self.bundle(b'x' * 60))
+        remotecache.wait_for_uploads()
+        self.assertEqual(self.stored(), [])
+        # larger than the maximum size of the server
+        self.cache.max_upload_size = 1000
+        self.cache.put_in_background('key', self.bundle(b'x' * 200))
+        remotecache.wait_for_uploads()
+        self.assertEqual(self.stored(), [])
+
+    def test_bad_paths(self):
+        for path in ['/', '/key' + cache.BUNDLE_EXTENSION,
+                     '/../key' + cache.BUNDLE_EXTENSION,
+                     '/%2e%2e/key' + cache.BUNDLE_EXTENSION,
+                     '/v/key.txt', '/v/a/key' + cache.BUNDLE_EXTENSION]:
+            self.assertEqual(self.http_status(b'GET', path), 400)
+            self.assertEqual(self.http_status(b'PUT', path, b'x'), 400)
+        self.assertEqual(self.stored(), [])
+
+    def test_unreachable(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.assertFalse(self.cache.get(
+            'key', os.path.join(self.tmp_dir, 'downloaded')))
+        self.cache._put(self.cache._bundle_url('key'), b'bundle')
+
+
+if __name__ == '__main__':
+    unittest.main()
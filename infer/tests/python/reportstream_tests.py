@@ -0,0 +1,156 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import reportstream, utils
+
+
+def first(row):
+    return row[0]
+
+
+class ExternalSortTest(unittest.TestCase):
+
+    def setUp(self):
+        self.merge_fan_in = reportstream.MERGE_FAN_IN
+        # exercise the intermediate merges on few runs
+        reportstream.MERGE_FAN_IN = 3
+        random.seed(0)
+
+    def tearDown(self):
+        reportstream.MERGE_FAN_IN = self.merge_fan_in
+
+    def check(self, rows, run_size):
+        self.assertEqual(
+            list(reportstream.external_sort(rows, first, run_size)),
+            sorted(rows, key=first))
+
+    def test_sorted(self):
+        rows = [(random.random(), i) for i in range(1000)]
+        for run_size in [1, 7, 100, 999, 1000, 1001]:
+            self.check(rows, run_size)
+
+    def test_stable(self):
+        # many rows with the same key, the second element is the position
+        # of the row in the input
+        rows = [(random.randint(0, 5), i) for i in range(1000)]
+        for run_size in [1, 2, 10, 333, 2000]:
+            self.check(rows, run_size)
+
+    def test_rows_not_compared(self):
+        # complex numbers cannot be ordered, only the keys are compared
+        rows = [(i % 3, complex(i, 1)) for i in range(100)]
+        self.check(rows, 7)
+
+    def test_empty(self):
+        self.check([], 10)
+
+    def test_temporary_files_removed(self):
+        tmp_dir = tempfile.mkdtemp()
+        tempdir = tempfile.tempdir
+        try:
+            tempfile.tempdir = tmp_dir
+            rows = reportstream.external_sort(range(100), lambda x: -x, 10)
+            next(rows)
+            self.assertNotEqual(os.listdir(tmp_dir), [])
+            list(rows)
+            self.assertEqual(os.listdir(tmp_dir), [])
+        finally:
+            tempfile.tempdir = tempdir
+            shutil.rmtree(tmp_dir, True)
+
+
+class JsonArrayTest(unittest.TestCase):
+
+    def read(self, text, chunk_size):
+        return list(reportstream.read_json_array(io.StringIO(text),
+                                                 chunk_size))
+
+    def test_read(self):
+        elements = [
+            {'a': 1, 'b': ['x', 'y\u00e9'], 'c': None},
+            12345678901234567890,
+            -1.5e10,
+            'a string with ] and , and "quotes"',
+            [],
+            {},
+            True,
+        ]
+        for text in [utils.decode(json.dumps(elements)),
+                     utils.decode(json.dumps(elements, indent=4)),
+                     ' \n' + utils.decode(json.dumps(elements)) + '\n ']:
+            # every chunk size splits the elements in a different place
+            for chunk_size in list(range(1, 20)) + [len(text)]:
+                self.assertEqual(self.read(text, chunk_size), elements)
+
+    def test_empty(self):
+        for text in ['[]', ' [ ] \n']:
+            for chunk_size in [1, 2, 100]:
+                self.assertEqual(self.read(text, chunk_size), [])
+
+    def test_invalid(self):
+        for text in ['', '{}', '[1, 2', '[1 2]', '[1,', '[1,]', '[,1]',
+                     '[{"a": 1]']:
+            for chunk_size in [1, 3, 100]:
+                with self.assertRaises(ValueError):
+                    self.read(text, chunk_size)
+
+    def test_write_and_read(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'report.json')
+            elements = [{'file': 'f{}.java'.format(i), 'line': i}
+                        for i in range(100)]
+            with reportstream.JsonArrayWriter(path) as writer:
+                for element in elements:
+                    writer.write(element)
+            with open(path, 'r') as file_in:
+                self.assertEqual(json.load(file_in), elements)
+            self.assertEqual(
+                list(reportstream.read_json_array_from_path(path)), elements)
+        finally:
+            shutil.rmtree(tmp_dir, True)
+
+    def test_same_format_as_dump_json(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            streamed = os.path.join(tmp_dir, 'streamed.json')
+            dumped = os.path.join(tmp_dir, 'dumped.json')
+            for elements in [[], [1], [{'a': [1, {'b': 'x\ny'}], 'c': {}},
+                                       'caf\xe9', [], None]]:
+                with reportstream.JsonArrayWriter(streamed) as writer:
+                    for element in elements:
+                        writer.write(element)
+                utils.dump_json_to_path(elements, dumped)
+                with open(streamed, 'rb') as file_in:
+                    with open(dumped, 'rb') as expected:
+                        self.assertEqual(file_in.read(), expected.read())
+        finally:
+            shutil.rmtree(tmp_dir, True)
+
+
+if __name__ == '__main__':
+    unittest.main()
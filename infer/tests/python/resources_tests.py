@@ -0,0 +1,169 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import resources
+
+GB = 1024 * 1024 * 1024
+
+# the constants of resources that name files of the system, replaced with
+# files of a temporary directory
+SYSTEM_PATHS = ['CGROUP_ROOT', 'PROC_SELF_CGROUP', 'PROC_SELF_STATUS',
+                'PROC_MEMINFO', 'NUMA_NODES_DIR']
+
+
+class ResourcesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.system_paths = {}
+        for name in SYSTEM_PATHS:
+            self.system_paths[name] = getattr(resources, name)
+            setattr(resources, name,
+                    os.path.join(self.root, name.lower()))
+
+    def tearDown(self):
+        for (name, path) in self.system_paths.items():
+            setattr(resources, name, path)
+        shutil.rmtree(self.root, True)
+
+    def write(self, path, content):
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as file_out:
+            file_out.write(content)
+
+    def cgroup(self, path, content):
+        self.write(os.path.join(resources.CGROUP_ROOT, path), content + '\n')
+
+
+class CgroupV2Test(ResourcesTestCase):
+
+    def setUp(self):
+        super(CgroupV2Test, self).setUp()
+        self.write(resources.PROC_SELF_CGROUP, '0::/user.slice/infer\n')
+
+    def test_cpu_quota(self):
+        self.assertIsNone(resources.cpu_quota())
+        self.cgroup('user.slice/infer/cpu.max', '250000 100000')
+        self.assertEqual(resources.cpu_quota(), 2.5)
+        self.cgroup('user.slice/infer/cpu.max', 'max 100000')
+        self.assertIsNone(resources.cpu_quota())
+
+    def test_container_root(self):
+        # the cgroup of the process is mounted as the root of the hierarchy
+        self.cgroup('cpu.max', '100000 100000')
+        self.assertEqual(resources.cpu_quota(), 1.0)
+
+    def test_hybrid(self):
+        self.cgroup('unified/user.slice/infer/cpu.max', '50000 100000')
+        self.assertEqual(resources.cpu_quota(), 0.5)
+
+    def test_memory(self):
+        self.assertIsNone(resources._cgroup_memory_available())
+        self.cgroup('user.slice/infer/memory.max', str(4 * GB))
+        self.cgroup('user.slice/infer/memory.current', str(GB))
+        self.assertEqual(resources._cgroup_memory_available(), 3 * GB)
+        self.cgroup('user.slice/infer/memory.current', str(5 * GB))
+        self.assertEqual(resources._cgroup_memory_available(), 0)
+        self.cgroup('user.slice/infer/memory.max', 'max')
+        self.assertIsNone(resources._cgroup_memory_available())
+
+
+class CgroupV1Test(ResourcesTestCase):
+
+    def setUp(self):
+        super(CgroupV1Test, self).setUp()
+        self.write(resources.PROC_SELF_CGROUP, '4:memory:/docker/abc\n'
+                              '3:cpu,cpuacct:/docker/abc\n'
+                              '1:name=systemd:/docker/abc\n')
+
+    def test_cgroup_paths(self):
+        self.assertEqual(resources._cgroup_paths(), {
+            'memory': '/docker/abc',
+            'cpu': '/docker/abc',
+            'cpuacct': '/docker/abc',
+            'name=systemd': '/docker/abc',
+        })
+
+    def test_cpu_quota(self):
+        self.cgroup('cpu,cpuacct/docker/abc/cpu.cfs_period_us', '100000')
+        self.cgroup('cpu,cpuacct/docker/abc/cpu.cfs_quota_us', '-1')
+        self.assertIsNone(resources.cpu_quota())
+        self.cgroup('cpu,cpuacct/docker/abc/cpu.cfs_quota_us', '300000')
+        self.assertEqual(resources.cpu_quota(), 3.0)
+
+    def test_memory(self):
+        self.cgroup('memory/memory.limit_in_bytes', str(2 * GB))
+        self.cgroup('memory/memory.usage_in_bytes', str(GB // 2))
+        self.assertEqual(resources._cgroup_memory_available(),
+                         2 * GB - GB // 2)
+        self.cgroup('memory/memory.limit_in_bytes',
+                    str(resources.CGROUP_V1_NO_MEMORY_LIMIT))
+        self.assertIsNone(resources._cgroup_memory_available())
+
+    def test_memory_available(self):
+        self.write(resources.PROC_MEMINFO, 'MemTotal: 8388608 kB\n'
+                   'MemAvailable: 2097152 kB\n')
+        self.assertEqual(resources.memory_available(), 2 * GB)
+        self.cgroup('memory/memory.limit_in_bytes', str(GB))
+        self.cgroup('memory/memory.usage_in_bytes', '0')
+        self.assertEqual(resources.memory_available(), GB)
+
+
+@unittest.skipIf(hasattr(os, 'sched_getaffinity'),
+                 'the CPU affinity is not read from /proc')
+class PlacementTest(ResourcesTestCase):
+
+    def setUp(self):
+        super(PlacementTest, self).setUp()
+        self.write(resources.PROC_SELF_STATUS, 'Name: python\n'
+                   'Cpus_allowed_list:\t0-5,8\n')
+        self.write(os.path.join(resources.NUMA_NODES_DIR, 'node0', 'cpulist'),
+                   '0-3\n')
+        self.write(os.path.join(resources.NUMA_NODES_DIR, 'node1', 'cpulist'),
+                   '4-7\n')
+
+    def test_parse_cpu_list(self):
+        self.assertEqual(resources._parse_cpu_list('0-3,8,10-11\n'),
+                         [0, 1, 2, 3, 8, 10, 11])
+        self.assertEqual(resources._parse_cpu_list(''), [])
+
+    def test_numa_nodes(self):
+        self.assertEqual(resources.affinity_cpus(), [0, 1, 2, 3, 4, 5, 8])
+        self.assertEqual(resources.numa_nodes(),
+                         [(0, [0, 1, 2, 3]), (1, [4, 5])])
+
+    def test_worker_placement(self):
+        self.assertEqual(resources.worker_placement(3),
+                         [(0, [0, 1]), (1, [4, 5]), (0, [2, 3])])
+        # in proportion to the CPUs of each node
+        self.assertEqual(resources.worker_placement(6), [
+            (0, [0]), (1, [4]), (0, [1]), (0, [2]), (1, [5]), (0, [3])])
+        # more slots than CPUs on node 0
+        placement = resources.worker_placement(7)
+        self.assertEqual(placement[0], (0, [0, 1, 2, 3]))
+        self.assertEqual([node for (node, _) in placement].count(0), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import logging
+import os
+import random
+import shutil
+import signal
+import sys
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import analyze, scheduler
+
+
+class SchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.captured_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.captured_dir, True)
+
+    def clusters(self, sizes):
+        """Return a cluster per source directory, with the given amount of
+        captured data"""
+        clusters = []
+        for (i, (source_name, size)) in enumerate(sizes):
+            source_dir = os.path.join(self.captured_dir, source_name)
+            os.mkdir(source_dir)
+            with open(os.path.join(source_dir, 'data'), 'wb') as file_out:
+                file_out.write(b'x' * size)
+            clusters.append(scheduler.Cluster(
+                'cl{}'.format(i), 'x{}.cluster'.format(i), source_dir))
+        return clusters
+
+
+class OrderTest(SchedulerTestCase):
+
+    def names(self, clusters):
+        return [cluster.source_name() for cluster in clusters]
+
+    def test_without_history(self):
+        # the largest captured data first
+        clusters = self.clusters([('a', 10), ('b', 30), ('c', 20)])
+        self.assertEqual(
+            self.names(scheduler.order_longest_first(clusters, {})),
+            ['b', 'c', 'a'])
+
+    def test_with_history(self):
+        clusters = self.clusters([('a', 10), ('b', 30), ('c', 20)])
+        history = {'a': {'wall_time': 5.0}}
+        self.assertEqual(
+            self.names(scheduler.order_longest_first(clusters, history)),
+            ['b', 'c', 'a'])
+        history = {'a': {'wall_time': 5.0}, 'b': {'wall_time': 1.0}}
+        # c is estimated from the time per byte of a and b
+        self.assertEqual(scheduler.expected_times(clusters, history),
+                         {'cl0': 5.0, 'cl1': 1.0, 'cl2': 20 * 6.0 / 40})
+        self.assertEqual(
+            self.names(scheduler.order_longest_first(clusters, history)),
+            ['a', 'c', 'b'])
+
+    def test_update_history(self):
+        clusters = self.clusters([('a', 10), ('b', 30)])
+        history = {'b': {'wall_time': 1.0, 'peak_rss': 10}}
+        scheduler.update_history(history, [
+            scheduler.ClusterResult(clusters[0], 0, 50.0, 40.0, 100),
+            scheduler.ClusterResult(clusters[1], 0, 2.0, 1.0, None),
+        ])
+        self.assertEqual(history, {
+            'a': {'wall_time': 50.0, 'peak_rss': 100},
+            'b': {'wall_time': 2.0, 'peak_rss': 10},
+        })
+        self.assertEqual(
+            self.names(scheduler.order_longest_first(clusters, history)),
+            ['a', 'b'])
+
+
+# a job that is slow unless run with --cheap, and that starts a child
+# process, which is killed along with the job
+SLOW_JOB_CMD = ['sh', '-c', 'case "$*" in *--cheap*) exit 0;; esac; '
+                'sleep 30 & echo $! >"$0.child"; wait', 'job']
+
+
+def is_running(pid):
+    try:
+        with open('/proc/{}/stat'.format(pid)) as file_in:
+            # a zombie is not running, even if its parent did not reap it
+            return file_in.read().split(')')[-1].split()[0] != 'Z'
+    except IOError:
+        return False
+
+
+class TimeoutTest(SchedulerTestCase):
+
+    TIMEOUT = 0.3
+
+    def setUp(self):
+        super(TimeoutTest, self).setUp()
+        self.cwd = tempfile.mkdtemp()
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.cwd, True)
+        super(TimeoutTest, self).tearDown()
+
+    def run_clusters(self, clusters, retries):
+        sched = scheduler.Scheduler(
+            SLOW_JOB_CMD, 2, cwd=self.cwd, timeout=self.TIMEOUT,
+            retries=retries, retry_options=['--cheap'])
+        return sched.run(clusters)
+
+    def test_retry(self):
+        clusters = self.clusters([('a', 10)])
+        results = self.run_clusters(clusters, 1)
+        self.assertEqual([(result.attempt, result.timed_out)
+                          for result in results], [(1, True), (2, False)])
+        self.assertEqual(results[0].exit_status, -signal.SIGKILL)
+        self.assertGreaterEqual(results[0].wall_time, self.TIMEOUT)
+        self.assertEqual(results[1].exit_status, 0)
+        self.assertEqual(scheduler.final_results(results), [results[1]])
+
+    def test_no_retry_left(self):
+        clusters = self.clusters([('a', 10), ('b', 10)])
+        results = self.run_clusters(clusters, 0)
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(result.timed_out and result.attempt == 1
+                            for result in results))
+
+    def test_process_group_killed(self):
+        self.run_clusters(self.clusters([('a', 10)]), 0)
+        with open(os.path.join(self.cwd, 'job.child')) as file_in:
+            child = int(file_in.read())
+        self.assertFalse(is_running(child))
+
+    def test_straggler_report(self):
+        clusters = self.clusters([('a', 10), ('b', 10)])
+        retried = self.run_clusters(clusters[:1], 1)
+        timed_out = self.run_clusters(clusters[1:], 0)
+        report = scheduler.straggler_report(retried + timed_out,
+                                            self.TIMEOUT)
+        self.assertEqual(report['timeout'], self.TIMEOUT)
+        self.assertEqual([entry['source'] for entry in report['timed_out']],
+                         ['b'])
+        self.assertEqual([(entry['source'], entry['attempt'])
+                          for entry in report['retried']], [('a', 1)])
+        self.assertEqual([entry['source'] for entry in report['slowest']],
+                         ['b', 'a'])
+
+    def test_history_of_retried_cluster(self):
+        clusters = self.clusters([('a', 10)])
+        results = self.run_clusters(clusters, 1)
+        history = {}
+        scheduler.update_history(history, results, self.TIMEOUT)
+        # the cheap retry does not make the cluster look short
+        self.assertGreaterEqual(history['a']['wall_time'], self.TIMEOUT)
+
+    def test_history_largest_attempt(self):
+        clusters = self.clusters([('a', 10), ('b', 10)])
+        history = {'b': {'wall_time': 100.0, 'peak_rss': 10}}
+        scheduler.update_history(history, [
+            scheduler.ClusterResult(clusters[0], -9, 0.1, 0.1, 500,
+                                    timed_out=True),
+            scheduler.ClusterResult(clusters[1], 0, 2.0, 1.0, None),
+            scheduler.ClusterResult(clusters[0], 0, 1.0, 1.0, 200,
+                                    attempt=2),
+        ], timeout=60.0)
+        self.assertEqual(history, {
+            'a': {'wall_time': 60.0, 'peak_rss': 500},
+            # the previous runs do not count, the cluster may have changed
+            'b': {'wall_time': 2.0, 'peak_rss': 10},
+        })
+
+
+class ShardTest(SchedulerTestCase):
+
+    def setUp(self):
+        super(ShardTest, self).setUp()
+        random.seed(0)
+        self.sizes = [('s{}'.format(i), random.randint(1, 1000))
+                      for i in range(50)]
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        super(ShardTest, self).tearDown()
+
+    def shards(self, clusters, history, count):
+        return [[cluster.name for cluster in
+                 scheduler.shard(clusters, history, index, count)]
+                for index in range(1, count + 1)]
+
+    def test_partition(self):
+        clusters = self.clusters(self.sizes)
+        for count in [1, 2, 3, 7, 50, 60]:
+            shards = self.shards(clusters, {}, count)
+            names = sum(shards, [])
+            self.assertEqual(sorted(names),
+                             sorted(cluster.name for cluster in clusters))
+
+    def test_same_split_in_every_order(self):
+        # e.g. when the file system lists the captured directories in a
+        # different order on each machine
+        clusters = self.clusters(self.sizes + [('t', 10), ('u', 10)])
+        shards = self.shards(clusters, {}, 4)
+        for _ in range(5):
+            random.shuffle(clusters)
+            self.assertEqual(
+                [sorted(names) for names in self.shards(clusters, {}, 4)],
+                [sorted(names) for names in shards])
+
+    def test_balanced(self):
+        clusters = self.clusters(self.sizes)
+        history = dict((source_name, {'wall_time': float(size)})
+                       for (source_name, size) in self.sizes)
+        times = scheduler.expected_times(clusters, history)
+        for count in [2, 3, 5]:
+            loads = [sum(times[name] for name in names)
+                     for names in self.shards(clusters, history, count)]
+            # the greedy split is within the longest cluster of the mean
+            mean = sum(loads) / count
+            self.assertLessEqual(max(loads) - mean, max(times.values()))
+
+    def test_history_changes_split(self):
+        clusters = self.clusters([('a', 10), ('b', 10), ('c', 10)])
+        self.assertEqual(self.shards(clusters, {}, 2),
+                         [['cl0', 'cl2'], ['cl1']])
+        history = {'c': {'wall_time': 10.0}, 'a': {'wall_time': 1.0},
+                   'b': {'wall_time': 1.0}}
+        self.assertEqual(self.shards(clusters, history, 2),
+                         [['cl2'], ['cl0', 'cl1']])
+
+    def test_shard_spec(self):
+        self.assertEqual(analyze.shard_spec('1/1'), (1, 1))
+        self.assertEqual(analyze.shard_spec('3/4'), (3, 4))
+        for value in ['0/2', '3/2', '1', '1/x', '/2', '1/2/3']:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                analyze.shard_spec(value)
+
+    def test_merge_stats(self):
+        merged = analyze.merge_stats([
+            {'int': {'files': 2, 'issues': 1}, 'float': {'time': 3.0},
+             'normal': {'shard': '1/2', 'analyzer': 'infer'},
+             'clusters': {'a': {}}},
+            {'int': {'files': 3}, 'float': {'time': 2.0},
+             'normal': {'shard': '2/2', 'analyzer': 'infer'},
+             'clusters': {'b': {}}},
+        ])
+        self.assertEqual(merged, {
+            'int': {'files': 5, 'issues': 1},
+            'float': {'time': 3.0},
+            'normal': {'analyzer': 'infer', 'shards': 2},
+            'clusters': {'a': {}, 'b': {}},
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import colorize, source
+
+
+def is_closed(mapped_source):
+    try:
+        mapped_source.data[:1]
+        return False
+    except ValueError:
+        return True
+
+
+class SourceIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index = source.SourceIndex(max_open=2)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.tmp_dir, True)
+
+    def source(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'wb') as file_out:
+            file_out.write(content)
+        return path
+
+    def test_excerpt(self):
+        path = self.source('a.txt', b'one\ntwo\nthree\nfour\n')
+        self.assertEqual(self.index.excerpt(path, 2, 3), 'two\nthree\n')
+        self.assertEqual(self.index.excerpt(path, 1, 1), 'one\n')
+        # beyond the end of the file
+        self.assertEqual(self.index.excerpt(path, 3, 10), 'three\nfour\n')
+        self.assertEqual(self.index.excerpt(path, 5, 10), '')
+
+    def test_last_line(self):
+        # without a newline at the end of the file
+        path = self.source('a.txt', b'one\ntwo')
+        self.assertEqual(self.index.excerpt(path, 2, 4), 'two')
+        self.assertEqual(self.index.excerpt(path, 1, 4), 'one\ntwo')
+
+    def test_empty_file(self):
+        path = self.source('a.txt', b'')
+        self.assertEqual(self.index.excerpt(path, 1, 3), '')
+
+    def test_undecodable(self):
+        path = self.source('a.txt', b'one\n\xff\n')
+        self.assertEqual(self.index.excerpt(path, 2, 2), '\ufffd\n')
+
+    def test_missing_file(self):
+        with self.assertRaises(IOError):
+            self.index.excerpt(os.path.join(self.tmp_dir, 'missing'), 1, 1)
+
+    def test_least_recently_used_closed(self):
+        paths = [self.source('{}.txt'.format(i), b'x\n') for i in range(3)]
+        self.index.excerpt(paths[0], 1, 1)
+        first = self.index._sources[paths[0]]
+        self.index.excerpt(paths[1], 1, 1)
+        # using the first file again makes the second the oldest one
+        self.index.excerpt(paths[0], 1, 1)
+        self.assertIs(self.index._sources[paths[0]], first)
+        second = self.index._sources[paths[1]]
+        self.index.excerpt(paths[2], 1, 1)
+        self.assertEqual(sorted(self.index._sources), [paths[0], paths[2]])
+        self.assertTrue(is_closed(second))
+        self.assertFalse(is_closed(first))
+        self.index.close()
+        self.assertTrue(is_closed(first))
+        self.assertEqual(len(self.index._sources), 0)
+
+    def test_source_context(self):
+        path = self.source('a.txt', b''.join(b'line %d\n' % i
+                                             for i in range(1, 8)))
+        context = source.build_source_context(path, colorize.PLAIN_FORMATTER,
+                                              3, self.index)
+        self.assertEqual(context, '1.   line 1\n2.   line 2\n'
+                         '3. > line 3\n4.   line 4\n5.   line 5\n6.   \n')
+        # the same without an index
+        self.assertEqual(source.build_source_context(
+            path, colorize.PLAIN_FORMATTER, 3), context)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import specsindex
+
+
+class SpecsIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.merged_dir = os.path.join(self.tmp_dir, 'merged')
+        self.dirs = [os.path.join(self.tmp_dir, name)
+                     for name in ['first', 'second']]
+        for directory in self.dirs:
+            os.mkdir(directory)
+        self.write(self.dirs[0], 'p.specs', 'first p')
+        self.write(self.dirs[1], 'p.specs', 'second p')
+        self.write(self.dirs[1], 'q.specs', 'second q')
+        self.write(self.dirs[1], 'notes.txt', '')
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.tmp_dir, True)
+
+    def write(self, directory, name, content):
+        with open(os.path.join(directory, name), 'w') as file_out:
+            file_out.write(content)
+
+    def merged(self):
+        merged = {}
+        for name in os.listdir(self.merged_dir):
+            if name != specsindex.INDEX_FILENAME:
+                with open(os.path.join(self.merged_dir, name)) as file_in:
+                    merged[name] = file_in.read()
+        return merged
+
+    def test_first_wins(self):
+        specsindex.build(self.merged_dir, self.dirs)
+        self.assertEqual(self.merged(), {'p.specs': 'first p',
+                                         'q.specs': 'second q'})
+        specsindex.build(self.merged_dir, list(reversed(self.dirs)))
+        self.assertEqual(self.merged(), {'p.specs': 'second p',
+                                         'q.specs': 'second q'})
+
+    def test_up_to_date(self):
+        specsindex.build(self.merged_dir, self.dirs)
+        inode = os.stat(self.merged_dir).st_ino
+        specsindex.build(self.merged_dir, self.dirs)
+        self.assertEqual(os.stat(self.merged_dir).st_ino, inode)
+        # a spec added to one of the directories
+        self.write(self.dirs[0], 'r.specs', 'first r')
+        os.utime(self.dirs[0], (1000, 1000))
+        specsindex.build(self.merged_dir, self.dirs)
+        self.assertNotEqual(os.stat(self.merged_dir).st_ino, inode)
+        self.assertEqual(sorted(self.merged()),
+                         ['p.specs', 'q.specs', 'r.specs'])
+
+    def test_missing_dir(self):
+        missing = os.path.join(self.tmp_dir, 'missing')
+        specsindex.build(self.merged_dir, [missing] + self.dirs)
+        self.assertEqual(sorted(self.merged()), ['p.specs', 'q.specs'])
+        # once created, the directory is merged
+        os.mkdir(missing)
+        self.write(missing, 'p.specs', 'new p')
+        specsindex.build(self.merged_dir, [missing] + self.dirs)
+        self.assertEqual(self.merged()['p.specs'], 'new p')
+        # no temporary directory is left behind
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)),
+                         ['first', 'merged', 'missing', 'second'])
+
+    def test_search_order(self):
+        # the last -lib directory is searched first, after the directories
+        # of the list file
+        self.assertEqual(specsindex.search_order(['a', 'b'], ['c', 'd']),
+                         ['c', 'd', 'b', 'a'])
+
+    def test_read_specs_dir_list_file(self):
+        path = os.path.join(self.tmp_dir, 'dirs.txt')
+        self.write(self.tmp_dir, 'dirs.txt', 'a\n\n  b \n')
+        self.assertEqual(specsindex.read_specs_dir_list_file(path),
+                         ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
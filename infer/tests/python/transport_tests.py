@@ -0,0 +1,90 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import analyze, transport, utils
+
+
+def hosts(slots):
+    return [slot.host for slot in slots]
+
+
+class CreateSlotsTest(unittest.TestCase):
+
+    def test_interleaved(self):
+        slots = transport.create_slots(['a:3', 'b', transport.LOCAL_HOST],
+                                       2, transport.DEFAULT_COMMAND_TEMPLATE)
+        self.assertEqual(hosts(slots), ['a', 'b', transport.LOCAL_HOST,
+                                        'a', 'b', transport.LOCAL_HOST,
+                                        'a'])
+        self.assertEqual([slot.is_local for slot in slots],
+                         [False, False, True, False, False, True, False])
+        self.assertEqual(transport.create_slots([], 2, ''), [])
+
+    def test_parse_host(self):
+        self.assertEqual(transport.parse_host('a', 4), ('a', 4))
+        self.assertEqual(transport.parse_host('a:2', 4), ('a', 2))
+        # IPv6 addresses contain colons
+        self.assertEqual(transport.parse_host('::1:2', 4), ('::1', 2))
+        for host_spec in ['a:', 'a:x', 'a:0', 'a:-1', ':2', '']:
+            with self.assertRaises(ValueError):
+                transport.parse_host(host_spec, 4)
+
+    def test_worker_host_option(self):
+        self.assertEqual(analyze.worker_host_spec('a:2'), 'a:2')
+        with self.assertRaises(argparse.ArgumentTypeError):
+            analyze.worker_host_spec('a:x')
+
+
+class WrapTest(unittest.TestCase):
+
+    CMD = ['InferAnalyze', '-results_dir', 'out dir', '-cluster', "it's"]
+
+    def test_local(self):
+        self.assertEqual(transport.LocalTransport().wrap(self.CMD, '/a b'),
+                         self.CMD)
+
+    def test_default_template(self):
+        slot = transport.CommandTemplateTransport(
+            'host', transport.DEFAULT_COMMAND_TEMPLATE)
+        cmd = slot.wrap(self.CMD, '/a b')
+        # the remote job is terminated along with ssh
+        self.assertEqual(cmd[:5],
+                         ['ssh', '-n', '-tt', '-o', 'BatchMode=yes'])
+        self.assertEqual(cmd[5], 'host')
+        # the remote shell gets the command back from its arguments
+        self.assertEqual(shlex.split(utils.encode(' '.join(cmd[6:]))),
+                         ['cd', '/a b', '&&'] + self.CMD)
+
+    def test_run(self):
+        # a template running the job in a local shell
+        slot = transport.CommandTemplateTransport(
+            'host', "sh -c 'cd {cwd} && {cmd}'")
+        cmd = slot.wrap(['sh', '-c', 'echo "$1 $(pwd)"', 'job', "it's"],
+                        '/')
+        self.assertEqual(subprocess.check_output(cmd), b"it's /\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
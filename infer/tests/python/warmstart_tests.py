@@ -0,0 +1,167 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2016 - present Facebook, Inc.
+# All rights reserved.
+#
+# This source code is licensed under the BSD style license found in the
+# LICENSE file in the root directory of this source tree. An additional grant
+# of patent rights can be found in the PATENTS file in the same directory.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import csv
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0,
+                os.path.join(SCRIPT_DIR,
+                             os.pardir, os.pardir, 'lib', 'python'))
+
+from inferlib import fileindex, utils, warmstart
+
+# procedure -> source file
+PROCS = {
+    'pa': 'a.c',
+    'pb': 'b.c',
+    'pc': 'c.c',
+    'pc2': 'c.c',
+    'pd': 'd.c',
+}
+
+# (caller, callee)
+CALLS = [
+    ('pb', 'pa'),
+    ('pc', 'pb'),
+    ('pd', 'pd'),
+]
+
+
+def write_csv(path, header, rows):
+    with open(path, 'wb') as file_out:
+        writer = csv.writer(file_out)
+        writer.writerow([cell.encode() for cell in header])
+        for row in rows:
+            writer.writerow([cell.encode() for cell in row])
+
+
+class CapturedDirNameTest(unittest.TestCase):
+
+    def test_as_infer(self):
+        # md5 of the base name followed by the directory, see
+        # Utils.string_append_crc_cutoff
+        self.assertEqual(warmstart.captured_dir_name('src/com/Foo.java'),
+                         'Foo.java.96c26a0aa64ffd85cce62ccfde42ac23')
+        self.assertEqual(warmstart.captured_dir_name('a.c'),
+                         'a.c.8eb7504957a50f21c60999d5f146e8e0')
+
+    def test_cutoff(self):
+        name = warmstart.captured_dir_name('x' * 150 + '.c')
+        self.assertEqual(name.split('.')[0], 'x' * 100)
+
+
+class TransitiveCallersTest(unittest.TestCase):
+
+    def test_transitive_callers(self):
+        callers = {'a': ['b'], 'b': ['c', 'd'], 'c': ['a'], 'e': ['f']}
+        self.assertEqual(warmstart.transitive_callers(callers, ['a']),
+                         set(['a', 'b', 'c', 'd']))
+        self.assertEqual(warmstart.transitive_callers(callers, ['d', 'e']),
+                         set(['d', 'e', 'f']))
+        self.assertEqual(warmstart.transitive_callers(callers, []), set())
+
+
+class InvalidateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.specs_dir = os.path.join(self.root, 'specs')
+        os.mkdir(self.specs_dir)
+        for (name_id, source_file) in PROCS.items():
+            self.write(source_file, source_file)
+            self.write(os.path.join('specs', name_id + '.specs'), '')
+        procs_csv = os.path.join(self.root, 'procs.csv')
+        write_csv(procs_csv, ['name_id', 'file'], sorted(PROCS.items()))
+        calls_csv = os.path.join(self.root, 'calls.csv')
+        write_csv(calls_csv, ['caller_id', 'callee_id'], CALLS)
+        self.file_index = fileindex.FileIndex(self.root)
+        manifest = warmstart.create_manifest('key', procs_csv, calls_csv,
+                                             self.file_index)
+        # go through a file as between two analyses
+        self.manifest_path = os.path.join(self.root, 'manifest.json')
+        utils.dump_json_to_path(manifest, self.manifest_path)
+        logging.disable(logging.INFO)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.root, True)
+
+    def write(self, path, content):
+        path = os.path.join(self.root, path)
+        with open(path, 'w') as file_out:
+            file_out.write(content)
+        # make the change visible even within the resolution of mtimes
+        mtime = os.path.getmtime(path) + 10
+        os.utime(path, (mtime, mtime))
+
+    def invalidate(self):
+        manifest = warmstart.load_manifest(self.manifest_path, 'key')
+        return warmstart.invalidate(manifest, self.file_index,
+                                    self.specs_dir)
+
+    def remaining_specs(self):
+        return set(os.path.splitext(name)[0]
+                   for name in os.listdir(self.specs_dir))
+
+    def assert_valid_files(self, valid_dirs, source_files):
+        self.assertEqual(valid_dirs, set(warmstart.captured_dir_name(f)
+                                         for f in source_files))
+
+    def test_nothing_changed(self):
+        self.assert_valid_files(self.invalidate(),
+                                ['a.c', 'b.c', 'c.c', 'd.c'])
+        self.assertEqual(self.remaining_specs(), set(PROCS))
+
+    def test_callee_changed(self):
+        self.write('a.c', 'changed')
+        # the files of the callers are analyzed again
+        self.assert_valid_files(self.invalidate(), ['d.c'])
+        self.assertEqual(self.remaining_specs(), set(['pc2', 'pd']))
+
+    def test_caller_changed(self):
+        self.write('c.c', 'changed')
+        self.assert_valid_files(self.invalidate(), ['a.c', 'b.c', 'd.c'])
+        self.assertEqual(self.remaining_specs(), set(['pa', 'pb', 'pd']))
+
+    def test_recursive_proc_changed(self):
+        self.write('d.c', 'changed')
+        self.assert_valid_files(self.invalidate(), ['a.c', 'b.c', 'c.c'])
+        self.assertEqual(self.remaining_specs(),
+                         set(['pa', 'pb', 'pc', 'pc2']))
+
+    def test_file_removed(self):
+        os.remove(os.path.join(self.root, 'b.c'))
+        self.assert_valid_files(self.invalidate(), ['a.c', 'd.c'])
+        self.assertEqual(self.remaining_specs(), set(['pa', 'pc2', 'pd']))
+
+    def test_only_mtime_changed(self):
+        path = os.path.join(self.root, 'a.c')
+        os.utime(path, (0, 0))
+        self.assert_valid_files(self.invalidate(),
+                                ['a.c', 'b.c', 'c.c', 'd.c'])
+
+    def test_key_changed(self):
+        self.assertIsNone(warmstart.load_manifest(self.manifest_path,
+                                                  'other key'))
+        self.assertIsNone(warmstart.load_manifest(
+            os.path.join(self.root, 'missing.json'), 'key'))
+
+
+if __name__ == '__main__':
+    unittest.main()